@@ -0,0 +1,65 @@
+import hmac
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.memory_profiling import memory_profiler, MemoryProfileBusy
+from app.services.task_handlers import TASK_HANDLERS, run_with_memory_profile
+
+def require_diagnostics(x_admin_token: Optional[str] = Header(None)):
+    """Routes de diagnostic : PROFILING_ENABLED et en-tête X-Admin-Token: <PROFILING_SECRET>
+
+    En-tête distinct de X-Profile et X-Memory-Profile : appeler ces routes ne déclenche
+    pas le profilage de la requête par les middlewares.
+    """
+    if not settings.PROFILING_ENABLED or not settings.PROFILING_SECRET:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Diagnostics désactivés"
+        )
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode("utf-8"), settings.PROFILING_SECRET.encode("utf-8")):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Secret de diagnostic invalide"
+        )
+
+router = APIRouter(dependencies=[Depends(require_diagnostics)])
+
+@router.get("/memory")
+async def get_memory_status():
+    """Mémoire suivie par tracemalloc et derniers profils mémoire"""
+    return memory_profiler.stats()
+
+@router.get("/memory/profiles/{profile_id}")
+async def get_memory_profile(profile_id: str):
+    """Rapport d'un profil mémoire : pic, mémoire retenue et principaux sites d'allocation"""
+    report = memory_profiler.get(profile_id)
+    if not report:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profil mémoire non trouvé"
+        )
+    return report
+
+@router.post("/memory/tasks/{task_type}")
+async def profile_task(
+    task_type: str,
+    payload: Dict[str, Any] = Body(default_factory=dict),
+    db: Session = Depends(get_db)
+):
+    """Exécuter une tâche dans le processus de l'API sous profil mémoire (pic par 1 000 sites)"""
+    if task_type not in TASK_HANDLERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Type de tâche inconnu. Types disponibles: {', '.join(sorted(TASK_HANDLERS))}"
+        )
+    try:
+        return await run_with_memory_profile(task_type, db, payload)
+    except MemoryProfileBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
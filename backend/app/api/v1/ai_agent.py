@@ -9,6 +9,7 @@ from app.services.weather_service import weather_service
 from app.services.disaster_service import disaster_service
 from app.services.vulnerability_service import vulnerability_service
 from app.services.risk_calculator_service import risk_calculator_service
+from app.services.portfolio_frame import PortfolioFrame
 from app.models.site import Site
 from app.models.insurance_contract import InsuranceContract
 from app.schemas.ai_agent import (
@@ -50,19 +51,19 @@ async def analyze_contract_profitability(
         disaster_data = await disaster_service.get_disaster_risk_for_site(
             site.latitude, site.longitude, site.building_type, site.building_value
         )
-        risk_data["disaster_risk"] = disaster_data
+        risk_data["disaster_risk"] = disaster_data.to_dict()
         
         # Données vulnérabilité
         vulnerability_data = await vulnerability_service.get_vulnerability_risk_for_site(
             site.latitude, site.longitude, site.building_type, site.building_value
         )
-        risk_data["vulnerability_risk"] = vulnerability_data
+        risk_data["vulnerability_risk"] = vulnerability_data.to_dict()
         
         # Données de risque global
         comprehensive_risk = await risk_calculator_service.calculate_comprehensive_risk(
             site.latitude, site.longitude, site.building_type, site.building_value
         )
-        risk_data["comprehensive_risk"] = comprehensive_risk
+        risk_data["comprehensive_risk"] = comprehensive_risk.to_dict()
         
         # Convertir les modèles en dictionnaires
         site_data = {
@@ -110,50 +111,8 @@ async def get_strategic_recommendations(
 ):
     """Obtenir des recommandations stratégiques pour le portefeuille"""
     try:
-        # Récupérer tous les sites
-        sites = db.query(Site).all()
-        
-        # Récupérer tous les contrats
-        contracts = db.query(InsuranceContract).all()
-        
-        # Calculer les métriques du portefeuille
-        total_sites = len(sites)
-        total_value = sum(site.building_value for site in sites)
-        total_premiums = sum(contract.premium_amount for contract in contracts)
-        average_risk = sum(site.risk_score for site in sites) / total_sites if total_sites > 0 else 0
-        
-        # Distribution des types de bâtiments
-        type_distribution = {}
-        for site in sites:
-            building_type = site.building_type
-            type_distribution[building_type] = type_distribution.get(building_type, 0) + 1
-        
-        portfolio_data = {
-            "total_sites": total_sites,
-            "total_value": total_value,
-            "total_premiums": total_premiums,
-            "average_risk": average_risk,
-            "type_distribution": type_distribution,
-            "sites": [
-                {
-                    "id": site.id,
-                    "name": site.name,
-                    "building_type": site.building_type.value if site.building_type else None,
-                    "building_value": site.building_value,
-                    "risk_score": site.risk_score
-                }
-                for site in sites
-            ],
-            "contracts": [
-                {
-                    "id": contract.id,
-                    "annual_premium": contract.premium_amount,
-                    "status": contract.status.value if contract.status else None,
-                    "coverage_type": "Standard"
-                }
-                for contract in contracts
-            ]
-        }
+        # Charger uniquement les colonnes utiles des sites et contrats
+        portfolio_data = PortfolioFrame.load(db).portfolio_data()
         
         # Obtenir les recommandations IA
         recommendations = await ai_agent_service.get_strategic_recommendations(portfolio_data)
@@ -190,13 +149,13 @@ async def analyze_risk_mitigation(
         disaster_data = await disaster_service.get_disaster_risk_for_site(
             site.latitude, site.longitude, site.building_type, site.building_value
         )
-        risk_data["disaster_risk"] = disaster_data
+        risk_data["disaster_risk"] = disaster_data.to_dict()
         
         # Données vulnérabilité
         vulnerability_data = await vulnerability_service.get_vulnerability_risk_for_site(
             site.latitude, site.longitude, site.building_type, site.building_value
         )
-        risk_data["vulnerability_risk"] = vulnerability_data
+        risk_data["vulnerability_risk"] = vulnerability_data.to_dict()
         
         # Convertir le site en dictionnaire
         site_data = {
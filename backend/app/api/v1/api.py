@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from app.core.responses import sparse_fieldset
 from .sites import router as sites_router
 from .contracts import router as contracts_router
 from .weather import router as weather_router
@@ -7,8 +8,12 @@ from .disasters import router as disasters_router
 from .vulnerability import router as vulnerability_router
 from .comprehensive_risk import router as comprehensive_risk_router
 from .ai_agent import router as ai_agent_router
+from .risk_history import router as risk_history_router
+from .tasks import router as tasks_router
+from .admin import router as admin_router
 
-api_router = APIRouter()
+# ?fields= sur toutes les routes : réponses partielles (ex. sans les données brutes des fournisseurs)
+api_router = APIRouter(dependencies=[Depends(sparse_fieldset)])
 
 # Inclure les sous-routers
 api_router.include_router(sites_router, prefix="/sites", tags=["sites"])
@@ -18,4 +23,7 @@ api_router.include_router(risk_router, prefix="/risk", tags=["risk"])
 api_router.include_router(disasters_router, prefix="/disasters", tags=["disasters"])
 api_router.include_router(vulnerability_router, prefix="/vulnerability", tags=["vulnerability"])
 api_router.include_router(comprehensive_risk_router, prefix="/comprehensive-risk", tags=["comprehensive-risk"])
-api_router.include_router(ai_agent_router, prefix="/ai-agent", tags=["ai-agent"]) 
\ No newline at end of file
+api_router.include_router(ai_agent_router, prefix="/ai-agent", tags=["ai-agent"])
+api_router.include_router(risk_history_router, prefix="/risk-history", tags=["risk-history"])
+api_router.include_router(tasks_router, prefix="/tasks", tags=["tasks"])
+api_router.include_router(admin_router, prefix="/admin", tags=["admin"]) 
\ No newline at end of file
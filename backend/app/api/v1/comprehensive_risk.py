@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Dict
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.http_cache import check_not_modified, site_etag, ALL_PROVIDERS
+from app.core.responses import FastJSONResponse
+from app.services.portfolio_summary_service import portfolio_summary_service
 from app.services.risk_calculator_service import risk_calculator_service
+from app.services.risk_results import ComprehensiveRisk
+from app.services.site_score_service import site_score_service
+from app.services.task_queue_service import task_queue_service
 
 router = APIRouter()
 
 @router.get("/site/{site_id}")
-async def get_comprehensive_risk_for_site(site_id: int, db: Session = Depends(get_db)):
+async def get_comprehensive_risk_for_site(site_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Récupérer l'analyse de risque globale pour un site spécifique"""
     from app.models.site import Site
     
@@ -18,6 +25,12 @@ async def get_comprehensive_risk_for_site(site_id: int, db: Session = Depends(ge
             detail="Site non trouvé"
         )
     
+    # Version déjà connue du client : 304 sans appel aux fournisseurs ni recalcul
+    etag = site_etag(request, site, "comprehensive", ALL_PROVIDERS)
+    not_modified = check_not_modified(request, response, etag, settings.HTTP_CACHE_RISK_MAX_AGE_SECONDS)
+    if not_modified is not None:
+        return not_modified
+    
     try:
         comprehensive_risk = await risk_calculator_service.calculate_comprehensive_risk(
             site.latitude,
@@ -26,7 +39,8 @@ async def get_comprehensive_risk_for_site(site_id: int, db: Session = Depends(ge
             site.building_value
         )
         
-        return {
+        # Contenu déjà compatible JSON : sérialisé directement, sans jsonable_encoder
+        return FastJSONResponse({
             "site_id": site_id,
             "site_name": site.name,
             "location": f"{site.city}, {site.country}",
@@ -41,7 +55,7 @@ async def get_comprehensive_risk_for_site(site_id: int, db: Session = Depends(ge
                 "construction_year": site.construction_year
             },
             "comprehensive_analysis": comprehensive_risk
-        }
+        }, headers=response.headers)
         
     except Exception as e:
         raise HTTPException(
@@ -50,52 +64,24 @@ async def get_comprehensive_risk_for_site(site_id: int, db: Session = Depends(ge
         )
 
 @router.post("/update-all-sites")
-async def update_all_sites_comprehensive_risk(db: Session = Depends(get_db)):
+async def update_all_sites_comprehensive_risk(
+    background: bool = Query(False, description="Exécuter dans le worker et renvoyer l'identifiant de tâche"),
+    db: Session = Depends(get_db)
+):
     """Mettre à jour les scores de risque global pour tous les sites"""
-    from app.models.site import Site
+    if background:
+        task = task_queue_service.enqueue(db, "rescore_all_sites")
+        db.commit()
+        return {"message": "Analyse globale mise en file", "task_id": task["id"], "status": task["status"]}
     
     try:
-        sites = db.query(Site).all()
-        updated_sites = []
-        
-        for site in sites:
-            try:
-                comprehensive_risk = await risk_calculator_service.calculate_comprehensive_risk(
-                    site.latitude,
-                    site.longitude,
-                    site.building_type.value,
-                    site.building_value
-                )
-                
-                # Mettre à jour le score de risque global
-                global_score = comprehensive_risk.get("comprehensive_risk", {}).get("global_risk_score", 30.0)
-                site.risk_score = global_score
-                
-                risk_level = comprehensive_risk.get("comprehensive_risk", {}).get("risk_level", "modéré")
-                risk_category = comprehensive_risk.get("comprehensive_risk", {}).get("risk_category", "acceptable")
-                
-                updated_sites.append({
-                    "id": site.id,
-                    "name": site.name,
-                    "new_risk_score": global_score,
-                    "risk_level": risk_level,
-                    "risk_category": risk_category,
-                    "weather_score": comprehensive_risk.get("weather_risk", {}).get("risk_score", 25.0),
-                    "disaster_score": comprehensive_risk.get("disaster_risk", {}).get("disaster_risk", {}).get("disaster_risk_score", 15.0),
-                    "vulnerability_score": comprehensive_risk.get("vulnerability_risk", {}).get("vulnerability_risk", {}).get("vulnerability_risk_score", 25.0)
-                })
-                
-            except Exception as e:
-                print(f"Erreur lors de la mise à jour du site {site.id}: {e}")
-                continue
+        response = await risk_calculator_service.rescore_all_sites(db)
         
         # Commiter les changements
         db.commit()
+        portfolio_summary_service.request_refresh()
         
-        return {
-            "message": f"Analyse globale terminée pour {len(updated_sites)} sites",
-            "updated_sites": updated_sites
-        }
+        return response
         
     except Exception as e:
         db.rollback()
@@ -107,10 +93,9 @@ async def update_all_sites_comprehensive_risk(db: Session = Depends(get_db)):
 @router.get("/statistics")
 async def get_comprehensive_risk_statistics(db: Session = Depends(get_db)):
     """Obtenir des statistiques sur les risques globaux"""
-    from app.models.site import Site
-    
     try:
-        sites = db.query(Site).all()
+        # Colonnes de scoring seulement, sans objets ORM suivis par la session
+        sites = site_score_service.load_scoring_rows(db)
         
         if not sites:
             return {
@@ -129,34 +114,16 @@ async def get_comprehensive_risk_statistics(db: Session = Depends(get_db)):
         vulnerability_risks = []
         risk_categories = {}
         
-        for site in sites:
-            try:
-                comprehensive_risk = await risk_calculator_service.calculate_comprehensive_risk(
-                    site.latitude,
-                    site.longitude,
-                    site.building_type.value,
-                    site.building_value
-                )
-                
-                global_score = comprehensive_risk.get("comprehensive_risk", {}).get("global_risk_score", 30.0)
-                global_risks.append(global_score)
-                
-                weather_score = comprehensive_risk.get("weather_risk", {}).get("risk_score", 25.0)
-                weather_risks.append(weather_score)
-                
-                disaster_score = comprehensive_risk.get("disaster_risk", {}).get("disaster_risk", {}).get("disaster_risk_score", 15.0)
-                disaster_risks.append(disaster_score)
-                
-                vulnerability_score = comprehensive_risk.get("vulnerability_risk", {}).get("vulnerability_risk", {}).get("vulnerability_risk_score", 25.0)
-                vulnerability_risks.append(vulnerability_score)
-                
-                # Compter les catégories de risque
-                risk_category = comprehensive_risk.get("comprehensive_risk", {}).get("risk_category", "acceptable")
-                risk_categories[risk_category] = risk_categories.get(risk_category, 0) + 1
-                
-            except Exception as e:
-                print(f"Erreur lors de l'analyse du site {site.id}: {e}")
-                continue
+        # Lecture seule : les features manquantes sont calculées sans être enregistrées
+        for result in await risk_calculator_service.score_sites(db, sites, persist=False):
+            global_risks.append(result.global_risk_score)
+            weather_risks.append(result.weather_score)
+            disaster_risks.append(result.disaster_score)
+            vulnerability_risks.append(result.vulnerability_score)
+            
+            # Compter les catégories de risque
+            risk_category = result.risk_category
+            risk_categories[risk_category] = risk_categories.get(risk_category, 0) + 1
         
         if global_risks:
             avg_global_risk = sum(global_risks) / len(global_risks)
@@ -209,7 +176,7 @@ async def get_comprehensive_risk_statistics(db: Session = Depends(get_db)):
         )
 
 @router.get("/recommendations/{site_id}")
-async def get_site_recommendations(site_id: int, db: Session = Depends(get_db)):
+async def get_site_recommendations(site_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Obtenir des recommandations détaillées pour un site"""
     from app.models.site import Site
     
@@ -220,6 +187,12 @@ async def get_site_recommendations(site_id: int, db: Session = Depends(get_db)):
             detail="Site non trouvé"
         )
     
+    # Version déjà connue du client : 304 sans appel aux fournisseurs ni recalcul
+    etag = site_etag(request, site, "recommendations", ALL_PROVIDERS)
+    not_modified = check_not_modified(request, response, etag, settings.HTTP_CACHE_RISK_MAX_AGE_SECONDS)
+    if not_modified is not None:
+        return not_modified
+    
     try:
         comprehensive_risk = await risk_calculator_service.calculate_comprehensive_risk(
             site.latitude,
@@ -228,19 +201,18 @@ async def get_site_recommendations(site_id: int, db: Session = Depends(get_db)):
             site.building_value
         )
         
-        recommendations = comprehensive_risk.get("recommendations", [])
-        risk_breakdown = comprehensive_risk.get("risk_breakdown", {})
+        global_risk = comprehensive_risk.global_risk
         
         return {
             "site_id": site_id,
             "site_name": site.name,
             "location": f"{site.city}, {site.country}",
-            "global_risk_score": comprehensive_risk.get("comprehensive_risk", {}).get("global_risk_score", 30.0),
-            "risk_level": comprehensive_risk.get("comprehensive_risk", {}).get("risk_level", "modéré"),
-            "risk_category": comprehensive_risk.get("comprehensive_risk", {}).get("risk_category", "acceptable"),
-            "confidence_score": comprehensive_risk.get("comprehensive_risk", {}).get("confidence_score", 0.7),
-            "recommendations": recommendations,
-            "risk_breakdown": risk_breakdown,
+            "global_risk_score": global_risk.global_risk_score,
+            "risk_level": global_risk.risk_level,
+            "risk_category": global_risk.risk_category,
+            "confidence_score": global_risk.confidence_score,
+            "recommendations": comprehensive_risk.recommendations,
+            "risk_breakdown": comprehensive_risk.risk_breakdown(),
             "priority_actions": _generate_priority_actions(comprehensive_risk)
         }
         
@@ -250,14 +222,14 @@ async def get_site_recommendations(site_id: int, db: Session = Depends(get_db)):
             detail=f"Erreur lors de la génération des recommandations: {str(e)}"
         )
 
-def _generate_priority_actions(comprehensive_risk: Dict) -> List[Dict]:
+def _generate_priority_actions(comprehensive_risk: ComprehensiveRisk) -> List[Dict]:
     """Générer des actions prioritaires basées sur l'analyse"""
     actions = []
     
-    global_score = comprehensive_risk.get("comprehensive_risk", {}).get("global_risk_score", 30.0)
-    weather_score = comprehensive_risk.get("weather_risk", {}).get("risk_score", 25.0)
-    disaster_score = comprehensive_risk.get("disaster_risk", {}).get("disaster_risk", {}).get("disaster_risk_score", 15.0)
-    vulnerability_score = comprehensive_risk.get("vulnerability_risk", {}).get("vulnerability_risk", {}).get("vulnerability_risk_score", 25.0)
+    global_score = comprehensive_risk.global_risk.global_risk_score
+    weather_score = comprehensive_risk.weather.risk_score
+    disaster_score = comprehensive_risk.disaster.assessment.disaster_risk_score
+    vulnerability_score = comprehensive_risk.vulnerability.assessment.vulnerability_risk_score
     
     # Actions prioritaires basées sur le score global
     if global_score > 70:
@@ -1,22 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.core.database import get_db
+from app.services.portfolio_summary_service import portfolio_summary_service
 from app.schemas.contract import ContractCreate, ContractUpdate, ContractResponse
 from app.models.insurance_contract import InsuranceContract
+from app.utils.pagination import keyset_page, ndjson_stream
 
 router = APIRouter()
 
 @router.get("/", response_model=List[ContractResponse])
 async def get_contracts(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    after_id: Optional[int] = Query(None, description="Curseur : id du dernier contrat de la page précédente"),
     db: Session = Depends(get_db)
 ):
-    """Récupérer tous les contrats"""
-    contracts = db.query(InsuranceContract).offset(skip).limit(limit).all()
-    return contracts
+    """Récupérer les contrats, triés par id, page par page (curseur dans X-Next-Cursor)"""
+    query = db.query(InsuranceContract)
+    if skip and after_id is None:
+        # Compatibilité : pagination par offset, coûteuse sur les pages profondes
+        query = query.offset(skip)
+    return keyset_page(query, InsuranceContract.id, after_id, limit, response)
+
+@router.get("/stream")
+def stream_contracts():
+    """Exporter tous les contrats en NDJSON (une ligne JSON par contrat)"""
+    return ndjson_stream(lambda db: db.query(InsuranceContract).order_by(InsuranceContract.id), ContractResponse)
 
 @router.get("/{contract_id}", response_model=ContractResponse)
 async def get_contract(contract_id: int, db: Session = Depends(get_db)):
@@ -35,5 +47,6 @@ async def create_contract(contract: ContractCreate, db: Session = Depends(get_db
     db_contract = InsuranceContract(**contract.dict())
     db.add(db_contract)
     db.commit()
+    portfolio_summary_service.request_refresh()
     db.refresh(db_contract)
     return db_contract 
\ No newline at end of file
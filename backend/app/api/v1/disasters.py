@@ -1,13 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Dict
+import logging
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.http_cache import check_not_modified, site_etag, DISASTER_PROVIDERS
+from app.core.responses import FastJSONResponse
+from app.core.logging_config import RATE_LIMITED
+from app.services.portfolio_summary_service import portfolio_summary_service
+from app.services.risk_history_service import risk_history_service
+from app.services.site_score_service import site_score_service
+from app.services.portfolio_frame import PortfolioFrame
 from app.services.disaster_service import disaster_service
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 @router.get("/site/{site_id}")
-async def get_disaster_risk_for_site(site_id: int, db: Session = Depends(get_db)):
+async def get_disaster_risk_for_site(site_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Récupérer le risque de catastrophe pour un site spécifique"""
     from app.models.site import Site
     
@@ -18,6 +29,12 @@ async def get_disaster_risk_for_site(site_id: int, db: Session = Depends(get_db)
             detail="Site non trouvé"
         )
     
+    # Version déjà connue du client : 304 sans appel aux fournisseurs ni recalcul
+    etag = site_etag(request, site, "disaster", DISASTER_PROVIDERS)
+    not_modified = check_not_modified(request, response, etag, settings.HTTP_CACHE_RISK_MAX_AGE_SECONDS)
+    if not_modified is not None:
+        return not_modified
+    
     try:
         disaster_risk = await disaster_service.get_disaster_risk_for_site(
             site.latitude,
@@ -34,7 +51,7 @@ async def get_disaster_risk_for_site(site_id: int, db: Session = Depends(get_db)
                 "latitude": site.latitude,
                 "longitude": site.longitude
             },
-            "disaster_risk": disaster_risk
+            "disaster_risk": disaster_risk.to_dict()
         }
         
     except Exception as e:
@@ -44,7 +61,7 @@ async def get_disaster_risk_for_site(site_id: int, db: Session = Depends(get_db)
         )
 
 @router.get("/historical/{site_id}")
-async def get_historical_disasters(site_id: int, db: Session = Depends(get_db)):
+async def get_historical_disasters(site_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Récupérer l'historique des catastrophes pour un site"""
     from app.models.site import Site
     
@@ -55,6 +72,12 @@ async def get_historical_disasters(site_id: int, db: Session = Depends(get_db)):
             detail="Site non trouvé"
         )
     
+    # Version déjà connue du client : 304 sans appel aux fournisseurs ni recalcul
+    etag = site_etag(request, site, "historical_disasters", DISASTER_PROVIDERS)
+    not_modified = check_not_modified(request, response, etag, settings.HTTP_CACHE_RISK_MAX_AGE_SECONDS)
+    if not_modified is not None:
+        return not_modified
+    
     try:
         disaster_risk = await disaster_service.get_disaster_risk_for_site(
             site.latitude,
@@ -63,13 +86,14 @@ async def get_historical_disasters(site_id: int, db: Session = Depends(get_db)):
             site.building_value
         )
         
-        return {
+        # Contenu déjà compatible JSON : sérialisé directement, sans jsonable_encoder
+        return FastJSONResponse({
             "site_id": site_id,
             "site_name": site.name,
-            "historical_disasters": disaster_risk.get("disasters", []),
-            "data_sources": disaster_risk.get("data_sources", {}),
-            "risk_summary": disaster_risk.get("disaster_risk", {})
-        }
+            "historical_disasters": disaster_risk.disasters,
+            "data_sources": disaster_risk.data_sources(),
+            "risk_summary": disaster_risk.assessment
+        }, headers=response.headers)
         
     except Exception as e:
         raise HTTPException(
@@ -80,11 +104,11 @@ async def get_historical_disasters(site_id: int, db: Session = Depends(get_db)):
 @router.post("/update-all-sites")
 async def update_all_sites_disaster_risk(db: Session = Depends(get_db)):
     """Mettre à jour les scores de risque catastrophe pour tous les sites"""
-    from app.models.site import Site
-    
     try:
-        sites = db.query(Site).all()
+        sites = site_score_service.load_scoring_rows(db)
         updated_sites = []
+        score_updates = []
+        score_history = []
         
         for site in sites:
             try:
@@ -96,26 +120,33 @@ async def update_all_sites_disaster_risk(db: Session = Depends(get_db)):
                 )
                 
                 # Mettre à jour le score de risque avec les données de catastrophes
-                disaster_score = disaster_risk.get("disaster_risk", {}).get("disaster_risk_score", 15.0)
+                disaster_score = disaster_risk.assessment.disaster_risk_score
                 
                 # Calculer un nouveau score global (moyenne avec l'existant)
                 new_risk_score = (site.risk_score + disaster_score) / 2
-                site.risk_score = new_risk_score
+                score_updates.append((site.id, new_risk_score))
+                score_history.append((site.id, "disaster", disaster_score))
+                score_history.append((site.id, "global", new_risk_score))
                 
                 updated_sites.append({
                     "id": site.id,
                     "name": site.name,
                     "new_risk_score": new_risk_score,
                     "disaster_score": disaster_score,
-                    "historical_events": disaster_risk.get("disaster_risk", {}).get("risk_factors", {}).get("historical_events", 0)
+                    "historical_events": disaster_risk.assessment.historical_events
                 })
                 
             except Exception as e:
-                print(f"Erreur lors de la mise à jour du site {site.id}: {e}")
+                logger.exception("Erreur lors de la mise à jour du site %s: %s", site.id, e, extra=RATE_LIMITED)
                 continue
         
+        # Écrire les scores en lots puis les historiser
+        site_score_service.write_scores(db, score_updates)
+        risk_history_service.record_scores(db, score_history)
+        
         # Commiter les changements
         db.commit()
+        portfolio_summary_service.request_refresh()
         
         return {
             "message": f"Mise à jour terminée pour {len(updated_sites)} sites",
@@ -132,12 +163,10 @@ async def update_all_sites_disaster_risk(db: Session = Depends(get_db)):
 @router.get("/statistics")
 async def get_disaster_statistics(db: Session = Depends(get_db)):
     """Obtenir des statistiques sur les risques de catastrophes"""
-    from app.models.site import Site
-    
     try:
-        sites = db.query(Site).all()
+        portfolio = PortfolioFrame.load(db)
         
-        if not sites:
+        if not portfolio.site_count:
             return {
                 "total_sites": 0,
                 "average_disaster_risk": 0,
@@ -150,26 +179,25 @@ async def get_disaster_statistics(db: Session = Depends(get_db)):
         disaster_risks = []
         disaster_types = {}
         
-        for site in sites:
+        for site_id, latitude, longitude, building_type, building_value in portfolio.iter_sites():
             try:
                 disaster_risk = await disaster_service.get_disaster_risk_for_site(
-                    site.latitude,
-                    site.longitude,
-                    site.building_type.value,
-                    site.building_value
+                    latitude,
+                    longitude,
+                    building_type,
+                    building_value
                 )
                 
-                risk_score = disaster_risk.get("disaster_risk", {}).get("disaster_risk_score", 15.0)
+                risk_score = disaster_risk.assessment.disaster_risk_score
                 disaster_risks.append(risk_score)
                 
                 # Compter les types de catastrophes
-                disasters = disaster_risk.get("disasters", [])
-                for disaster in disasters:
+                for disaster in disaster_risk.disasters:
                     disaster_type = disaster.get("type", "inconnu")
                     disaster_types[disaster_type] = disaster_types.get(disaster_type, 0) + 1
                     
             except Exception as e:
-                print(f"Erreur lors de l'analyse du site {site.id}: {e}")
+                logger.exception("Erreur lors de l'analyse du site %s: %s", site_id, e, extra=RATE_LIMITED)
                 continue
         
         if disaster_risks:
@@ -188,7 +216,7 @@ async def get_disaster_statistics(db: Session = Depends(get_db)):
             risk_distribution = {"faible": 0, "modéré": 0, "élevé": 0, "très élevé": 0}
         
         return {
-            "total_sites": len(sites),
+            "total_sites": portfolio.site_count,
             "average_disaster_risk": round(avg_risk, 2),
             "risk_distribution": risk_distribution,
             "high_risk_sites": high_risk_count,
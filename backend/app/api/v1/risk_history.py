@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from datetime import date, timedelta
+from typing import Optional
+
+from app.core.database import get_db
+from app.services.risk_history_service import risk_history_service
+
+router = APIRouter()
+
+COMPONENT_PATTERN = "^(global|weather|disaster|vulnerability)$"
+
+@router.get("/site/{site_id}")
+async def get_site_risk_trend(
+    site_id: int,
+    component: str = Query("global", pattern=COMPONENT_PATTERN),
+    granularity: str = Query("daily", pattern="^(raw|daily|monthly)$"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Évolution du score de risque d'un site dans le temps"""
+    end = end or date.today() + timedelta(days=1)
+    start = start or end - timedelta(days=365 if granularity == "monthly" else 30)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La date de début doit précéder la date de fin"
+        )
+    if granularity == "raw" and end - start > timedelta(days=92):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La granularité brute est limitée à 92 jours, utiliser daily ou monthly"
+        )
+
+    try:
+        return {
+            "site_id": site_id,
+            "component": component,
+            "granularity": granularity,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "points": risk_history_service.get_site_series(db, site_id, component, granularity, start, end)
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de la récupération de l'historique: {str(e)}"
+        )
+
+@router.get("/movers")
+async def get_biggest_movers(
+    since: date,
+    component: str = Query("global", pattern=COMPONENT_PATTERN),
+    direction: str = Query("both", pattern="^(both|up|down)$"),
+    limit: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Sites dont le score a le plus évolué depuis une date"""
+    try:
+        return {
+            "since": since.isoformat(),
+            "component": component,
+            "direction": direction,
+            "movers": risk_history_service.get_biggest_movers(db, since, component, direction, limit)
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors du calcul des variations: {str(e)}"
+        )
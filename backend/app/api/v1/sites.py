@@ -1,28 +1,191 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Response, Query, Request
+from sqlalchemy import func, or_, literal_column
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+import asyncio
+import logging
 import random
-import csv
-import io
 
+from app.core.config import settings
 from app.core.database import get_db
-from app.schemas.site import SiteCreate, SiteUpdate, SiteResponse
+from app.core.http_cache import check_not_modified, site_etag
+from app.services.portfolio_summary_service import portfolio_summary_service
+from app.services.site_import_service import site_import_service
+from app.services.task_queue_service import task_queue_service
+from app.schemas.site import SiteCreate, SiteUpdate, SiteResponse, NearbySiteResponse
 from app.models.site import Site, BuildingType
+from app.utils.pagination import keyset_page, ndjson_stream
+from app.utils import geohash
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+class SiteFilters:
+    """Filtres communs à la liste et à l'export des sites"""
+    def __init__(
+        self,
+        building_type: Optional[BuildingType] = None,
+        city: Optional[str] = None,
+        country: Optional[str] = None,
+        min_risk: Optional[float] = Query(None, ge=0, le=100),
+        max_risk: Optional[float] = Query(None, ge=0, le=100),
+        min_lat: Optional[float] = Query(None, ge=-90, le=90),
+        max_lat: Optional[float] = Query(None, ge=-90, le=90),
+        min_lon: Optional[float] = Query(None, ge=-180, le=180),
+        max_lon: Optional[float] = Query(None, ge=-180, le=180),
+        q: Optional[str] = Query(None, min_length=2, description="Recherche approximative sur le nom et l'adresse")
+    ):
+        self.building_type = building_type
+        self.city = city
+        self.country = country
+        self.min_risk = min_risk
+        self.max_risk = max_risk
+        self.bbox = (min_lat, max_lat, min_lon, max_lon)
+        self.q = q
+
+        if any(bound is not None for bound in self.bbox) and None in self.bbox:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Le rectangle géographique exige min_lat, max_lat, min_lon et max_lon"
+            )
+
+    def apply(self, query):
+        if self.building_type is not None:
+            query = query.filter(Site.building_type == self.building_type)
+        if self.city:
+            query = query.filter(func.lower(Site.city) == self.city.lower())
+        if self.country:
+            query = query.filter(func.lower(Site.country) == self.country.lower())
+        if self.min_risk is not None:
+            query = query.filter(Site.risk_score >= self.min_risk)
+        if self.max_risk is not None:
+            query = query.filter(Site.risk_score <= self.max_risk)
+
+        min_lat, max_lat, min_lon, max_lon = self.bbox
+        if None not in self.bbox:
+            query = query.filter(
+                Site.latitude.between(min_lat, max_lat),
+                Site.longitude.between(min_lon, max_lon)
+            )
+
+        if self.q:
+            # Opérateur de similarité par mot de pg_trgm, servi par les index GIN trigrammes
+            query = query.filter(or_(Site.name.op("%>")(self.q), Site.address.op("%>")(self.q)))
+        return query
+
+    def relevance(self):
+        return func.greatest(func.word_similarity(self.q, Site.name), func.word_similarity(self.q, Site.address))
+
+SORT_COLUMNS = {
+    "risk_score": Site.risk_score,
+    "building_value": Site.building_value,
+}
+
 @router.get("/", response_model=List[SiteResponse])
 async def get_sites(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    after_id: Optional[int] = Query(None, description="Curseur : id du dernier site de la page précédente"),
+    after_value: Optional[float] = Query(None, description="Curseur : valeur de tri du dernier site de la page précédente"),
+    sort: Optional[str] = Query(None, pattern="^-?(risk_score|building_value)$", description="Tri, préfixe '-' pour décroissant"),
+    filters: SiteFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    """Récupérer les sites filtrés et triés, page par page (curseur dans X-Next-Cursor)"""
+    query = filters.apply(db.query(Site))
+
+    if filters.q and sort is None:
+        # Recherche sans tri explicite : classement par pertinence, sans curseur
+        return query.order_by(filters.relevance().desc(), Site.id).offset(skip).limit(limit).all()
+
+    if skip and after_id is None:
+        # Compatibilité : pagination par offset, coûteuse sur les pages profondes
+        query = query.offset(skip)
+
+    descending = bool(sort) and sort.startswith("-")
+    sort_column = SORT_COLUMNS[sort.lstrip("-")] if sort else None
+    if sort_column is not None and after_id is not None and after_value is None:
+        # Sans la valeur de tri, le curseur ne désigne aucune position (X-Next-Cursor-Value)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le curseur d'un tri exige after_id et after_value"
+        )
+    return keyset_page(query, Site.id, after_id, limit, response,
+                       sort_column=sort_column, descending=descending, after_value=after_value)
+
+@router.get("/stream")
+def stream_sites(filters: SiteFilters = Depends()):
+    """Exporter les sites filtrés en NDJSON (une ligne JSON par site)"""
+    return ndjson_stream(lambda db: filters.apply(db.query(Site)).order_by(Site.id), SiteResponse)
+
+@router.get("/summary")
+async def get_portfolio_summary(db: Session = Depends(get_db)):
+    """Synthèse du portefeuille (vue matérialisée sites_with_risk, sans reparcourir les contrats)"""
+    try:
+        return portfolio_summary_service.get_summary(db)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors du calcul de la synthèse: {str(e)}"
+        )
+
+# Rayon maximal exploré pour la recherche des K plus proches voisins
+NEARBY_MAX_RADIUS_KM = 2000.0
+
+def _sites_in_radius(db: Session, latitude: float, longitude: float, radius_km: float) -> List:
+    """Sites à moins de `radius_km`, triés par distance : préfiltre geohash + rectangle, puis distance exacte"""
+    min_lat, max_lat, min_lon, max_lon = geohash.bounding_box(latitude, longitude, radius_km)
+    prefixes = geohash.covering_prefixes(min_lat, max_lat, min_lon, max_lon)
+
+    query = db.query(Site).filter(
+        Site.latitude.between(min_lat, max_lat),
+        Site.longitude.between(min_lon, max_lon)
+    )
+    if prefixes != [""]:
+        geohash_column = literal_column("sites.geohash")
+        query = query.filter(or_(*[geohash_column.like(f"{prefix}%") for prefix in prefixes]))
+
+    candidates = []
+    for site in query.all():
+        distance = geohash.haversine_km(latitude, longitude, site.latitude, site.longitude)
+        if distance <= radius_km:
+            candidates.append((distance, site))
+    candidates.sort(key=lambda candidate: candidate[0])
+    return candidates
+
+@router.get("/nearby", response_model=List[NearbySiteResponse])
+async def get_nearby_sites(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=NEARBY_MAX_RADIUS_KM, description="Tous les sites dans ce rayon"),
+    k: Optional[int] = Query(None, ge=1, le=1000, description="Nombre de sites les plus proches"),
     db: Session = Depends(get_db)
 ):
-    """Récupérer tous les sites"""
-    sites = db.query(Site).offset(skip).limit(limit).all()
-    return sites
+    """Rechercher les sites proches d'un point (K plus proches et/ou dans un rayon)"""
+    if radius_km is not None:
+        candidates = _sites_in_radius(db, latitude, longitude, radius_km)
+        if k is not None:
+            candidates = candidates[:k]
+    else:
+        k = k or 10
+        # Élargir le rayon jusqu'à trouver K sites : tout site plus proche est alors forcément dans le rayon
+        search_radius = 5.0
+        while True:
+            candidates = _sites_in_radius(db, latitude, longitude, search_radius)
+            if len(candidates) >= k or search_radius >= NEARBY_MAX_RADIUS_KM:
+                break
+            search_radius = min(NEARBY_MAX_RADIUS_KM, search_radius * 4)
+        candidates = candidates[:k]
+
+    return [
+        NearbySiteResponse(**SiteResponse.model_validate(site).model_dump(), distance_km=round(distance, 3))
+        for distance, site in candidates
+    ]
 
 @router.get("/{site_id}", response_model=SiteResponse)
-async def get_site(site_id: int, db: Session = Depends(get_db)):
+async def get_site(site_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Récupérer un site par son ID"""
     site = db.query(Site).filter(Site.id == site_id).first()
     if not site:
@@ -30,6 +193,13 @@ async def get_site(site_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Site non trouvé"
         )
+    
+    # Version déjà connue du client : 304 sans sérialisation du site
+    etag = site_etag(request, site, "site")
+    not_modified = check_not_modified(request, response, etag, settings.HTTP_CACHE_SITE_MAX_AGE_SECONDS)
+    if not_modified is not None:
+        return not_modified
+    
     return site
 
 @router.post("/", response_model=SiteResponse)
@@ -45,14 +215,15 @@ async def create_site(site: SiteCreate, db: Session = Depends(get_db)):
             site.latitude, 
             site.longitude
         )
-        db_site.risk_score = weather_risk["risk_score"]
+        db_site.risk_score = weather_risk.risk_score
     except Exception as e:
-        print(f"Erreur lors du calcul du risque météo: {e}")
+        logger.warning("Erreur lors du calcul du risque météo: %s", e)
         # Fallback vers un score aléatoire si l'API météo échoue
         db_site.risk_score = random.uniform(10, 80)
     
     db.add(db_site)
     db.commit()
+    portfolio_summary_service.request_refresh()
     db.refresh(db_site)
     return db_site
 
@@ -75,6 +246,7 @@ async def update_site(
         setattr(db_site, field, value)
     
     db.commit()
+    portfolio_summary_service.request_refresh()
     db.refresh(db_site)
     return db_site
 
@@ -90,11 +262,13 @@ async def delete_site(site_id: int, db: Session = Depends(get_db)):
     
     db.delete(db_site)
     db.commit()
+    portfolio_summary_service.request_refresh()
     return {"message": "Site supprimé avec succès"}
 
 @router.post("/import-csv")
 async def import_sites_csv(
     file: UploadFile = File(...),
+    background: bool = Query(False, description="Exécuter dans le worker et renvoyer l'identifiant de tâche"),
     db: Session = Depends(get_db)
 ):
     """Importer des sites depuis un fichier CSV"""
@@ -105,75 +279,29 @@ async def import_sites_csv(
         )
     
     try:
+        if background:
+            # Fichier déposé pour le worker : la tâche n'en garde que la référence
+            upload = await asyncio.to_thread(task_queue_service.store_upload, file.file)
+            try:
+                task = task_queue_service.enqueue(db, "import_sites_csv", {"upload": upload})
+                db.commit()
+            except Exception:
+                task_queue_service.delete_upload(upload)
+                raise
+            return {"message": "Import mis en file", "task_id": task["id"], "status": task["status"]}
+        
         # Lire le contenu du fichier
         content = await file.read()
         content_str = content.decode('utf-8')
         
-        # Parser le CSV
-        csv_reader = csv.DictReader(io.StringIO(content_str))
-        
-        imported_sites = []
-        errors = []
-        
-        for row_num, row in enumerate(csv_reader, start=2):  # start=2 car l'en-tête est ligne 1
-            try:
-                # Valider et convertir les données
-                building_type_str = row['building_type'].strip()
-                # Convertir le string en enum BuildingType
-                try:
-                    building_type_enum = BuildingType(building_type_str)
-                except ValueError:
-                    errors.append(f"Ligne {row_num}: Type de bâtiment invalide '{building_type_str}'")
-                    continue
-                
-                site_data = {
-                    'name': row['name'].strip(),
-                    'address': row['address'].strip(),
-                    'city': row['city'].strip(),
-                    'postal_code': row['postal_code'].strip(),
-                    'country': row.get('country', 'France').strip(),
-                    'latitude': float(row['latitude']),
-                    'longitude': float(row['longitude']),
-                    'building_type': building_type_enum,
-                    'building_value': float(row['building_value']),
-                    'surface_area': float(row['surface_area']) if row['surface_area'] else None,
-                    'construction_year': int(row['construction_year']) if row['construction_year'] else None,
-                    'notes': row.get('notes', '').strip()
-                }
-                
-                # Créer le site
-                db_site = Site(**site_data)
-                
-                # Calculer le score de risque basé sur la météo réelle
-                try:
-                    from app.services.weather_service import weather_service
-                    weather_risk = await weather_service.get_weather_risk_for_site(
-                        site_data['latitude'], 
-                        site_data['longitude']
-                    )
-                    db_site.risk_score = weather_risk["risk_score"]
-                except Exception as e:
-                    print(f"Erreur lors du calcul du risque météo pour {site_data['name']}: {e}")
-                    # Fallback vers un score aléatoire si l'API météo échoue
-                    db_site.risk_score = random.uniform(10, 80)
-                
-                db.add(db_site)
-                imported_sites.append(site_data['name'])
-                
-            except (ValueError, KeyError) as e:
-                errors.append(f"Ligne {row_num}: {str(e)}")
-                continue
+        response = await site_import_service.import_csv(db, content_str)
         
         # Commiter tous les sites valides
-        if imported_sites:
+        if response["imported_count"]:
             db.commit()
+            portfolio_summary_service.request_refresh()
         
-        return {
-            "message": f"Import terminé",
-            "imported_count": len(imported_sites),
-            "imported_sites": imported_sites,
-            "errors": errors
-        }
+        return response
         
     except Exception as e:
         raise HTTPException(
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.core.database import get_db
+from app.schemas.task import TaskCreate, TaskResponse, TaskSummary
+from app.services.task_handlers import TASK_HANDLERS
+from app.services.task_queue_service import task_queue_service
+
+router = APIRouter()
+
+STATUS_PATTERN = "^(pending|running|succeeded|failed|cancelled)$"
+
+@router.post("/", response_model=TaskResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_task(task: TaskCreate, db: Session = Depends(get_db)):
+    """Mettre une tâche longue en file pour le worker"""
+    if task.task_type not in TASK_HANDLERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Type de tâche inconnu. Types disponibles: {', '.join(sorted(TASK_HANDLERS))}"
+        )
+    
+    created = task_queue_service.enqueue(
+        db, task.task_type, task.payload, task.priority, task.max_attempts
+    )
+    db.commit()
+    return created
+
+@router.get("/", response_model=List[TaskSummary])
+async def get_tasks(
+    task_status: Optional[str] = Query(None, alias="status", pattern=STATUS_PATTERN),
+    task_type: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Lister les tâches les plus récentes (sans leurs paramètres)"""
+    return task_queue_service.list_tasks(db, task_status, task_type, limit)
+
+@router.get("/{task_id}", response_model=TaskResponse)
+async def get_task(task_id: int, db: Session = Depends(get_db)):
+    """Récupérer le statut et le résultat d'une tâche"""
+    task = task_queue_service.get_task(db, task_id)
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tâche non trouvée"
+        )
+    return task
+
+@router.post("/{task_id}/cancel", response_model=TaskResponse)
+async def cancel_task(task_id: int, db: Session = Depends(get_db)):
+    """Annuler une tâche qui n'a pas encore démarré"""
+    cancelled = task_queue_service.cancel(db, task_id)
+    if cancelled:
+        db.commit()
+        return cancelled
+    
+    if not task_queue_service.get_task(db, task_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tâche non trouvée"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Seule une tâche en attente peut être annulée"
+    )
@@ -1,13 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Dict
+import logging
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.http_cache import check_not_modified, site_etag, VULNERABILITY_PROVIDERS
+from app.core.logging_config import RATE_LIMITED
+from app.services.portfolio_summary_service import portfolio_summary_service
+from app.services.risk_history_service import risk_history_service
+from app.services.site_score_service import site_score_service
+from app.services.portfolio_frame import PortfolioFrame
 from app.services.vulnerability_service import vulnerability_service
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 @router.get("/site/{site_id}")
-async def get_vulnerability_risk_for_site(site_id: int, db: Session = Depends(get_db)):
+async def get_vulnerability_risk_for_site(site_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Récupérer le risque de vulnérabilité pour un site spécifique"""
     from app.models.site import Site
     
@@ -18,6 +28,12 @@ async def get_vulnerability_risk_for_site(site_id: int, db: Session = Depends(ge
             detail="Site non trouvé"
         )
     
+    # Version déjà connue du client : 304 sans appel aux fournisseurs ni recalcul
+    etag = site_etag(request, site, "vulnerability", VULNERABILITY_PROVIDERS)
+    not_modified = check_not_modified(request, response, etag, settings.HTTP_CACHE_RISK_MAX_AGE_SECONDS)
+    if not_modified is not None:
+        return not_modified
+    
     try:
         vulnerability_risk = await vulnerability_service.get_vulnerability_risk_for_site(
             site.latitude,
@@ -34,7 +50,7 @@ async def get_vulnerability_risk_for_site(site_id: int, db: Session = Depends(ge
                 "latitude": site.latitude,
                 "longitude": site.longitude
             },
-            "vulnerability_risk": vulnerability_risk
+            "vulnerability_risk": vulnerability_risk.to_dict()
         }
         
     except Exception as e:
@@ -44,7 +60,7 @@ async def get_vulnerability_risk_for_site(site_id: int, db: Session = Depends(ge
         )
 
 @router.get("/zones/{site_id}")
-async def get_vulnerability_zones(site_id: int, db: Session = Depends(get_db)):
+async def get_vulnerability_zones(site_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Récupérer les zones de vulnérabilité pour un site"""
     from app.models.site import Site
     
@@ -55,6 +71,12 @@ async def get_vulnerability_zones(site_id: int, db: Session = Depends(get_db)):
             detail="Site non trouvé"
         )
     
+    # Version déjà connue du client : 304 sans appel aux fournisseurs ni recalcul
+    etag = site_etag(request, site, "vulnerability_zones", VULNERABILITY_PROVIDERS)
+    not_modified = check_not_modified(request, response, etag, settings.HTTP_CACHE_RISK_MAX_AGE_SECONDS)
+    if not_modified is not None:
+        return not_modified
+    
     try:
         vulnerability_risk = await vulnerability_service.get_vulnerability_risk_for_site(
             site.latitude,
@@ -63,16 +85,13 @@ async def get_vulnerability_zones(site_id: int, db: Session = Depends(get_db)):
             site.building_value
         )
         
-        zones = vulnerability_risk.get("vulnerability_risk", {}).get("zone_assessments", {})
-        risk_factors = vulnerability_risk.get("vulnerability_risk", {}).get("risk_factors", {})
-        
         return {
             "site_id": site_id,
             "site_name": site.name,
-            "vulnerability_zones": zones,
-            "risk_factors": risk_factors,
-            "jba_data": vulnerability_risk.get("jba_data", {}),
-            "fema_data": vulnerability_risk.get("fema_data", {})
+            "vulnerability_zones": vulnerability_risk.assessment.zone_assessments(),
+            "risk_factors": vulnerability_risk.assessment.risk_factors(),
+            "jba_data": vulnerability_risk.jba_data,
+            "fema_data": vulnerability_risk.fema_data
         }
         
     except Exception as e:
@@ -84,11 +103,11 @@ async def get_vulnerability_zones(site_id: int, db: Session = Depends(get_db)):
 @router.post("/update-all-sites")
 async def update_all_sites_vulnerability_risk(db: Session = Depends(get_db)):
     """Mettre à jour les scores de vulnérabilité pour tous les sites"""
-    from app.models.site import Site
-    
     try:
-        sites = db.query(Site).all()
+        sites = site_score_service.load_scoring_rows(db)
         updated_sites = []
+        score_updates = []
+        score_history = []
         
         for site in sites:
             try:
@@ -100,31 +119,37 @@ async def update_all_sites_vulnerability_risk(db: Session = Depends(get_db)):
                 )
                 
                 # Mettre à jour le score de risque avec les données de vulnérabilité
-                vulnerability_score = vulnerability_risk.get("vulnerability_risk", {}).get("vulnerability_risk_score", 25.0)
+                assessment = vulnerability_risk.assessment
+                vulnerability_score = assessment.vulnerability_risk_score
                 
                 # Calculer un nouveau score global (moyenne avec l'existant)
                 new_risk_score = (site.risk_score + vulnerability_score) / 2
-                site.risk_score = new_risk_score
-                
-                zones = vulnerability_risk.get("vulnerability_risk", {}).get("zone_assessments", {})
+                score_updates.append((site.id, new_risk_score))
+                score_history.append((site.id, "vulnerability", vulnerability_score))
+                score_history.append((site.id, "global", new_risk_score))
                 
                 updated_sites.append({
                     "id": site.id,
                     "name": site.name,
                     "new_risk_score": new_risk_score,
                     "vulnerability_score": vulnerability_score,
-                    "flood_zone": zones.get("flood_zone", "inconnue"),
-                    "earthquake_zone": zones.get("earthquake_zone", "inconnue"),
-                    "wind_zone": zones.get("wind_zone", "inconnue"),
-                    "subsidence_zone": zones.get("subsidence_zone", "inconnue")
+                    "flood_zone": assessment.flood_zone,
+                    "earthquake_zone": assessment.earthquake_zone,
+                    "wind_zone": assessment.wind_zone,
+                    "subsidence_zone": assessment.subsidence_zone
                 })
                 
             except Exception as e:
-                print(f"Erreur lors de la mise à jour du site {site.id}: {e}")
+                logger.exception("Erreur lors de la mise à jour du site %s: %s", site.id, e, extra=RATE_LIMITED)
                 continue
         
+        # Écrire les scores en lots puis les historiser
+        site_score_service.write_scores(db, score_updates)
+        risk_history_service.record_scores(db, score_history)
+        
         # Commiter les changements
         db.commit()
+        portfolio_summary_service.request_refresh()
         
         return {
             "message": f"Mise à jour terminée pour {len(updated_sites)} sites",
@@ -141,12 +166,10 @@ async def update_all_sites_vulnerability_risk(db: Session = Depends(get_db)):
 @router.get("/statistics")
 async def get_vulnerability_statistics(db: Session = Depends(get_db)):
     """Obtenir des statistiques sur les vulnérabilités"""
-    from app.models.site import Site
-    
     try:
-        sites = db.query(Site).all()
+        portfolio = PortfolioFrame.load(db)
         
-        if not sites:
+        if not portfolio.site_count:
             return {
                 "total_sites": 0,
                 "average_vulnerability_risk": 0,
@@ -164,29 +187,30 @@ async def get_vulnerability_statistics(db: Session = Depends(get_db)):
             "subsidence_zones": {"faible": 0, "modérée": 0, "élevée": 0}
         }
         
-        for site in sites:
+        for site_id, latitude, longitude, building_type, building_value in portfolio.iter_sites():
             try:
                 vulnerability_risk = await vulnerability_service.get_vulnerability_risk_for_site(
-                    site.latitude,
-                    site.longitude,
-                    site.building_type.value,
-                    site.building_value
+                    latitude,
+                    longitude,
+                    building_type,
+                    building_value
                 )
                 
-                risk_score = vulnerability_risk.get("vulnerability_risk", {}).get("vulnerability_risk_score", 25.0)
-                vulnerability_risks.append(risk_score)
+                assessment = vulnerability_risk.assessment
+                vulnerability_risks.append(assessment.vulnerability_risk_score)
                 
                 # Compter les zones de vulnérabilité
-                zones = vulnerability_risk.get("vulnerability_risk", {}).get("zone_assessments", {})
-                
-                for zone_type in ["flood_zones", "earthquake_zones", "wind_zones", "subsidence_zones"]:
-                    zone_key = zone_type.replace("_zones", "_zone")
-                    zone_value = zones.get(zone_key, "inconnue")
+                for zone_type, zone_value in (
+                    ("flood_zones", assessment.flood_zone),
+                    ("earthquake_zones", assessment.earthquake_zone),
+                    ("wind_zones", assessment.wind_zone),
+                    ("subsidence_zones", assessment.subsidence_zone)
+                ):
                     if zone_value in ["faible", "modérée", "élevée"]:
                         zone_distribution[zone_type][zone_value] += 1
                     
             except Exception as e:
-                print(f"Erreur lors de l'analyse du site {site.id}: {e}")
+                logger.exception("Erreur lors de l'analyse du site %s: %s", site_id, e, extra=RATE_LIMITED)
                 continue
         
         if vulnerability_risks:
@@ -205,7 +229,7 @@ async def get_vulnerability_statistics(db: Session = Depends(get_db)):
             risk_distribution = {"faible": 0, "modéré": 0, "élevé": 0, "très élevé": 0}
         
         return {
-            "total_sites": len(sites),
+            "total_sites": portfolio.site_count,
             "average_vulnerability_risk": round(avg_risk, 2),
             "risk_distribution": risk_distribution,
             "high_vulnerability_sites": high_vulnerability_count,
@@ -219,7 +243,7 @@ async def get_vulnerability_statistics(db: Session = Depends(get_db)):
         )
 
 @router.get("/zone-analysis/{site_id}")
-async def get_detailed_zone_analysis(site_id: int, db: Session = Depends(get_db)):
+async def get_detailed_zone_analysis(site_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Obtenir une analyse détaillée des zones de vulnérabilité pour un site"""
     from app.models.site import Site
     
@@ -230,6 +254,12 @@ async def get_detailed_zone_analysis(site_id: int, db: Session = Depends(get_db)
             detail="Site non trouvé"
         )
     
+    # Version déjà connue du client : 304 sans appel aux fournisseurs ni recalcul
+    etag = site_etag(request, site, "zone_analysis", VULNERABILITY_PROVIDERS)
+    not_modified = check_not_modified(request, response, etag, settings.HTTP_CACHE_RISK_MAX_AGE_SECONDS)
+    if not_modified is not None:
+        return not_modified
+    
     try:
         vulnerability_risk = await vulnerability_service.get_vulnerability_risk_for_site(
             site.latitude,
@@ -238,35 +268,35 @@ async def get_detailed_zone_analysis(site_id: int, db: Session = Depends(get_db)
             site.building_value
         )
         
-        jba_data = vulnerability_risk.get("jba_data", {})
-        fema_data = vulnerability_risk.get("fema_data", {})
-        risk_assessment = vulnerability_risk.get("vulnerability_risk", {})
+        jba_data = vulnerability_risk.jba_data
+        fema_data = vulnerability_risk.fema_data
+        risk_assessment = vulnerability_risk.assessment
         
         # Analyser chaque type de vulnérabilité
         zone_analysis = {
             "flood": {
-                "risk_level": risk_assessment.get("zone_assessments", {}).get("flood_zone", "inconnue"),
+                "risk_level": risk_assessment.flood_zone,
                 "probability": jba_data.get("flood_risk", {}).get("probability", 0),
                 "depth": jba_data.get("flood_risk", {}).get("depth", 0),
                 "frequency": jba_data.get("flood_risk", {}).get("frequency", "inconnue"),
                 "impact": fema_data.get("natural_hazards", {}).get("flood", {}).get("impact", "inconnu")
             },
             "earthquake": {
-                "risk_level": risk_assessment.get("zone_assessments", {}).get("earthquake_zone", "inconnue"),
+                "risk_level": risk_assessment.earthquake_zone,
                 "probability": jba_data.get("earthquake_risk", {}).get("probability", 0),
                 "magnitude": jba_data.get("earthquake_risk", {}).get("magnitude", 0),
                 "frequency": jba_data.get("earthquake_risk", {}).get("frequency", "inconnue"),
                 "impact": fema_data.get("natural_hazards", {}).get("earthquake", {}).get("impact", "inconnu")
             },
             "wind": {
-                "risk_level": risk_assessment.get("zone_assessments", {}).get("wind_zone", "inconnue"),
+                "risk_level": risk_assessment.wind_zone,
                 "probability": jba_data.get("wind_risk", {}).get("probability", 0),
                 "speed": jba_data.get("wind_risk", {}).get("speed", 0),
                 "frequency": jba_data.get("wind_risk", {}).get("frequency", "inconnue"),
                 "impact": fema_data.get("natural_hazards", {}).get("hurricane", {}).get("impact", "inconnu")
             },
             "subsidence": {
-                "risk_level": risk_assessment.get("zone_assessments", {}).get("subsidence_zone", "inconnue"),
+                "risk_level": risk_assessment.subsidence_zone,
                 "probability": jba_data.get("subsidence_risk", {}).get("probability", 0),
                 "severity": jba_data.get("subsidence_risk", {}).get("severity", "inconnue"),
                 "frequency": jba_data.get("subsidence_risk", {}).get("frequency", "inconnue")
@@ -281,9 +311,9 @@ async def get_detailed_zone_analysis(site_id: int, db: Session = Depends(get_db)
                 "latitude": site.latitude,
                 "longitude": site.longitude
             },
-            "vulnerability_score": risk_assessment.get("vulnerability_risk_score", 25.0),
+            "vulnerability_score": risk_assessment.vulnerability_risk_score,
             "zone_analysis": zone_analysis,
-            "risk_factors": risk_assessment.get("risk_factors", {}),
+            "risk_factors": risk_assessment.risk_factors(),
             "data_sources": {
                 "jba_data_available": bool(jba_data),
                 "fema_data_available": bool(fema_data)
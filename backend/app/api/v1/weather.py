@@ -1,15 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 from typing import Dict
 import asyncio
+import logging
 
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.http_cache import check_not_modified, site_etag, WEATHER_PROVIDERS
+from app.core.logging_config import RATE_LIMITED
+from app.services.portfolio_summary_service import portfolio_summary_service
+from app.services.risk_history_service import risk_history_service
+from app.services.site_score_service import site_score_service
 from app.services.weather_service import weather_service
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 @router.get("/site/{site_id}")
-async def get_weather_for_site(site_id: int, db: Session = Depends(get_db)):
+async def get_weather_for_site(site_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Récupérer les données météo pour un site spécifique"""
     from app.models.site import Site
     
@@ -20,6 +29,12 @@ async def get_weather_for_site(site_id: int, db: Session = Depends(get_db)):
             detail="Site non trouvé"
         )
     
+    # Version déjà connue du client : 304 sans appel aux fournisseurs ni recalcul
+    etag = site_etag(request, site, "weather", WEATHER_PROVIDERS)
+    not_modified = check_not_modified(request, response, etag, settings.HTTP_CACHE_RISK_MAX_AGE_SECONDS)
+    if not_modified is not None:
+        return not_modified
+    
     try:
         weather_risk = await weather_service.get_weather_risk_for_site(
             site.latitude, 
@@ -34,7 +49,7 @@ async def get_weather_for_site(site_id: int, db: Session = Depends(get_db)):
                 "latitude": site.latitude,
                 "longitude": site.longitude
             },
-            "weather_risk": weather_risk
+            "weather_risk": weather_risk.to_dict()
         }
         
     except Exception as e:
@@ -44,7 +59,7 @@ async def get_weather_for_site(site_id: int, db: Session = Depends(get_db)):
         )
 
 @router.get("/current/{site_id}")
-async def get_current_weather(site_id: int, db: Session = Depends(get_db)):
+async def get_current_weather(site_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Récupérer les conditions météo actuelles pour un site"""
     from app.models.site import Site
     
@@ -55,6 +70,12 @@ async def get_current_weather(site_id: int, db: Session = Depends(get_db)):
             detail="Site non trouvé"
         )
     
+    # Version déjà connue du client : 304 sans appel aux fournisseurs ni recalcul
+    etag = site_etag(request, site, "current_weather", WEATHER_PROVIDERS)
+    not_modified = check_not_modified(request, response, etag, settings.HTTP_CACHE_RISK_MAX_AGE_SECONDS)
+    if not_modified is not None:
+        return not_modified
+    
     try:
         weather_data = await weather_service.get_current_weather(
             site.latitude, 
@@ -76,11 +97,11 @@ async def get_current_weather(site_id: int, db: Session = Depends(get_db)):
 @router.post("/update-risk-scores")
 async def update_all_sites_risk_scores(db: Session = Depends(get_db)):
     """Mettre à jour les scores de risque de tous les sites basés sur la météo"""
-    from app.models.site import Site
-    
     try:
-        sites = db.query(Site).all()
+        sites = site_score_service.load_scoring_rows(db)
         updated_sites = []
+        score_updates = []
+        score_history = []
         
         for site in sites:
             try:
@@ -90,20 +111,27 @@ async def update_all_sites_risk_scores(db: Session = Depends(get_db)):
                 )
                 
                 # Mettre à jour le score de risque avec les données météo
-                site.risk_score = weather_risk["risk_score"]
+                score_updates.append((site.id, weather_risk.risk_score))
+                score_history.append((site.id, "weather", weather_risk.risk_score))
+                score_history.append((site.id, "global", weather_risk.risk_score))
                 updated_sites.append({
                     "id": site.id,
                     "name": site.name,
-                    "new_risk_score": weather_risk["risk_score"],
-                    "weather_conditions": weather_risk["risk_factors"]["conditions"]
+                    "new_risk_score": weather_risk.risk_score,
+                    "weather_conditions": weather_risk.conditions
                 })
                 
             except Exception as e:
-                print(f"Erreur lors de la mise à jour du site {site.id}: {e}")
+                logger.exception("Erreur lors de la mise à jour du site %s: %s", site.id, e, extra=RATE_LIMITED)
                 continue
         
+        # Écrire les scores en lots puis les historiser
+        site_score_service.write_scores(db, score_updates)
+        risk_history_service.record_scores(db, score_history)
+        
         # Commiter les changements
         db.commit()
+        portfolio_summary_service.request_refresh()
         
         return {
             "message": f"Mise à jour terminée pour {len(updated_sites)} sites",
@@ -0,0 +1,182 @@
+import asyncio
+import math
+import re
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+
+TRAFFIC_CLASSES = ("interactive", "batch", "ai")
+
+# Classe de trafic de la requête en cours, lue par les appels aux fournisseurs
+current_traffic_class: ContextVar[str] = ContextVar("current_traffic_class", default="interactive")
+
+# Routes qui parcourent tout le portefeuille ; le reste de /ai-agent est classé "ai"
+BATCH_ROUTES = [
+    re.compile(r"^/api/v1/(disasters|vulnerability|comprehensive-risk)/(update-all-sites|statistics)$"),
+    re.compile(r"^/api/v1/weather/update-risk-scores$"),
+    re.compile(r"^/api/v1/sites/import-csv$"),
+    re.compile(r"^/api/v1/(sites|contracts)/stream$"),
+    re.compile(r"^/api/v1/admin/memory/tasks/"),
+]
+AI_ROUTES = [
+    re.compile(r"^/api/v1/ai-agent/"),
+]
+
+class AdmissionRejected(Exception):
+    """Requête refusée : file pleine (429) ou délai d'attente dépassé (503)"""
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class AdmissionPool:
+    """Sémaphore avec file d'attente bornée et délai maximal d'attente"""
+    def __init__(self, name: str, concurrency: int, max_queue: Optional[int], queue_timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def retry_after(self) -> int:
+        """Estimation du délai avant qu'une place se libère (en-tête Retry-After)"""
+        backlog = (self.waiting + 1) / max(1, self.concurrency)
+        return max(1, math.ceil(min(self.queue_timeout, self.queue_timeout * backlog)))
+
+    async def acquire(self):
+        if self._semaphore.locked() and self.max_queue is not None and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(429, f"File {self.name} pleine, réessayer plus tard", self.retry_after())
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise AdmissionRejected(503, f"Délai d'attente dépassé pour la file {self.name}", self.retry_after())
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict:
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out
+        }
+
+class AdmissionController:
+    def __init__(self):
+        # Une requête admise tient au plus une session DB : ces pools bornent aussi les sessions
+        self.request_pools = {
+            traffic_class: AdmissionPool(
+                traffic_class,
+                getattr(settings, f"ADMISSION_{traffic_class.upper()}_CONCURRENCY"),
+                getattr(settings, f"ADMISSION_{traffic_class.upper()}_QUEUE_SIZE"),
+                getattr(settings, f"ADMISSION_{traffic_class.upper()}_QUEUE_TIMEOUT_SECONDS")
+            )
+            for traffic_class in TRAFFIC_CLASSES
+        }
+        self.provider_pools = {
+            traffic_class: AdmissionPool(
+                f"fournisseurs/{traffic_class}",
+                getattr(settings, f"PROVIDER_{traffic_class.upper()}_CONCURRENCY"),
+                None,
+                settings.PROVIDER_QUEUE_TIMEOUT_SECONDS
+            )
+            for traffic_class in TRAFFIC_CLASSES
+        }
+
+    def classify(self, path: str) -> str:
+        """Classe de trafic d'une route de l'API"""
+        if any(pattern.match(path) for pattern in AI_ROUTES):
+            return "ai"
+        if any(pattern.match(path) for pattern in BATCH_ROUTES):
+            return "batch"
+        return "interactive"
+
+    def request_slot(self, traffic_class: str):
+        return self.request_pools[traffic_class].slot()
+
+    def provider_slot(self):
+        """Place pour un appel fournisseur, dans le pool de la classe de la requête en cours"""
+        return self.provider_pools[current_traffic_class.get()].slot()
+
+    def stats(self) -> Dict:
+        return {
+            "requests": {name: pool.stats() for name, pool in self.request_pools.items()},
+            "providers": {name: pool.stats() for name, pool in self.provider_pools.items()}
+        }
+
+# Instance globale du contrôleur
+admission_controller = AdmissionController()
+
+class AdmissionMiddleware:
+    """Contrôle d'admission des routes /api/ : les traitements batch et IA ne peuvent pas saturer les vues interactives
+
+    La place est rendue à l'envoi du dernier morceau du corps : une réponse en flux
+    (exports NDJSON, qui tiennent leur propre session) l'occupe jusqu'à la fin.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            return await self.app(scope, receive, send)
+
+        traffic_class = admission_controller.classify(scope["path"])
+        pool = admission_controller.request_pools[traffic_class]
+        try:
+            await pool.acquire()
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                status_code=e.status_code,
+                content={"detail": e.detail},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            return await response(scope, receive, send)
+
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                pool.release()
+
+        async def send_and_release(message):
+            try:
+                await send(message)
+            finally:
+                if message["type"] == "http.response.body" and not message.get("more_body", False):
+                    release()
+
+        token = current_traffic_class.set(traffic_class)
+        try:
+            await self.app(scope, receive, send_and_release)
+        finally:
+            release()
+            current_traffic_class.reset(token)
@@ -0,0 +1,108 @@
+import logging
+import time
+from collections import deque
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# États du disjoncteur
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """Disjoncteur à taux d'erreur glissant
+
+    Fermé : les appels passent et leurs résultats alimentent une fenêtre glissante.
+    Ouvert : au-delà du taux d'erreur, les appels sont refusés immédiatement pendant
+    `open_seconds`. Semi-ouvert : quelques appels de sonde décident de la fermeture
+    (succès) ou d'une nouvelle ouverture (échec).
+    """
+    def __init__(self, name: str, error_rate: float, min_calls: int, window_seconds: float,
+                 open_seconds: float, half_open_probes: int):
+        self.name = name
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.short_circuited = 0
+        self.times_opened = 0
+        self._outcomes = deque()
+
+    def _trim(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        self.probes_in_flight = 0
+        self.times_opened += 1
+        logger.warning("Disjoncteur %s ouvert - Utilisation des données par défaut pendant %.0fs", self.name, self.open_seconds)
+
+    def before_call(self) -> bool:
+        """Autoriser ou non un appel (réserve une sonde en semi-ouvert)"""
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now - self.opened_at < self.open_seconds:
+                self.short_circuited += 1
+                return False
+            self.state = HALF_OPEN
+            self.probes_in_flight = 0
+
+        if self.state == HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_probes:
+                self.short_circuited += 1
+                return False
+            self.probes_in_flight += 1
+        return True
+
+    def on_success(self):
+        now = time.monotonic()
+        if self.state == HALF_OPEN:
+            self.state = CLOSED
+            self.probes_in_flight = 0
+            self._outcomes.clear()
+            logger.info("Disjoncteur %s refermé", self.name)
+            return
+        self._outcomes.append((now, False))
+        self._trim(now)
+
+    def on_failure(self):
+        now = time.monotonic()
+        if self.state == HALF_OPEN:
+            self._open(now)
+            return
+        self._outcomes.append((now, True))
+        self._trim(now)
+        failures = sum(1 for _, failed in self._outcomes if failed)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.error_rate:
+            self._open(now)
+
+    def on_abandon(self):
+        """Appel autorisé mais jamais émis (ex. refus d'admission) : libérer la sonde"""
+        if self.state == HALF_OPEN and self.probes_in_flight > 0:
+            self.probes_in_flight -= 1
+
+    def retry_in(self) -> float:
+        """Secondes avant la prochaine sonde"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.open_seconds - (time.monotonic() - self.opened_at))
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        self._trim(now)
+        failures = sum(1 for _, failed in self._outcomes if failed)
+        return {
+            "state": self.state,
+            "window_calls": len(self._outcomes),
+            "window_error_rate": round(failures / len(self._outcomes), 3) if self._outcomes else 0.0,
+            "times_opened": self.times_opened,
+            "short_circuited": self.short_circuited,
+            "retry_in_seconds": round(self.retry_in(), 1)
+        }
@@ -0,0 +1,121 @@
+import zlib
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # Dépendance optionnelle : gzip seulement
+    brotli = None
+
+# Types de contenu compressés (JSON, NDJSON des exports, texte)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Encodage préféré parmi ceux acceptés par le client : br (si disponible), puis gzip"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+class _Encoder:
+    """Compression d'un corps en un bloc ou par morceaux (réponses en flux)"""
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.RESPONSE_BROTLI_QUALITY)
+        else:
+            # wbits 31 : en-tête et somme de contrôle gzip
+            self._compressor = zlib.compressobj(settings.RESPONSE_GZIP_LEVEL, zlib.DEFLATED, 31)
+        self.encoding = encoding
+
+    def chunk(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            output = self._compressor.process(data)
+            return output + (self._compressor.finish() if final else self._compressor.flush())
+        output = self._compressor.compress(data)
+        # Vider à chaque morceau : le client reçoit les lignes d'un export au fil de l'eau
+        return output + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class CompressionMiddleware:
+    """Compression des réponses au-delà de RESPONSE_COMPRESSION_MIN_BYTES
+
+    Les réponses complètes plus petites que le seuil, déjà encodées ou d'un type non
+    compressible sont transmises telles quelles. Une réponse en flux est compressée
+    morceau par morceau, sans attendre la fin.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.minimum_size = settings.RESPONSE_COMPRESSION_MIN_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept_encoding = next(
+            (value.decode("latin-1") for name, value in scope["headers"] if name == b"accept-encoding"), ""
+        )
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                # Retenir les en-têtes jusqu'au premier morceau du corps (taille connue)
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                if start_message is not None:
+                    await send(start_message)
+                    start_message = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(raw=list(start_message["headers"]))
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    return
+
+                encoder = _Encoder(encoding)
+                body = encoder.chunk(body, final=not more_body)
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["content-length"]
+                else:
+                    headers["content-length"] = str(len(body))
+                await send({**start_message, "headers": headers.raw})
+                start_message = None
+            else:
+                body = encoder.chunk(body, final=not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 import os
 
 class Settings(BaseSettings):
@@ -19,8 +19,148 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-change-in-production"
     JWT_SECRET: str = "your-jwt-secret-change-in-production"
     
-    # Logs
+    # Feature store de scoring
+    FEATURE_STORE_MAX_AGE_MINUTES: int = 60
+    # Features calculées sur des données de repli (fournisseur en erreur) : recalculées plus tôt
+    FEATURE_STORE_DEGRADED_MAX_AGE_MINUTES: int = 5
+    
+    # Vue colonnes du portefeuille
+    PORTFOLIO_SNAPSHOT_DIR: str = "data/portfolio_snapshot"
+    PORTFOLIO_FRAME_CHUNK_SIZE: int = 50000
+    
+    # Vue matérialisée sites_with_risk
+    SITES_WITH_RISK_REFRESH_DELAY_SECONDS: float = 5.0
+    
+    # File de tâches persistante (worker.py)
+    TASK_WORKER_CONCURRENCY: int = 2
+    TASK_POLL_INTERVAL_SECONDS: float = 2.0
+    TASK_LEASE_SECONDS: int = 300
+    TASK_MAX_ATTEMPTS: int = 3
+    TASK_RETRY_BASE_SECONDS: float = 10.0
+    TASK_RETRY_MAX_SECONDS: float = 600.0
+    # Fichiers reçus par l'API pour une tâche (imports CSV) : répertoire partagé avec le worker
+    TASK_UPLOAD_DIR: str = "data/task_uploads"
+    
+    # Contrôle d'admission : requêtes (et donc sessions DB) par classe de trafic
+    ADMISSION_INTERACTIVE_CONCURRENCY: int = 32
+    ADMISSION_INTERACTIVE_QUEUE_SIZE: int = 200
+    ADMISSION_INTERACTIVE_QUEUE_TIMEOUT_SECONDS: float = 5.0
+    ADMISSION_BATCH_CONCURRENCY: int = 2
+    ADMISSION_BATCH_QUEUE_SIZE: int = 4
+    ADMISSION_BATCH_QUEUE_TIMEOUT_SECONDS: float = 30.0
+    ADMISSION_AI_CONCURRENCY: int = 4
+    ADMISSION_AI_QUEUE_SIZE: int = 8
+    ADMISSION_AI_QUEUE_TIMEOUT_SECONDS: float = 30.0
+    # Pool SQLAlchemy par processus : DATABASE_POOL_SIZE, sinon somme des concurrences
+    # d'admission divisée par WEB_CONCURRENCY (nombre de processus uvicorn/gunicorn).
+    # Connexions ouvertes au plus : WEB_CONCURRENCY × (pool + DATABASE_MAX_OVERFLOW),
+    # plus celles du worker de tâches ; le total doit rester sous max_connections
+    # de PostgreSQL (100 par défaut)
+    WEB_CONCURRENCY: int = 1
+    DATABASE_POOL_SIZE: Optional[int] = None
+    DATABASE_MAX_OVERFLOW: int = 5
+    
+    # Contrôle d'admission : appels aux fournisseurs externes par classe de trafic
+    PROVIDER_INTERACTIVE_CONCURRENCY: int = 16
+    PROVIDER_BATCH_CONCURRENCY: int = 4
+    PROVIDER_AI_CONCURRENCY: int = 2
+    PROVIDER_QUEUE_TIMEOUT_SECONDS: float = 10.0
+    
+    # Fournisseurs externes : délai d'appel et disjoncteurs
+    PROVIDER_TIMEOUT_SECONDS: float = 10.0
+    CIRCUIT_BREAKER_ERROR_RATE: float = 0.5
+    CIRCUIT_BREAKER_MIN_CALLS: int = 10
+    CIRCUIT_BREAKER_WINDOW_SECONDS: float = 60.0
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = 30.0
+    CIRCUIT_BREAKER_HALF_OPEN_PROBES: int = 1
+    
+    # Fournisseurs externes : relances et requêtes doublées (hedging)
+    PROVIDER_MAX_RETRIES: Dict[str, int] = {
+        "openweathermap": 2, "catnat": 2, "emdat": 2, "jba": 2, "fema": 2, "openai": 0
+    }
+    PROVIDER_HEDGED: List[str] = ["openweathermap", "catnat", "emdat", "jba", "fema"]
+    PROVIDER_HEDGE_QUANTILE: float = 0.95
+    PROVIDER_HEDGE_MIN_DELAY_SECONDS: float = 0.05
+    PROVIDER_RETRY_BASE_SECONDS: float = 0.2
+    PROVIDER_RETRY_MAX_SECONDS: float = 2.0
+    RETRY_BUDGET_RATIO: float = 0.1
+    RETRY_BUDGET_MIN_PER_SECOND: float = 1.0
+    RETRY_BUDGET_WINDOW_SECONDS: float = 10.0
+    
+    # Cache persistant des réponses des fournisseurs (0 = pas de cache)
+    PROVIDER_CACHE_ENABLED: bool = True
+    PROVIDER_CACHE_PATH: str = "data/provider_cache.sqlite3"
+    # Décimales des coordonnées dans la clé de cache : les sites voisins partagent une réponse
+    PROVIDER_CACHE_COORD_PRECISION: Dict[str, int] = {
+        "openweathermap": 2, "catnat": 3, "emdat": 2, "jba": 4, "fema": 4
+    }
+    PROVIDER_CACHE_TTL_SECONDS: Dict[str, int] = {
+        "openweathermap": 900,
+        "catnat": 7 * 24 * 3600,
+        "emdat": 7 * 24 * 3600,
+        "jba": 30 * 24 * 3600,
+        "fema": 30 * 24 * 3600
+    }
+    # Mode hors ligne : réponses servies uniquement depuis le cache (benchmarks, démonstrations)
+    PROVIDER_OFFLINE_MODE: bool = False
+    
+    # Quotas des fournisseurs (appels par minute), partagés entre processus
+    PROVIDER_RATE_LIMIT_PATH: str = "data/provider_rate_limits.sqlite3"
+    PROVIDER_RATE_LIMITS_PER_MINUTE: Dict[str, float] = {
+        "openweathermap": 60, "catnat": 60, "emdat": 60, "jba": 60, "fema": 60, "openai": 60
+    }
+    PROVIDER_RATE_LIMIT_BURST: int = 10
+    PROVIDER_RATE_LIMIT_MAX_WAIT_SECONDS: float = 30.0
+    
+    # Préchauffage planifié du cache des fournisseurs (par le worker)
+    PREWARM_ENABLED: bool = True
+    PREWARM_WEATHER_INTERVAL_MINUTES: int = 10
+    PREWARM_HAZARD_INTERVAL_HOURS: int = 24
+    # Cellules rafraîchies en parallèle ; part du quota de chaque fournisseur réservée au
+    # préchauffage, et jetons du seau commun toujours laissés aux requêtes interactives
+    PREWARM_CONCURRENCY: int = 4
+    PREWARM_RATE_LIMIT_SHARE: float = 0.5
+    PREWARM_RATE_LIMIT_HEADROOM: int = 3
+    
+    # Profilage à la demande d'une requête (en-tête X-Profile: <PROFILING_SECRET>)
+    PROFILING_ENABLED: bool = False
+    PROFILING_SECRET: Optional[str] = None
+    PROFILING_SAMPLE_INTERVAL_SECONDS: float = 0.001
+    PROFILING_OUTPUT_DIR: str = "data/profiles"
+    # Profils mémoire (en-tête X-Memory-Profile, tâches "memory_profile") et routes
+    # /api/v1/admin (en-tête X-Admin-Token: <PROFILING_SECRET>)
+    MEMORY_PROFILING_FRAMES: int = 10
+    MEMORY_PROFILING_TOP: int = 15
+    MEMORY_PROFILING_HISTORY: int = 20
+    
+    # Traces (spans par requête, tâche, requête SQL et appel fournisseur)
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATE: float = 0.1
+    TRACING_EXPORTERS: List[str] = ["stdout"]  # stdout, file, otlp
+    TRACING_FILE_PATH: str = "data/traces.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_MAX_SPANS_PER_TRACE: int = 2000
+    TRACING_QUEUE_SIZE: int = 1000
+    
+    # Logs (JSON sur la sortie standard, écrits par un thread dédié)
+    # Niveau global et par module, ex. "INFO,app.services.weather_service=DEBUG,sqlalchemy.engine=INFO"
+    # (sqlalchemy.engine=INFO journalise chaque requête SQL)
     LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json, text
+    LOG_QUEUE_SIZE: int = 10000
+    # Messages répétitifs (replis des fournisseurs) : au plus LOG_RATE_LIMIT_BURST par fenêtre
+    LOG_RATE_LIMIT_WINDOW_SECONDS: float = 60.0
+    LOG_RATE_LIMIT_BURST: int = 5
+    
+    # Réponses : JSON via orjson si installé, compression (brotli si installé, sinon gzip)
+    RESPONSE_COMPRESSION_ENABLED: bool = True
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024
+    RESPONSE_GZIP_LEVEL: int = 6
+    RESPONSE_BROTLI_QUALITY: int = 4
+    # Requêtes conditionnelles (ETag) : durée de réutilisation sans revalidation côté client
+    # (0 = revalidation à chaque requête, servie en 304 si rien n'a changé)
+    HTTP_CACHE_SITE_MAX_AGE_SECONDS: int = 0
+    HTTP_CACHE_RISK_MAX_AGE_SECONDS: int = 60
     
     class Config:
         env_file = ".env"
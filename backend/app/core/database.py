@@ -1,15 +1,40 @@
+import math
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.tracing import instrument_engine, tracer
+
+def _pool_size() -> int:
+    """Taille du pool de ce processus
+    
+    Une session par requête admise : les concurrences d'admission (38 par défaut) sont
+    réparties entre les WEB_CONCURRENCY processus, soit au plus
+    WEB_CONCURRENCY × (38 / WEB_CONCURRENCY + DATABASE_MAX_OVERFLOW) connexions pour
+    l'API (43 avec un processus, 60 avec 4) au lieu de 43 par processus. Au-delà, une
+    requête admise attend une connexion libre du pool.
+    """
+    if settings.DATABASE_POOL_SIZE:
+        return settings.DATABASE_POOL_SIZE
+    admitted = (
+        settings.ADMISSION_INTERACTIVE_CONCURRENCY
+        + settings.ADMISSION_BATCH_CONCURRENCY
+        + settings.ADMISSION_AI_CONCURRENCY
+    )
+    return max(1, math.ceil(admitted / max(1, settings.WEB_CONCURRENCY)))
 
 # Créer l'engine SQLAlchemy
+# Le débordement couvre les sessions hors admission (rafraîchissement du résumé, santé)
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    echo=settings.DEBUG
+    pool_size=_pool_size(),
+    max_overflow=settings.DATABASE_MAX_OVERFLOW
 )
 
+if tracer.enabled:
+    instrument_engine(engine)
+
 # Créer la session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
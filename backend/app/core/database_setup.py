@@ -0,0 +1,206 @@
+import logging
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Extensions PostgreSQL requises (créées aussi par database/init.sql)
+EXTENSIONS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+]
+
+# Geohash des sites (sans PostGIS), maintenu par trigger à l'insertion et à la mise à jour
+SCHEMA_CHANGES = [
+    """
+    CREATE OR REPLACE FUNCTION geohash_encode(lat float, lon float, hash_length int DEFAULT 9)
+    RETURNS varchar AS $$
+    DECLARE
+        base32 CONSTANT text := '0123456789bcdefghjkmnpqrstuvwxyz';
+        lat_min float := -90; lat_max float := 90;
+        lon_min float := -180; lon_max float := 180;
+        result text := '';
+        bit int := 0;
+        char_index int := 0;
+        even boolean := true;
+        mid float;
+    BEGIN
+        WHILE length(result) < hash_length LOOP
+            IF even THEN
+                mid := (lon_min + lon_max) / 2;
+                IF lon >= mid THEN char_index := char_index * 2 + 1; lon_min := mid;
+                ELSE char_index := char_index * 2; lon_max := mid; END IF;
+            ELSE
+                mid := (lat_min + lat_max) / 2;
+                IF lat >= mid THEN char_index := char_index * 2 + 1; lat_min := mid;
+                ELSE char_index := char_index * 2; lat_max := mid; END IF;
+            END IF;
+            even := NOT even;
+            bit := bit + 1;
+            IF bit = 5 THEN
+                result := result || substr(base32, char_index + 1, 1);
+                bit := 0;
+                char_index := 0;
+            END IF;
+        END LOOP;
+        RETURN result;
+    END;
+    $$ LANGUAGE plpgsql IMMUTABLE
+    """,
+    "ALTER TABLE sites ADD COLUMN IF NOT EXISTS geohash varchar(12)",
+    # Features calculées sur des données de repli (create_all n'ajoute pas la colonne)
+    "ALTER TABLE site_features ADD COLUMN IF NOT EXISTS degraded boolean NOT NULL DEFAULT false",
+    """
+    CREATE OR REPLACE FUNCTION sites_set_geohash() RETURNS trigger AS $$
+    BEGIN
+        NEW.geohash := geohash_encode(NEW.latitude, NEW.longitude, 9);
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_sites_geohash ON sites",
+    """
+    CREATE TRIGGER trg_sites_geohash
+    BEFORE INSERT OR UPDATE OF latitude, longitude ON sites
+    FOR EACH ROW EXECUTE FUNCTION sites_set_geohash()
+    """,
+    "UPDATE sites SET geohash = geohash_encode(latitude, longitude, 9) WHERE geohash IS NULL",
+    # Vue matérialisée sites_with_risk (remplace la vue simple de database/init.sql)
+    """
+    DO $$ BEGIN
+        IF EXISTS (SELECT 1 FROM pg_views WHERE schemaname = 'public' AND viewname = 'sites_with_risk') THEN
+            DROP VIEW sites_with_risk;
+        END IF;
+    END $$
+    """,
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS sites_with_risk AS
+    SELECT
+        s.id,
+        s.name,
+        s.city,
+        s.building_type,
+        s.building_value,
+        s.risk_score,
+        s.last_risk_update,
+        COUNT(c.id) AS contract_count,
+        COALESCE(SUM(c.premium_amount), 0) AS total_premiums
+    FROM sites s
+    LEFT JOIN insurance_contracts c ON s.id = c.site_id
+    GROUP BY s.id
+    """,
+    # Index unique requis pour REFRESH MATERIALIZED VIEW CONCURRENTLY
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_sites_with_risk_id ON sites_with_risk (id)",
+    # Historique des scores : table partitionnée par mois, lignes compactes, en ajout seul
+    """
+    CREATE TABLE IF NOT EXISTS site_risk_history (
+        site_id integer NOT NULL,
+        component smallint NOT NULL,
+        score real NOT NULL,
+        recorded_at timestamptz NOT NULL DEFAULT now()
+    ) PARTITION BY RANGE (recorded_at)
+    """,
+    "CREATE TABLE IF NOT EXISTS site_risk_history_default PARTITION OF site_risk_history DEFAULT",
+    # Agrégats journaliers et mensuels maintenus à chaque run de scoring
+    """
+    CREATE TABLE IF NOT EXISTS site_risk_daily (
+        site_id integer NOT NULL,
+        component smallint NOT NULL,
+        day date NOT NULL,
+        score_sum double precision NOT NULL,
+        score_count integer NOT NULL,
+        score_min real NOT NULL,
+        score_max real NOT NULL,
+        last_score real NOT NULL,
+        PRIMARY KEY (component, site_id, day)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS site_risk_monthly (
+        site_id integer NOT NULL,
+        component smallint NOT NULL,
+        month date NOT NULL,
+        score_sum double precision NOT NULL,
+        score_count integer NOT NULL,
+        score_min real NOT NULL,
+        score_max real NOT NULL,
+        last_score real NOT NULL,
+        PRIMARY KEY (component, site_id, month)
+    )
+    """,
+    # File de tâches longues consommée par worker.py (SELECT ... FOR UPDATE SKIP LOCKED)
+    """
+    CREATE TABLE IF NOT EXISTS tasks (
+        id bigserial PRIMARY KEY,
+        task_type varchar(64) NOT NULL,
+        payload jsonb NOT NULL DEFAULT '{}',
+        priority smallint NOT NULL DEFAULT 5,
+        status varchar(16) NOT NULL DEFAULT 'pending',
+        attempts integer NOT NULL DEFAULT 0,
+        max_attempts integer NOT NULL DEFAULT 3,
+        run_at timestamptz NOT NULL DEFAULT now(),
+        locked_by varchar(128),
+        locked_at timestamptz,
+        result jsonb,
+        error text,
+        created_at timestamptz NOT NULL DEFAULT now(),
+        started_at timestamptz,
+        finished_at timestamptz
+    )
+    """,
+]
+
+# Index non exprimables simplement dans les modèles, appliqués après create_all
+INDEXES = [
+    # Index de tri remplacés par leur forme coalesce (les NULL restent atteignables par le curseur)
+    "DROP INDEX IF EXISTS ix_sites_building_type_risk",
+    "DROP INDEX IF EXISTS ix_sites_city_risk",
+    "DROP INDEX IF EXISTS ix_sites_country_risk",
+    "DROP INDEX IF EXISTS ix_sites_building_value_id",
+    # Filtres de la liste des sites, avec le tri par score/id en suffixe (même expression que sort_key)
+    "CREATE INDEX IF NOT EXISTS ix_sites_building_type_risk_key ON sites (building_type, coalesce(risk_score, -1.0), id)",
+    "CREATE INDEX IF NOT EXISTS ix_sites_city_risk_key ON sites (lower(city), coalesce(risk_score, -1.0), id)",
+    "CREATE INDEX IF NOT EXISTS ix_sites_country_risk_key ON sites (lower(country), coalesce(risk_score, -1.0), id)",
+    # Tris par clé (valeur, id) pour la pagination par curseur
+    "CREATE INDEX IF NOT EXISTS ix_sites_risk_score_key_id ON sites (coalesce(risk_score, -1.0), id)",
+    "CREATE INDEX IF NOT EXISTS ix_sites_building_value_key_id ON sites (coalesce(building_value, -1.0), id)",
+    # Bornes min_risk/max_risk (comparaison sur la colonne elle-même)
+    "CREATE INDEX IF NOT EXISTS ix_sites_risk_score_id ON sites (risk_score, id)",
+    # Rectangle géographique
+    "CREATE INDEX IF NOT EXISTS ix_sites_lat_lon ON sites (latitude, longitude)",
+    # Préfixes geohash (LIKE 'u09t%')
+    "CREATE INDEX IF NOT EXISTS ix_sites_geohash ON sites (geohash varchar_pattern_ops)",
+    # Historique : BRIN sur l'horodatage (données insérées dans l'ordre), B-tree pour les séries par site
+    "CREATE INDEX IF NOT EXISTS ix_site_risk_history_recorded_brin ON site_risk_history USING brin (recorded_at)",
+    "CREATE INDEX IF NOT EXISTS ix_site_risk_history_site ON site_risk_history (site_id, component, recorded_at)",
+    "CREATE INDEX IF NOT EXISTS ix_site_risk_daily_day ON site_risk_daily (component, day)",
+    # Recherche approximative sur le nom et l'adresse
+    "CREATE INDEX IF NOT EXISTS ix_sites_name_trgm ON sites USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_sites_address_trgm ON sites USING gin (address gin_trgm_ops)",
+    # Tâches prêtes dans l'ordre de prise en charge, et baux expirés
+    "CREATE INDEX IF NOT EXISTS ix_tasks_ready ON tasks (priority DESC, run_at, id) WHERE status = 'pending'",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_running ON tasks (locked_at) WHERE status = 'running'",
+]
+
+def apply_database_setup(engine: Engine):
+    """Créer les extensions et index complémentaires (idempotent)"""
+    with engine.begin() as connection:
+        for statement in EXTENSIONS:
+            try:
+                with connection.begin_nested():
+                    connection.execute(text(statement))
+            except Exception as e:
+                logger.warning("Extension non disponible (%s): %s", statement, e)
+
+        for statement in SCHEMA_CHANGES:
+            try:
+                with connection.begin_nested():
+                    connection.execute(text(statement))
+            except Exception as e:
+                logger.warning("Modification de schéma non appliquée: %s", e)
+
+        for statement in INDEXES:
+            try:
+                with connection.begin_nested():
+                    connection.execute(text(statement))
+            except Exception as e:
+                logger.warning("Index non créé (%s): %s", statement, e)
@@ -0,0 +1,60 @@
+import hashlib
+import time
+from typing import Dict, Optional, Sequence
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+
+# Fournisseurs dont dépend chaque vue d'un site
+WEATHER_PROVIDERS = ("openweathermap",)
+DISASTER_PROVIDERS = ("catnat", "emdat")
+VULNERABILITY_PROVIDERS = ("jba", "fema")
+ALL_PROVIDERS = WEATHER_PROVIDERS + DISASTER_PROVIDERS + VULNERABILITY_PROVIDERS
+
+def provider_epoch(provider: str) -> int:
+    """Fenêtre de fraîcheur courante des réponses d'un fournisseur (durée de vie du cache)"""
+    ttl = settings.PROVIDER_CACHE_TTL_SECONDS.get(provider) or 3600
+    return int(time.time() // ttl)
+
+def site_etag(request: Request, site, view: str, providers: Sequence[str] = ()) -> str:
+    """ETag faible d'une vue d'un site
+
+    Dérivé de la version du site (updated_at, last_risk_update), de la fenêtre de
+    fraîcheur des fournisseurs utilisés et des paramètres de la requête (?fields=).
+    Faible : la même réponse peut être envoyée compressée ou non.
+    """
+    parts = [
+        view,
+        str(site.id),
+        str(site.updated_at or site.created_at),
+        str(site.last_risk_update),
+        request.url.query,
+        *(f"{provider}:{provider_epoch(provider)}" for provider in providers)
+    ]
+    digest = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def cache_control(max_age: int) -> str:
+    # 0 : le client revalide à chaque fois (réponse 304 sans recalcul si rien n'a changé)
+    return f"private, max-age={max_age}" if max_age > 0 else "private, no-cache"
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparaison faible (RFC 9110) de l'ETag avec l'en-tête If-None-Match"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+def check_not_modified(request: Request, response: Response, etag: str, max_age: int) -> Optional[Response]:
+    """Poser ETag et Cache-Control ; renvoyer une 304 si le client a déjà cette version
+
+    À appeler avant tout calcul : la route renvoie directement la 304 si elle est fournie.
+    """
+    headers: Dict[str, str] = {"ETag": etag, "Cache-Control": cache_control(max_age)}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
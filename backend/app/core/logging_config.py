@@ -0,0 +1,152 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.tracing import NOOP_SPAN, current_span
+
+# À passer en `extra` des messages répétitifs (repli d'un fournisseur) : limités par fenêtre
+RATE_LIMITED = {"rate_limited": True}
+
+# Attributs standard d'un LogRecord : les autres viennent de `extra` et sont exportés tels quels
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+def parse_log_levels(spec: str) -> Tuple[int, Dict[str, int]]:
+    """Niveau global et niveaux par module : "INFO,app.services.weather_service=DEBUG,sqlalchemy.engine=INFO" """
+    default = logging.INFO
+    levels = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, level = part.rpartition("=")
+        value = logging.getLevelName(level.strip().upper())
+        if not isinstance(value, int):
+            raise ValueError(f"Niveau de log inconnu: {level}")
+        if name:
+            levels[name.strip()] = value
+        else:
+            default = value
+    return default, levels
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par message : horodatage, niveau, module, message, champs `extra`, trace"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key != "rate_limited":
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Format lisible pour le développement, avec les champs `extra` en fin de ligne"""
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extra = " ".join(
+            f"{key}={value}" for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES and key != "rate_limited"
+        )
+        return f"{line} [{extra}]" if extra else line
+
+class RateLimitFilter(logging.Filter):
+    """Au plus `burst` messages par fenêtre pour un même modèle de message marqué RATE_LIMITED
+
+    Le nombre de messages supprimés est reporté (champ `suppressed`) sur le premier
+    message de la fenêtre suivante : une panne d'un fournisseur ne produit que quelques
+    lignes par minute au lieu d'une par site.
+    """
+    def __init__(self, window_seconds: float, burst: int):
+        super().__init__()
+        self.window_seconds = window_seconds
+        self.burst = burst
+        self._windows: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "rate_limited", False):
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.window_seconds:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+class ContextQueueHandler(QueueHandler):
+    """Mise en file sans I/O : le formatage et l'écriture ont lieu dans le thread du QueueListener
+
+    Le message est résolu et la trace courante attachée ici, dans le contexte de
+    l'appelant. File pleine : le message est abandonné et compté plutôt que d'attendre.
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        span = current_span()
+        if span is not NOOP_SPAN:
+            record.trace_id = span.trace.trace_id
+            record.span_id = span.span_id
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: Optional[QueueListener] = None
+
+def setup_logging():
+    """Configurer les logs du processus (API ou worker) ; sans effet si déjà fait"""
+    global _listener
+    if _listener is not None:
+        return
+
+    default_level, module_levels = parse_log_levels(settings.LOG_LEVEL)
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    handler = ContextQueueHandler(log_queue)
+    handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT_WINDOW_SECONDS, settings.LOG_RATE_LIMIT_BURST))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(default_level)
+    for name, level in module_levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    # Vider la file à l'arrêt du processus
+    atexit.register(_listener.stop)
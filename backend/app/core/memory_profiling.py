@@ -0,0 +1,221 @@
+import gc
+import hmac
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MEMORY_PROFILE_HEADER = b"x-memory-profile"
+
+# Racine du package app : les allocations sont attribuées à la ligne de l'application la plus proche
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Allocations du profileur, de tracemalloc et de la mécanique d'import, ignorées
+IGNORED_FILES = (
+    __file__, tracemalloc.__file__,
+    "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>"
+)
+
+MB = 1024 * 1024
+
+class MemoryProfileBusy(Exception):
+    """Un profil mémoire est déjà en cours : tracemalloc est global au processus"""
+
+def _location(frame) -> str:
+    filename = frame.filename
+    if filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    return f"{filename}:{frame.lineno}"
+
+def _accumulate(totals: Dict[str, List[int]], frame, diff):
+    location = totals.setdefault(_location(frame), [0, 0])
+    location[0] += diff.size_diff
+    location[1] += diff.count_diff
+
+def _top(diffs: List, limit: int) -> List[Dict]:
+    return [
+        {
+            "location": location,
+            "size_diff_kb": round(size / 1024, 1),
+            "count_diff": count,
+        }
+        for location, (size, count) in sorted(diffs, key=lambda item: item[1][0], reverse=True)[:limit]
+    ]
+
+class MemoryProfile:
+    """Pic mémoire et principaux sites d'allocation d'un traitement
+
+    Deux instantanés tracemalloc (avant, puis à la fin du traitement, résultat encore
+    en mémoire) sont comparés. Le pic couvre aussi les allocations libérées entre-temps.
+    Chaque allocation retenue est attribuée à sa ligne (`top_allocations`) et à la ligne
+    de l'application la plus récente de sa pile (`top_app_allocations`) : une liste
+    d'objets ORM créée par SQLAlchemy apparaît sur la route qui l'a demandée.
+    """
+    def __init__(self, label: str, sites: Optional[int] = None, frames: int = 10, top: int = 15):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.sites = sites
+        self.frames = frames
+        self.top = top
+        self.report: Optional[Dict] = None
+
+    def start(self):
+        self._was_tracing = tracemalloc.is_tracing()
+        if not self._was_tracing:
+            tracemalloc.start(self.frames)
+        gc.collect()
+        self._before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+
+    def stop(self) -> Dict:
+        duration = time.perf_counter() - self._started
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        if not self._was_tracing:
+            tracemalloc.stop()
+
+        filters = [tracemalloc.Filter(False, filename) for filename in IGNORED_FILES]
+        diffs = after.filter_traces(filters).compare_to(self._before.filter_traces(filters), "traceback")
+        self._before = None
+
+        by_line: Dict[str, List[int]] = {}
+        by_app_line: Dict[str, List[int]] = {}
+        for diff in diffs:
+            if diff.size_diff <= 0:
+                continue
+            # Piles triées de la plus ancienne à la plus récente trame
+            frames = list(diff.traceback)
+            app_frame = next((frame for frame in reversed(frames) if frame.filename.startswith(APP_ROOT)), None)
+            _accumulate(by_line, frames[-1], diff)
+            if app_frame is not None:
+                _accumulate(by_app_line, app_frame, diff)
+
+        peak_mb = (peak - self._baseline) / MB
+        self.report = {
+            "id": self.id,
+            "label": self.label,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(duration * 1000, 2),
+            "peak_mb": round(peak_mb, 3),
+            "retained_mb": round((current - self._baseline) / MB, 3),
+            "sites": self.sites,
+            "peak_mb_per_1k_sites": round(peak_mb * 1000 / self.sites, 3) if self.sites else None,
+            "top_allocations": _top(by_line.items(), self.top),
+            "top_app_allocations": _top(by_app_line.items(), self.top),
+        }
+        return self.report
+
+class MemoryProfiler:
+    """Profils mémoire à la demande (requête, tâche), un seul à la fois, derniers rapports conservés"""
+    def __init__(self):
+        self.frames = settings.MEMORY_PROFILING_FRAMES
+        self.top = settings.MEMORY_PROFILING_TOP
+        self.recent = deque(maxlen=settings.MEMORY_PROFILING_HISTORY)
+        self._lock = threading.Lock()
+
+    def begin(self, label: str, sites: Optional[int] = None) -> MemoryProfile:
+        if not self._lock.acquire(blocking=False):
+            raise MemoryProfileBusy(f"Profil mémoire déjà en cours, {label} non profilé")
+        profile = MemoryProfile(label, sites, self.frames, self.top)
+        try:
+            profile.start()
+        except BaseException:
+            self._lock.release()
+            raise
+        return profile
+
+    def end(self, profile: MemoryProfile) -> Dict:
+        try:
+            report = profile.stop()
+        finally:
+            self._lock.release()
+        self.recent.append(report)
+        logger.info("Profil mémoire %s %s: pic %s Mo, retenu %s Mo", report["id"], report["label"],
+                    report["peak_mb"], report["retained_mb"], extra={"memory_profile": report["id"]})
+        return report
+
+    @contextmanager
+    def profile(self, label: str, sites: Optional[int] = None) -> Iterator[MemoryProfile]:
+        """Profiler le bloc ; le rapport est disponible dans `profile.report` à la sortie"""
+        profile = self.begin(label, sites)
+        try:
+            yield profile
+        finally:
+            self.end(profile)
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        return next((report for report in self.recent if report["id"] == profile_id), None)
+
+    def stats(self) -> Dict:
+        traced, _ = tracemalloc.get_traced_memory()
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "profiling": self._lock.locked(),
+            "traced_mb": round(traced / MB, 3),
+            "profiles": [
+                {key: report[key] for key in ("id", "label", "started_at", "peak_mb", "retained_mb", "sites")}
+                for report in self.recent
+            ],
+        }
+
+class MemoryProfilingMiddleware:
+    """Profil mémoire à la demande d'une requête (en-tête X-Memory-Profile: <PROFILING_SECRET>)
+
+    Le profil s'arrête à l'envoi des en-têtes de la réponse ; il est résumé dans les
+    en-têtes X-Memory-* et consultable via /api/v1/admin/memory/profiles/{id}. Les
+    requêtes concurrentes allouent dans le même processus et faussent la mesure :
+    à réserver à un environnement calme.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.secret = (settings.PROFILING_SECRET or "").encode("utf-8")
+
+    def _requested(self, scope) -> bool:
+        if scope["type"] != "http" or not self.secret:
+            return False
+        for name, value in scope["headers"]:
+            if name == MEMORY_PROFILE_HEADER:
+                return hmac.compare_digest(value, self.secret)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if not self._requested(scope):
+            return await self.app(scope, receive, send)
+        try:
+            profile = memory_profiler.begin(f"{scope['method']} {scope['path']}")
+        except MemoryProfileBusy as e:
+            logger.info("%s", e)
+            return await self.app(scope, receive, send)
+
+        async def send_with_report(message):
+            if message["type"] == "http.response.start" and profile.report is None:
+                report = memory_profiler.end(profile)
+                message = {**message, "headers": [
+                    *message.get("headers", []),
+                    (b"x-memory-profile-id", report["id"].encode()),
+                    (b"x-memory-peak-mb", str(report["peak_mb"]).encode()),
+                    (b"x-memory-retained-mb", str(report["retained_mb"]).encode()),
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_report)
+        finally:
+            if profile.report is None:
+                memory_profiler.end(profile)
+
+# Instance globale du profileur mémoire
+memory_profiler = MemoryProfiler()
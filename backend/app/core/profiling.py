@@ -0,0 +1,246 @@
+import asyncio
+import hmac
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+
+# Profil de la requête en cours : hérité par les tâches créées pendant la requête
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    else:
+        filename = os.path.basename(filename)
+    # Le format replié réserve ';' (séparateur de pile)
+    return f"{code.co_qualname} ({filename})".replace(";", ":")
+
+def _awaited_frames(coro) -> List:
+    """Pile (de l'extérieur vers l'intérieur) d'une coroutine suspendue, via cr_await"""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+class RequestProfile:
+    """Profil par échantillonnage d'une requête
+
+    Un thread échantillonne la pile du thread de la boucle d'événements. Quand une tâche
+    de la requête s'exécute, l'échantillon est compté en CPU avec la pile courante ;
+    sinon la requête attend (réseau, base, file d'admission) et l'échantillon est compté
+    en attente avec la pile de suspension (cr_await) de sa tâche la plus récente.
+    """
+    def __init__(self, label: str, interval: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.interval = interval
+        self.tasks = weakref.WeakSet()
+        self._task_refs = []
+        self.stacks = Counter()
+        self.samples = 0
+        self.cpu_seconds = 0.0
+        self.await_seconds = 0.0
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+        self.stopped = False
+
+    def add_task(self, task: asyncio.Task):
+        self.tasks.add(task)
+        self._task_refs.append(weakref.ref(task))
+
+    def start(self):
+        self.add_task(asyncio.current_task())
+        self.started_at = time.perf_counter()
+        self._sampler.start()
+
+    def stop(self):
+        self.stopped = True
+        self._stop.set()
+        self._sampler.join()
+        self.wall_seconds = time.perf_counter() - self.started_at
+
+    def _run(self):
+        # Chaque échantillon pèse le temps écoulé depuis le précédent : le thread
+        # d'échantillonnage attend le GIL quand la boucle calcule, ce qui espace les mesures
+        last = self.started_at
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample(now - last)
+            last = now
+
+    def _sample(self, weight: float):
+        running = asyncio.tasks._current_tasks.get(self._loop)
+        if running is not None and running in self.tasks:
+            frame = sys._current_frames().get(self._loop_thread)
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                frame = frame.f_back
+            frames.reverse()
+            root = running.get_coro().cr_code if hasattr(running.get_coro(), "cr_code") else None
+            # Ne garder que la pile de la tâche (sans la mécanique de la boucle)
+            for index, candidate in enumerate(frames):
+                if candidate.f_code is root:
+                    frames = frames[index:]
+                    break
+            self.samples += 1
+            self.cpu_seconds += weight
+            self.stacks[("cpu", *(_frame_label(frame.f_code) for frame in frames))] += weight
+            return
+
+        pending = [task for task in (ref() for ref in list(self._task_refs)) if task is not None and not task.done()]
+        if not pending:
+            return
+        # La tâche la plus récente est la plus profonde (route, appel d'un fournisseur...)
+        frames = _awaited_frames(pending[-1].get_coro())
+        self.samples += 1
+        self.await_seconds += weight
+        self.stacks[("await", *(_frame_label(frame.f_code) for frame in frames))] += weight
+
+    def summary(self) -> dict:
+        sampled = self.cpu_seconds + self.await_seconds
+        cpu_share = self.cpu_seconds / sampled if sampled else 0.0
+        return {
+            "id": self.id,
+            "request": self.label,
+            "wall_ms": round(self.wall_seconds * 1000, 2),
+            "cpu_ms": round(self.wall_seconds * cpu_share * 1000, 2),
+            "await_ms": round(self.wall_seconds * (1 - cpu_share) * 1000, 2),
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+        }
+
+    def folded(self) -> str:
+        """Format replié (flamegraph.pl, speedscope) : 'cadre;cadre;... durée_µs' par ligne"""
+        return "".join(
+            f"{';'.join(stack)} {round(seconds * 1e6)}\n" for stack, seconds in self.stacks.most_common()
+        )
+
+    def save(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", self.label).strip("-")[:80]
+        path = os.path.join(directory, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{slug}-{self.id}.folded")
+        with open(path, "w") as profile_file:
+            profile_file.write(self.folded())
+        return path
+
+class _ProfilingTaskFactory:
+    """Fabrique de tâches de la boucle pendant les profils en cours
+
+    Rattache au profil les tâches créées par la requête profilée et délègue la création
+    à la fabrique installée auparavant, rétablie quand plus aucun profil n'est actif.
+    """
+    def __init__(self, previous):
+        self.previous = previous
+        self.active = 0
+
+    def __call__(self, loop, coro, **kwargs):
+        context = kwargs.get("context")
+        profile = context.get(_current_profile) if context is not None else _current_profile.get()
+        if self.previous is not None:
+            task = self.previous(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        if profile is not None:
+            profile.add_task(task)
+        return task
+
+def _acquire_task_factory(loop) -> _ProfilingTaskFactory:
+    factory = loop.get_task_factory()
+    if not isinstance(factory, _ProfilingTaskFactory):
+        factory = _ProfilingTaskFactory(factory)
+        loop.set_task_factory(factory)
+    factory.active += 1
+    return factory
+
+def _release_task_factory(loop, factory: _ProfilingTaskFactory):
+    factory.active -= 1
+    # Remplacée entre-temps par une autre fabrique (qui nous délègue) : la laisser en place
+    if factory.active == 0 and loop.get_task_factory() is factory:
+        loop.set_task_factory(factory.previous)
+
+class ProfilingMiddleware:
+    """Profilage à la demande d'une requête (en-tête X-Profile: <PROFILING_SECRET>)
+
+    Installé seulement si PROFILING_ENABLED : les autres requêtes ne paient qu'une
+    lecture d'en-tête. Le profil (format replié, compatible flamegraph) est écrit dans
+    PROFILING_OUTPUT_DIR et résumé dans les en-têtes X-Profile-* de la réponse. Les
+    routes synchrones exécutées dans le pool de threads apparaissent comme de l'attente.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.secret = (settings.PROFILING_SECRET or "").encode("utf-8")
+        self.interval = settings.PROFILING_SAMPLE_INTERVAL_SECONDS
+        self.output_dir = settings.PROFILING_OUTPUT_DIR
+        if not self.secret:
+            logger.warning("PROFILING_SECRET non configuré - Profilage à la demande désactivé")
+
+    def _requested(self, scope) -> bool:
+        if scope["type"] != "http" or not self.secret:
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return hmac.compare_digest(value, self.secret)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if not self._requested(scope):
+            return await self.app(scope, receive, send)
+
+        loop = asyncio.get_running_loop()
+        profile = RequestProfile(f"{scope['method']} {scope['path']}", self.interval)
+        token = _current_profile.set(profile)
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start" and not profile.stopped:
+                message = {**message, "headers": [*message.get("headers", []), *self._finish(profile)]}
+            await send(message)
+
+        profile.start()
+        factory = _acquire_task_factory(loop)
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            if not profile.stopped:
+                self._finish(profile)
+            _current_profile.reset(token)
+            _release_task_factory(loop, factory)
+
+    def _finish(self, profile: RequestProfile) -> List:
+        # Arrêt à l'envoi des en-têtes : le corps d'une réponse en flux n'est pas profilé
+        profile.stop()
+        summary = profile.summary()
+        try:
+            summary["file"] = profile.save(self.output_dir)
+        except OSError as e:
+            logger.warning("Impossible d'écrire le profil %s: %s", profile.id, e)
+        logger.info("Profil %s %s: %s ms (CPU %s ms, attente %s ms)", summary["id"], summary["request"],
+                    summary["wall_ms"], summary["cpu_ms"], summary["await_ms"], extra={"profile": summary})
+        return [
+            (b"x-profile-id", summary["id"].encode()),
+            (b"x-profile-wall-ms", str(summary["wall_ms"]).encode()),
+            (b"x-profile-cpu-ms", str(summary["cpu_ms"]).encode()),
+            (b"x-profile-await-ms", str(summary["await_ms"]).encode()),
+        ]
@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    provider TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+class SharedRateLimiter:
+    """Seaux à jetons par fournisseur, partagés entre processus via un fichier SQLite
+
+    Chaque appel réserve un jeton sous verrou d'écriture (BEGIN IMMEDIATE). Si le seau
+    est vide, le jeton est pris à découvert et l'appelant reçoit le délai à attendre :
+    les appels sont mis en file dans l'ordre d'arrivée au lieu d'échouer.
+
+    `reserve` est bloquant (attente du verrou SQLite) : il est appelé depuis un thread
+    (une connexion par thread), jamais sur la boucle d'événements.
+    """
+    def __init__(self, path: str, rates_per_minute: Dict[str, float], burst: int):
+        self.path = path
+        self.rates_per_minute = rates_per_minute
+        self.burst = burst
+        self.throttled_calls = {}
+        self.throttled_seconds = {}
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def _tokens(self, connection: sqlite3.Connection, bucket: str, rate: float, burst: float, now: float) -> float:
+        row = connection.execute(
+            "SELECT tokens, updated_at FROM buckets WHERE provider = ?", (bucket,)
+        ).fetchone()
+        return float(burst) if row is None else min(float(burst), row[0] + (now - row[1]) * rate)
+
+    def _store(self, connection: sqlite3.Connection, bucket: str, tokens: float, now: float):
+        connection.execute(
+            "INSERT OR REPLACE INTO buckets (provider, tokens, updated_at) VALUES (?, ?, ?)",
+            (bucket, tokens, now)
+        )
+
+    def reserve(self, provider: str, max_wait: float) -> Optional[float]:
+        """Réserver un jeton : délai d'attente en secondes, ou None si l'attente dépasse `max_wait`"""
+        rate_per_minute = self.rates_per_minute.get(provider)
+        if not rate_per_minute:
+            return 0.0
+        rate = rate_per_minute / 60.0
+
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            tokens = self._tokens(connection, provider, rate, self.burst, now)
+
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if wait > max_wait:
+                connection.execute("ROLLBACK")
+                return None
+
+            self._store(connection, provider, tokens - 1, now)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        if wait > 0:
+            with self._stats_lock:
+                self.throttled_calls[provider] = self.throttled_calls.get(provider, 0) + 1
+                self.throttled_seconds[provider] = self.throttled_seconds.get(provider, 0.0) + wait
+        return wait
+
+    def try_acquire_background(self, provider: str, share: float, headroom: float) -> float:
+        """Prendre un jeton pour le trafic de fond (préchauffage), sans découvert
+
+        Le jeton est pris dans le seau commun seulement s'il y reste `headroom` jetons
+        pour les requêtes interactives, et dans un seau propre au trafic de fond limité
+        à `share` du débit. Renvoie 0 si le jeton est pris, sinon le délai avant de réessayer
+        (rien n'est réservé : les requêtes interactives passent en priorité).
+        """
+        rate_per_minute = self.rates_per_minute.get(provider)
+        if not rate_per_minute:
+            return 0.0
+        rate = rate_per_minute / 60.0
+        background_rate = rate * share
+        background_burst = max(1.0, self.burst * share)
+        background = f"{provider}:background"
+        # Au-delà, le seau commun ne laisserait jamais passer le trafic de fond
+        headroom = min(headroom, self.burst - 1)
+
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            tokens = self._tokens(connection, provider, rate, self.burst, now)
+            background_tokens = self._tokens(connection, background, background_rate, background_burst, now)
+
+            wait = max(
+                0.0 if tokens - 1 >= headroom else (1 + headroom - tokens) / rate,
+                0.0 if background_tokens >= 1 else (1 - background_tokens) / background_rate
+            )
+            if wait > 0:
+                connection.execute("ROLLBACK")
+                return wait
+
+            self._store(connection, provider, tokens - 1, now)
+            self._store(connection, background, background_tokens - 1, now)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return 0.0
+
+    def stats(self, provider: str) -> Dict:
+        return {
+            "rate_per_minute": self.rates_per_minute.get(provider),
+            "throttled_calls": self.throttled_calls.get(provider, 0),
+            "throttled_seconds": round(self.throttled_seconds.get(provider, 0.0), 2)
+        }
@@ -0,0 +1,98 @@
+import json
+from contextvars import ContextVar
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Optional
+
+import numpy as np
+from fastapi import Query
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Dépendance optionnelle : repli sur json
+    orjson = None
+
+# Champs demandés par la requête en cours (?fields=), appliqués au rendu de la réponse
+_requested_fields: ContextVar[Optional[Dict]] = ContextVar("requested_fields", default=None)
+
+def parse_fields(spec: str) -> Optional[Dict]:
+    """Arbre des champs à conserver : "site_id,comprehensive_analysis.comprehensive_risk.global_risk_score" """
+    tree: Dict = {}
+    for path in spec.split(","):
+        keys = [key.strip() for key in path.split(".") if key.strip()]
+        if not keys:
+            continue
+        node = tree
+        for key in keys[:-1]:
+            child = node.get(key)
+            if child is True:
+                break
+            node = node.setdefault(key, {})
+        else:
+            node[keys[-1]] = True
+    return tree or None
+
+def select_fields(content: Any, tree: Dict) -> Any:
+    """Ne garder que les champs de l'arbre ; les listes sont filtrées élément par élément"""
+    if hasattr(content, "to_dict"):
+        content = content.to_dict()
+    if isinstance(content, dict):
+        return {
+            key: content[key] if subtree is True else select_fields(content[key], subtree)
+            for key, subtree in tree.items() if key in content
+        }
+    if isinstance(content, list):
+        return [select_fields(item, tree) for item in content]
+    return content
+
+async def sparse_fieldset(
+    fields: Optional[str] = Query(None, description="Champs à renvoyer, séparés par des virgules (chemins pointés)")
+):
+    """Dépendance des routes de l'API : mémorise ?fields= pour le rendu de la réponse
+
+    Le filtre est retiré à la fin de la requête : il ne s'applique pas aux réponses
+    suivantes rendues dans le même contexte.
+    """
+    if not fields:
+        yield
+        return
+    token = _requested_fields.set(parse_fields(fields))
+    try:
+        yield
+    finally:
+        _requested_fields.reset(token)
+
+def _default(obj):
+    # Résultats des services de risque (to_dict) et types non natifs de json
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Type non sérialisable en JSON: {type(obj).__name__}")
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """Réponse JSON par défaut : orjson si installé, filtrage ?fields= avant sérialisation
+
+    Une route peut la renvoyer directement avec un contenu déjà compatible JSON (ou des
+    résultats de risque) pour éviter le passage par jsonable_encoder de FastAPI.
+    """
+    def render(self, content: Any) -> bytes:
+        tree = _requested_fields.get()
+        if tree is not None:
+            content = select_fields(content, tree)
+        return dumps(content)
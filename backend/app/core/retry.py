@@ -0,0 +1,66 @@
+import random
+import time
+from collections import deque
+from typing import Dict, Optional
+
+class RetryBudget:
+    """Budget de relances partagé par tous les fournisseurs
+
+    Les relances et requêtes doublées (hedging) sont limitées à une fraction des
+    requêtes de la fenêtre glissante, avec un plancher par seconde : pendant une
+    panne, les relances ne peuvent pas multiplier la charge sur le fournisseur.
+    """
+    def __init__(self, ratio: float, min_per_second: float, window_seconds: float):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window_seconds = window_seconds
+        self.exhausted = 0
+        self._requests = deque()
+        self._spent = deque()
+
+    def _trim(self, now: float):
+        for events in (self._requests, self._spent):
+            while events and now - events[0] > self.window_seconds:
+                events.popleft()
+
+    def record_request(self):
+        self._requests.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        """Consommer une relance si le budget le permet"""
+        now = time.monotonic()
+        self._trim(now)
+        allowed = max(self.min_per_second * self.window_seconds, self.ratio * len(self._requests))
+        if len(self._spent) >= allowed:
+            self.exhausted += 1
+            return False
+        self._spent.append(now)
+        return True
+
+    def stats(self) -> Dict:
+        self._trim(time.monotonic())
+        return {
+            "window_requests": len(self._requests),
+            "window_retries": len(self._spent),
+            "exhausted": self.exhausted
+        }
+
+class LatencyTracker:
+    """Latences récentes des appels réussis d'un fournisseur"""
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=size)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile des latences, ou None tant que l'échantillon est trop petit"""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def backoff_delay(attempt: int, base_seconds: float, max_seconds: float) -> float:
+    """Délai exponentiel avec gigue complète (« full jitter ») avant la relance `attempt`"""
+    return random.uniform(0, min(max_seconds, base_seconds * 2 ** (attempt - 1)))
@@ -0,0 +1,363 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "risk-insight-backend"
+
+# En-tête W3C Trace Context : version-trace_id-parent_id-flags
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+class Span:
+    """Opération chronométrée d'une trace"""
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict:
+        if self.end_ns is None:
+            # Span encore ouvert à la fin de la racine (tâche lancée en arrière-plan)
+            self.attributes["unfinished"] = True
+            self.end_ns = time.time_ns()
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_unix_nano": self.start_ns,
+            "end_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+class _NoopSpan:
+    """Span des requêtes non échantillonnées : aucune allocation ni mesure"""
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class Trace:
+    """Spans d'une requête ou d'une tâche, exportés à la fin de la racine"""
+    __slots__ = ("trace_id", "spans", "dropped")
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self.dropped = 0
+
+# Span courant : hérité par les tâches asyncio et le pool de threads (copie du contexte)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+class StdoutExporter:
+    """Une ligne JSON par span sur la sortie standard"""
+    def export(self, spans: List[Dict]):
+        for span in spans:
+            sys.stdout.write(json.dumps(span, default=str) + "\n")
+        sys.stdout.flush()
+
+class FileExporter:
+    """Spans ajoutés en JSON Lines à un fichier local"""
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Dict]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as trace_file:
+            for span in spans:
+                trace_file.write(json.dumps(span, default=str) + "\n")
+
+def _otlp_value(value: Any) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class OtlpExporter:
+    """Envoi au format OTLP/HTTP JSON vers un collecteur (OpenTelemetry Collector, Jaeger, Tempo)"""
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def payload(self, spans: List[Dict]) -> Dict:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{
+                "scope": {"name": "app.core.tracing"},
+                "spans": [{
+                    "traceId": span["trace_id"],
+                    "spanId": span["span_id"],
+                    "parentSpanId": span["parent_id"] or "",
+                    "name": span["name"],
+                    "kind": 1,
+                    "startTimeUnixNano": str(span["start_unix_nano"]),
+                    "endTimeUnixNano": str(span["end_unix_nano"]),
+                    "attributes": [
+                        {"key": key, "value": _otlp_value(value)} for key, value in span["attributes"].items()
+                    ],
+                    # 1 = OK, 2 = ERROR
+                    "status": {"code": 2, "message": span["error"]} if span["error"] else {"code": 1},
+                } for span in spans]
+            }]
+        }]}
+
+    def export(self, spans: List[Dict]):
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(self.payload(spans), default=str).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+def _build_exporters() -> List:
+    exporters = []
+    for name in settings.TRACING_EXPORTERS:
+        if name == "stdout":
+            exporters.append(StdoutExporter())
+        elif name == "file":
+            exporters.append(FileExporter(settings.TRACING_FILE_PATH))
+        elif name == "otlp":
+            exporters.append(OtlpExporter(settings.TRACING_OTLP_ENDPOINT))
+        else:
+            logger.warning("Exporteur de traces inconnu: %s", name)
+    return exporters
+
+class Tracer:
+    """Traces légères propagées par contextvars
+
+    L'échantillonnage est décidé à la racine (requête HTTP ou tâche du worker) : hors
+    trace échantillonnée, `span()` ne coûte qu'une lecture de contextvar. Les traces
+    terminées sont exportées par un thread dédié, jamais sur la boucle d'événements.
+    """
+    def __init__(self):
+        self.enabled = settings.TRACING_ENABLED
+        self.sample_rate = settings.TRACING_SAMPLE_RATE
+        self.max_spans = settings.TRACING_MAX_SPANS_PER_TRACE
+        self.exporters = _build_exporters() if self.enabled else []
+        self._queue: "queue.Queue[Trace]" = queue.Queue(maxsize=settings.TRACING_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self.exported = 0
+        self.dropped_traces = 0
+
+    def _export_loop(self):
+        while True:
+            trace = self._queue.get()
+            # Sérialisation dans ce thread : la boucle d'événements ne fait que mettre en file
+            spans = [span.to_dict() for span in trace.spans]
+            if trace.dropped:
+                spans[0]["attributes"]["dropped_spans"] = trace.dropped
+            for exporter in self.exporters:
+                try:
+                    exporter.export(spans)
+                except Exception as e:
+                    # RATE_LIMITED de logging_config, non importable ici (logging_config importe ce module)
+                    logger.warning("Export de trace impossible (%s): %s", type(exporter).__name__, e,
+                                   extra={"rate_limited": True})
+            self.exported += 1
+
+    def _submit(self, trace: Trace):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._export_loop, name="trace-exporter", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped_traces += 1
+
+    def _sampled(self, traceparent: Optional[str]) -> Tuple[Optional[str], Optional[str], bool]:
+        match = TRACEPARENT.match(traceparent or "")
+        if match:
+            # Décision de l'appelant (drapeau sampled)
+            return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+        return None, None, random.random() < self.sample_rate
+
+    @contextmanager
+    def root_span(self, name: str, traceparent: Optional[str] = None, **attributes) -> Iterator:
+        """Démarrer une trace (requête, tâche) si elle est échantillonnée"""
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+        trace_id, parent_id, sampled = self._sampled(traceparent)
+        if not sampled:
+            yield NOOP_SPAN
+            return
+
+        trace = Trace(trace_id)
+        try:
+            with self._open(trace, name, parent_id, attributes) as span:
+                yield span
+        finally:
+            self._submit(trace)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator:
+        """Span enfant du span courant (aucun effet hors trace échantillonnée)"""
+        parent = _current_span.get()
+        if parent is None:
+            yield NOOP_SPAN
+            return
+        trace = parent.trace
+        if len(trace.spans) >= self.max_spans:
+            trace.dropped += 1
+            yield NOOP_SPAN
+            return
+        with self._open(trace, name, parent.span_id, attributes) as span:
+            yield span
+
+    @contextmanager
+    def _open(self, trace: Trace, name: str, parent_id: Optional[str], attributes: Dict) -> Iterator[Span]:
+        span = Span(trace, name, parent_id, attributes)
+        trace.spans.append(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+
+    def start_span(self, name: str, **attributes) -> Optional[Span]:
+        """Ouvrir un span sans bloc `with` (hooks SQLAlchemy) ; le fermer avec `end_span`"""
+        parent = _current_span.get()
+        if parent is None or len(parent.trace.spans) >= self.max_spans:
+            if parent is not None:
+                parent.trace.dropped += 1
+            return None
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        parent.trace.spans.append(span)
+        return span
+
+    def end_span(self, span: Optional[Span], error: Optional[str] = None):
+        if span is not None:
+            span.end_ns = time.time_ns()
+            span.error = error
+
+    def traced(self, name: str):
+        """Décorateur : exécuter la fonction (synchrone ou coroutine) dans un span"""
+        def decorate(function):
+            if inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    if _current_span.get() is None:
+                        return await function(*args, **kwargs)
+                    with self.span(name):
+                        return await function(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return function(*args, **kwargs)
+                with self.span(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "exported_traces": self.exported,
+            "dropped_traces": self.dropped_traces,
+            "queued_traces": self._queue.qsize(),
+        }
+
+def instrument_engine(engine):
+    """Un span par requête SQL exécutée pendant une trace échantillonnée"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None and _current_span.get() is not None:
+            context._trace_span = tracer.start_span(
+                "db.query", **{"db.statement": statement[:500], "db.executemany": executemany}
+            )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            tracer.end_span(getattr(context, "_trace_span", None))
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        context = exception_context.execution_context
+        if context is not None:
+            tracer.end_span(getattr(context, "_trace_span", None), error=str(exception_context.original_exception))
+
+def current_span():
+    """Span courant, pour ajouter des attributs (NOOP_SPAN hors trace)"""
+    return _current_span.get() or NOOP_SPAN
+
+class TracingMiddleware:
+    """Span racine par requête HTTP, avec propagation de l'en-tête traceparent entrant"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            return await self.app(scope, receive, send)
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        with tracer.root_span(f"{scope['method']} {scope['path']}", traceparent,
+                              **{"http.method": scope["method"], "http.target": scope["path"]}) as span:
+            if span is NOOP_SPAN:
+                return await self.app(scope, receive, send)
+
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    span.set(**{"http.status_code": message["status"]})
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # Paramètres de chemin renseignés par le routeur (site_id, task_id...)
+                for key, value in (scope.get("path_params") or {}).items():
+                    span.set(**{key: value})
+                route = scope.get("route")
+                if route is not None:
+                    span.set(**{"http.route": route.path})
+
+# Instance globale du traceur
+tracer = Tracer()
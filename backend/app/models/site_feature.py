@@ -0,0 +1,52 @@
+from sqlalchemy import Boolean, Column, Integer, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+class SiteFeature(Base):
+    """Features de scoring matérialisées par site et par version"""
+    __tablename__ = "site_features"
+
+    site_id = Column(Integer, ForeignKey("sites.id", ondelete="CASCADE"), primary_key=True)
+    feature_version = Column(Integer, primary_key=True)
+
+    # Empreinte des attributs du site utilisés pour calculer les features
+    input_hash = Column(String(64), nullable=False)
+    # Calculées sur des données de repli (fournisseur en erreur) : durée de vie courte
+    degraded = Column(Boolean, nullable=False, default=False, server_default="false")
+
+    # Attributs du site
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    building_type = Column(String(50), nullable=False)
+    building_value = Column(Float, nullable=False)
+
+    # Météo
+    temperature = Column(Float)
+    humidity = Column(Float)
+    wind_speed = Column(Float)
+    rain_1h = Column(Float)
+    snow_1h = Column(Float)
+    weather_score = Column(Float, nullable=False)
+    weather_is_real = Column(Integer, nullable=False, default=0)
+
+    # Catastrophes
+    disaster_count = Column(Integer, nullable=False, default=0)
+    recent_disaster_count = Column(Integer, nullable=False, default=0)
+    catnat_count = Column(Integer, nullable=False, default=0)
+    emdat_count = Column(Integer, nullable=False, default=0)
+    days_since_last_disaster = Column(Integer)
+    disaster_score = Column(Float, nullable=False)
+
+    # Vulnérabilité
+    flood_probability = Column(Float)
+    earthquake_probability = Column(Float)
+    wind_probability = Column(Float)
+    subsidence_probability = Column(Float)
+    vulnerability_score = Column(Float, nullable=False)
+
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_site_features_version_computed", "feature_version", "computed_at"),
+    )
@@ -42,4 +42,7 @@ class SiteResponse(SiteBase):
     updated_at: Optional[datetime] = None
     
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class NearbySiteResponse(SiteResponse):
+    distance_km: float = Field(..., description="Distance au point de recherche en km")
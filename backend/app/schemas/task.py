@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+class TaskCreate(BaseModel):
+    task_type: str = Field(..., description="Type de tâche (rescore_all_sites, import_sites_csv, strategic_recommendations, prewarm_weather, prewarm_hazards)")
+    payload: Dict[str, Any] = Field(default_factory=dict, description="Paramètres de la tâche (memory_profile: true ajoute un rapport mémoire au résultat)")
+    priority: int = Field(default=5, ge=0, le=9, description="Priorité de 0 (arrière-plan) à 9 (urgent)")
+    max_attempts: Optional[int] = Field(default=None, ge=1, le=20, description="Nombre maximal d'essais")
+
+class TaskSummary(BaseModel):
+    """Tâche sans ses paramètres (liste des tâches)"""
+    id: int
+    task_type: str
+    priority: int
+    status: str
+    attempts: int
+    max_attempts: int
+    run_at: datetime
+    locked_by: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class TaskResponse(TaskSummary):
+    payload: Dict[str, Any]
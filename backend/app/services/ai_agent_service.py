@@ -1,5 +1,6 @@
 import os
 import json
+import logging
 import random
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
@@ -10,6 +11,12 @@ from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 import asyncio
 
+from app.services.provider_client import provider_client
+from app.core.tracing import tracer
+from app.core.logging_config import RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
 class AIAgentService:
     def __init__(self):
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -22,12 +29,13 @@ class AIAgentService:
                 )
                 self.ai_available = True
             except Exception as e:
-                print(f"Erreur OpenAI: {e}")
+                logger.error("Erreur OpenAI: %s", e)
                 self.ai_available = False
         else:
-            print("⚠️  OPENAI_API_KEY non configurée - Utilisation des recommandations par défaut")
+            logger.warning("OPENAI_API_KEY non configurée - Utilisation des recommandations par défaut")
             self.ai_available = False
 
+    @tracer.traced("ai.analyze_contract_profitability")
     async def analyze_contract_profitability(self, contract_data: Dict, site_data: Dict, risk_data: Dict) -> Dict:
         """Analyse la rentabilité d'un contrat spécifique"""
         if self.ai_available:
@@ -60,7 +68,9 @@ class AIAgentService:
                 5. Niveau de confiance (0-1)
                 """
                 
-                response = await self.llm.agenerate([[HumanMessage(content=prompt)]])
+                response = await provider_client.call(
+                    "openai", lambda: self.llm.agenerate([[HumanMessage(content=prompt)]])
+                )
                 analysis = response.generations[0][0].text
                 
                 return {
@@ -80,12 +90,12 @@ class AIAgentService:
                     }
                 }
             except Exception as e:
-                print(f"Erreur analyse contrat: {e}")
-                print("⚠️  Utilisation de l'analyse par défaut")
+                logger.warning("Erreur analyse contrat: %s - Utilisation de l'analyse par défaut", e, extra=RATE_LIMITED)
                 return self._get_default_contract_analysis(contract_data, site_data, risk_data)
         else:
             return self._get_default_contract_analysis(contract_data, site_data, risk_data)
 
+    @tracer.traced("ai.get_strategic_recommendations")
     async def get_strategic_recommendations(self, portfolio_data: Dict) -> Dict:
         """Recommandations stratégiques pour le portefeuille"""
         if self.ai_available:
@@ -114,7 +124,9 @@ class AIAgentService:
                 6. OPTIMISATION DES COÛTS
                 """
                 
-                response = await self.llm.agenerate([[HumanMessage(content=prompt)]])
+                response = await provider_client.call(
+                    "openai", lambda: self.llm.agenerate([[HumanMessage(content=prompt)]])
+                )
                 analysis = response.generations[0][0].text
                 
                 return {
@@ -135,12 +147,12 @@ class AIAgentService:
                     "portfolio_data": portfolio_data
                 }
             except Exception as e:
-                print(f"Erreur recommandations stratégiques: {e}")
-                print("⚠️  Utilisation des recommandations par défaut")
+                logger.warning("Erreur recommandations stratégiques: %s - Utilisation des recommandations par défaut", e, extra=RATE_LIMITED)
                 return self._get_default_strategic_recommendations(portfolio_data)
         else:
             return self._get_default_strategic_recommendations(portfolio_data)
 
+    @tracer.traced("ai.analyze_risk_mitigation")
     async def analyze_risk_mitigation(self, site_data: Dict, risk_data: Dict) -> Dict:
         """Analyse des mesures de mitigation des risques"""
         if self.ai_available:
@@ -162,7 +174,9 @@ class AIAgentService:
                 Proposez des mesures de mitigation spécifiques et des clauses contractuelles adaptées.
                 """
                 
-                response = await self.llm.agenerate([[HumanMessage(content=prompt)]])
+                response = await provider_client.call(
+                    "openai", lambda: self.llm.agenerate([[HumanMessage(content=prompt)]])
+                )
                 analysis = response.generations[0][0].text
                 
                 return {
@@ -175,8 +189,7 @@ class AIAgentService:
                     }
                 }
             except Exception as e:
-                print(f"Erreur analyse mitigation: {e}")
-                print("⚠️  Utilisation de l'analyse par défaut")
+                logger.warning("Erreur analyse mitigation: %s - Utilisation de l'analyse par défaut", e, extra=RATE_LIMITED)
                 return self._get_default_mitigation_analysis(site_data, risk_data)
         else:
             return self._get_default_mitigation_analysis(site_data, risk_data)
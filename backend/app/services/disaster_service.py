@@ -1,11 +1,97 @@
 import httpx
 import asyncio
-from typing import Dict, List, Optional
+import logging
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from app.core.config import settings
+from app.core.logging_config import RATE_LIMITED
+from app.core.tracing import tracer
+from app.services.provider_client import provider_client, record_fallback, ProviderUnavailable
+from app.services.risk_results import DisasterAssessment, DisasterRisk
+from app.utils.noise import REGIONS, CoordinateNoise, region, region_indices, uniform_streams
 from fastapi import HTTPException
 import os
 import json
 from datetime import datetime, timedelta
-import random
+
+logger = logging.getLogger(__name__)
+
+# Sels du bruit déterministe (un flux indépendant par source de données par défaut)
+SALT_CATNAT = 1
+SALT_EMDAT = 2
+
+# Tirages réservés par type de catastrophe
+DRAWS_PER_TYPE = 16
+
+CATNAT_DISASTER_TYPES = {
+    # France métropolitaine, nord
+    "nord": [
+        {"type": "inondation", "frequency": 0.6, "severity": "élevée"},
+        {"type": "tempête", "frequency": 0.5, "severity": "élevée"},
+        {"type": "sécheresse", "frequency": 0.1, "severity": "modérée"},
+        {"type": "mouvement de terrain", "frequency": 0.05, "severity": "faible"},
+        {"type": "feu de forêt", "frequency": 0.05, "severity": "modérée"},
+        {"type": "séisme", "frequency": 0.02, "severity": "faible"},
+        {"type": "avalanche", "frequency": 0.08, "severity": "modérée"},
+        {"type": "submersion marine", "frequency": 0.12, "severity": "élevée"}
+    ],
+    # France métropolitaine, centre
+    "centre": [
+        {"type": "inondation", "frequency": 0.4, "severity": "modérée"},
+        {"type": "tempête", "frequency": 0.35, "severity": "modérée"},
+        {"type": "sécheresse", "frequency": 0.3, "severity": "élevée"},
+        {"type": "mouvement de terrain", "frequency": 0.15, "severity": "modérée"},
+        {"type": "feu de forêt", "frequency": 0.2, "severity": "élevée"},
+        {"type": "séisme", "frequency": 0.08, "severity": "modérée"},
+        {"type": "avalanche", "frequency": 0.02, "severity": "faible"},
+        {"type": "submersion marine", "frequency": 0.03, "severity": "faible"}
+    ],
+    # France métropolitaine, sud
+    "sud": [
+        {"type": "inondation", "frequency": 0.3, "severity": "modérée"},
+        {"type": "tempête", "frequency": 0.25, "severity": "modérée"},
+        {"type": "sécheresse", "frequency": 0.5, "severity": "élevée"},
+        {"type": "mouvement de terrain", "frequency": 0.25, "severity": "élevée"},
+        {"type": "feu de forêt", "frequency": 0.35, "severity": "élevée"},
+        {"type": "séisme", "frequency": 0.15, "severity": "modérée"},
+        {"type": "avalanche", "frequency": 0.03, "severity": "faible"},
+        {"type": "submersion marine", "frequency": 0.08, "severity": "modérée"}
+    ],
+    # Autres pays - données génériques
+    "autres": [
+        {"type": "inondation", "frequency": 0.25, "severity": "modérée"},
+        {"type": "tempête", "frequency": 0.2, "severity": "modérée"},
+        {"type": "sécheresse", "frequency": 0.15, "severity": "modérée"},
+        {"type": "mouvement de terrain", "frequency": 0.08, "severity": "faible"},
+        {"type": "feu de forêt", "frequency": 0.1, "severity": "modérée"},
+        {"type": "séisme", "frequency": 0.05, "severity": "faible"},
+        {"type": "avalanche", "frequency": 0.02, "severity": "faible"},
+        {"type": "submersion marine", "frequency": 0.05, "severity": "modérée"}
+    ]
+}
+
+# Types EM-DAT par pays (données génériques pour les pays autres que la France)
+EMDAT_DISASTER_TYPES = {
+    "france": [
+        {"type": "Flood", "frequency": 0.25, "avg_deaths": 5, "avg_damage": 1000000},
+        {"type": "Storm", "frequency": 0.2, "avg_deaths": 3, "avg_damage": 500000},
+        {"type": "Drought", "frequency": 0.15, "avg_deaths": 0, "avg_damage": 2000000},
+        {"type": "Wildfire", "frequency": 0.1, "avg_deaths": 2, "avg_damage": 300000},
+        {"type": "Earthquake", "frequency": 0.05, "avg_deaths": 10, "avg_damage": 5000000},
+        {"type": "Landslide", "frequency": 0.05, "avg_deaths": 1, "avg_damage": 200000}
+    ],
+    "autres": [
+        {"type": "Flood", "frequency": 0.3, "avg_deaths": 10, "avg_damage": 2000000},
+        {"type": "Storm", "frequency": 0.25, "avg_deaths": 5, "avg_damage": 1000000},
+        {"type": "Earthquake", "frequency": 0.1, "avg_deaths": 50, "avg_damage": 10000000},
+        {"type": "Drought", "frequency": 0.15, "avg_deaths": 0, "avg_damage": 5000000},
+        {"type": "Wildfire", "frequency": 0.1, "avg_deaths": 3, "avg_damage": 500000},
+        {"type": "Landslide", "frequency": 0.1, "avg_deaths": 2, "avg_damage": 300000}
+    ]
+}
+
+def _emdat_region(country: str) -> str:
+    return "france" if country.lower() == "france" else "autres"
 
 class DisasterService:
     def __init__(self):
@@ -19,214 +105,200 @@ class DisasterService:
         
         # Vérifier la configuration
         if not self.catnat_api_key or self.catnat_api_key == "your_catnat_api_key_here":
-            print("⚠️  CATNAT_API_KEY non configurée - Utilisation des données par défaut")
+            logger.warning("CATNAT_API_KEY non configurée - Utilisation des données par défaut")
             self.catnat_api_key = None
             
         if not self.emdat_api_key or self.emdat_api_key == "your_emdat_api_key_here":
-            print("⚠️  EMDAT_API_KEY non configurée - Utilisation des données par défaut")
+            logger.warning("EMDAT_API_KEY non configurée - Utilisation des données par défaut")
             self.emdat_api_key = None
 
     async def get_catnat_disasters(self, latitude: float, longitude: float, radius_km: int = 50) -> List[Dict]:
         """Récupérer les catastrophes naturelles françaises via CatNat"""
-        if not self.catnat_api_key:
+        # En mode hors ligne, le cache peut contenir des réponses enregistrées même sans clé
+        if not self.catnat_api_key and not settings.PROVIDER_OFFLINE_MODE:
             return self._get_default_catnat_data(latitude, longitude)
 
         try:
-            async with httpx.AsyncClient() as client:
-                url = f"{self.catnat_base_url}/disasters"
-                params = {
-                    "lat": latitude,
-                    "lon": longitude,
-                    "radius": radius_km,
-                    "api_key": self.catnat_api_key,
-                    "format": "json"
-                }
-                
-                response = await client.get(url, params=params, timeout=10.0)
-                response.raise_for_status()
-                
-                return response.json().get("disasters", [])
+            url = f"{self.catnat_base_url}/disasters"
+            params = {
+                "lat": latitude,
+                "lon": longitude,
+                "radius": radius_km,
+                "api_key": self.catnat_api_key,
+                "format": "json"
+            }
+            
+            data = await provider_client.get_json("catnat", url, params)
+            return data.get("disasters", [])
 
+        except ProviderUnavailable:
+            # Disjoncteur ouvert : repli immédiat sans attendre le délai d'appel
+            return self._get_default_catnat_data(latitude, longitude)
         except httpx.HTTPStatusError as e:
-            print(f"⚠️  Erreur API CatNat: {e.response.status_code} - Utilisation des données par défaut")
+            logger.warning("Erreur API CatNat: %s - Utilisation des données par défaut", e.response.status_code, extra=RATE_LIMITED)
             return self._get_default_catnat_data(latitude, longitude)
         except Exception as e:
-            print(f"⚠️  Erreur lors de la récupération CatNat: {str(e)} - Utilisation des données par défaut")
+            logger.warning("Erreur lors de la récupération CatNat: %s - Utilisation des données par défaut", e, extra=RATE_LIMITED)
             return self._get_default_catnat_data(latitude, longitude)
 
     async def get_emdat_disasters(self, latitude: float, longitude: float, country: str = "France") -> List[Dict]:
         """Récupérer les catastrophes naturelles via EM-DAT"""
-        if not self.emdat_api_key:
+        # En mode hors ligne, le cache peut contenir des réponses enregistrées même sans clé
+        if not self.emdat_api_key and not settings.PROVIDER_OFFLINE_MODE:
             return self._get_default_emdat_data(latitude, longitude, country)
 
         try:
-            async with httpx.AsyncClient() as client:
-                url = f"{self.emdat_base_url}/disasters"
-                params = {
-                    "country": country,
-                    "lat": latitude,
-                    "lon": longitude,
-                    "api_key": self.emdat_api_key,
-                    "format": "json"
-                }
-                
-                response = await client.get(url, params=params, timeout=10.0)
-                response.raise_for_status()
-                
-                return response.json().get("disasters", [])
+            url = f"{self.emdat_base_url}/disasters"
+            params = {
+                "country": country,
+                "lat": latitude,
+                "lon": longitude,
+                "api_key": self.emdat_api_key,
+                "format": "json"
+            }
+            
+            data = await provider_client.get_json("emdat", url, params)
+            return data.get("disasters", [])
 
+        except ProviderUnavailable:
+            # Disjoncteur ouvert : repli immédiat sans attendre le délai d'appel
+            return self._get_default_emdat_data(latitude, longitude, country)
         except httpx.HTTPStatusError as e:
-            print(f"⚠️  Erreur API EM-DAT: {e.response.status_code} - Utilisation des données par défaut")
+            logger.warning("Erreur API EM-DAT: %s - Utilisation des données par défaut", e.response.status_code, extra=RATE_LIMITED)
             return self._get_default_emdat_data(latitude, longitude, country)
         except Exception as e:
-            print(f"⚠️  Erreur lors de la récupération EM-DAT: {str(e)} - Utilisation des données par défaut")
+            logger.warning("Erreur lors de la récupération EM-DAT: %s - Utilisation des données par défaut", e, extra=RATE_LIMITED)
             return self._get_default_emdat_data(latitude, longitude, country)
 
     def _get_default_catnat_data(self, latitude: float, longitude: float) -> List[Dict]:
         """Générer des données CatNat par défaut basées sur la localisation"""
         disasters = []
         
-        # Utiliser les coordonnées comme seed pour la cohérence
-        base_seed = int(latitude * 1000 + longitude * 1000)
-        random.seed(base_seed)
-        
-        # Déterminer la région basée sur les coordonnées
-        if 43.0 <= latitude <= 51.0 and -5.0 <= longitude <= 10.0:  # France métropolitaine
-            # Déterminer la zone géographique avec des variations plus importantes
-            if latitude > 48.0:  # Nord de la France
-                disaster_types = [
-                    {"type": "inondation", "frequency": 0.6, "severity": "élevée"},
-                    {"type": "tempête", "frequency": 0.5, "severity": "élevée"},
-                    {"type": "sécheresse", "frequency": 0.1, "severity": "modérée"},
-                    {"type": "mouvement de terrain", "frequency": 0.05, "severity": "faible"},
-                    {"type": "feu de forêt", "frequency": 0.05, "severity": "modérée"},
-                    {"type": "séisme", "frequency": 0.02, "severity": "faible"},
-                    {"type": "avalanche", "frequency": 0.08, "severity": "modérée"},
-                    {"type": "submersion marine", "frequency": 0.12, "severity": "élevée"}
-                ]
-            elif latitude > 45.0:  # Centre de la France
-                disaster_types = [
-                    {"type": "inondation", "frequency": 0.4, "severity": "modérée"},
-                    {"type": "tempête", "frequency": 0.35, "severity": "modérée"},
-                    {"type": "sécheresse", "frequency": 0.3, "severity": "élevée"},
-                    {"type": "mouvement de terrain", "frequency": 0.15, "severity": "modérée"},
-                    {"type": "feu de forêt", "frequency": 0.2, "severity": "élevée"},
-                    {"type": "séisme", "frequency": 0.08, "severity": "modérée"},
-                    {"type": "avalanche", "frequency": 0.02, "severity": "faible"},
-                    {"type": "submersion marine", "frequency": 0.03, "severity": "faible"}
-                ]
-            else:  # Sud de la France
-                disaster_types = [
-                    {"type": "inondation", "frequency": 0.3, "severity": "modérée"},
-                    {"type": "tempête", "frequency": 0.25, "severity": "modérée"},
-                    {"type": "sécheresse", "frequency": 0.5, "severity": "élevée"},
-                    {"type": "mouvement de terrain", "frequency": 0.25, "severity": "élevée"},
-                    {"type": "feu de forêt", "frequency": 0.35, "severity": "élevée"},
-                    {"type": "séisme", "frequency": 0.15, "severity": "modérée"},
-                    {"type": "avalanche", "frequency": 0.03, "severity": "faible"},
-                    {"type": "submersion marine", "frequency": 0.08, "severity": "modérée"}
-                ]
-        else:
-            # Autres pays - données génériques
-            disaster_types = [
-                {"type": "inondation", "frequency": 0.25, "severity": "modérée"},
-                {"type": "tempête", "frequency": 0.2, "severity": "modérée"},
-                {"type": "sécheresse", "frequency": 0.15, "severity": "modérée"},
-                {"type": "mouvement de terrain", "frequency": 0.08, "severity": "faible"},
-                {"type": "feu de forêt", "frequency": 0.1, "severity": "modérée"},
-                {"type": "séisme", "frequency": 0.05, "severity": "faible"},
-                {"type": "avalanche", "frequency": 0.02, "severity": "faible"},
-                {"type": "submersion marine", "frequency": 0.05, "severity": "modérée"}
-            ]
+        # Tirages dérivés des coordonnées : reproductibles, sans état global partagé
+        noise = CoordinateNoise(latitude, longitude, SALT_CATNAT)
+        disaster_types = CATNAT_DISASTER_TYPES[region(latitude, longitude)]
         
         # Générer des catastrophes avec des variations plus importantes
-        for disaster_type in disaster_types:
-            if random.random() < disaster_type["frequency"]:
+        for index, disaster_type in enumerate(disaster_types):
+            stream = index * DRAWS_PER_TYPE
+            if noise.random(stream) < disaster_type["frequency"]:
                 # Date aléatoire dans les 5 dernières années
-                days_ago = random.randint(1, 1825)  # 5 ans
+                days_ago = noise.randint(stream + 1, 1, 1825)  # 5 ans
                 disaster_date = datetime.now() - timedelta(days=days_ago)
                 
                 disasters.append({
-                    "id": f"catnat_{random.randint(1000, 9999)}",
+                    "id": f"catnat_{noise.randint(stream + 2, 1000, 9999)}",
                     "type": disaster_type["type"],
                     "date": disaster_date.strftime("%Y-%m-%d"),
                     "severity": disaster_type["severity"],
                     "location": {
-                        "latitude": latitude + random.uniform(-0.1, 0.1),
-                        "longitude": longitude + random.uniform(-0.1, 0.1)
+                        "latitude": latitude + noise.uniform(stream + 3, -0.1, 0.1),
+                        "longitude": longitude + noise.uniform(stream + 4, -0.1, 0.1)
                     },
-                    "damage_estimate": random.randint(100000, 5000000),
-                    "affected_area_km2": random.randint(1, 100)
+                    "damage_estimate": noise.randint(stream + 5, 100000, 5000000),
+                    "affected_area_km2": noise.randint(stream + 6, 1, 100)
                 })
         
         return disasters
 
+    def default_catnat_bulk(self, latitudes: Sequence[float], longitudes: Sequence[float]) -> Dict:
+        """Occurrences CatNat par défaut pour un tableau de sites, en une passe NumPy
+
+        Mêmes tirages que `_get_default_catnat_data` : `occurred[i, j]` indique si le
+        type `types[j]` figure dans les données par défaut du site i.
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        regions = region_indices(latitudes, longitudes)
+        frequencies = np.array([
+            [disaster_type["frequency"] for disaster_type in CATNAT_DISASTER_TYPES[region_name]]
+            for region_name in REGIONS
+        ])[regions]
+        
+        # Seul le premier tirage de chaque type décide de l'occurrence
+        streams = range(0, frequencies.shape[1] * DRAWS_PER_TYPE, DRAWS_PER_TYPE)
+        occurred = uniform_streams(latitudes, longitudes, SALT_CATNAT, streams) < frequencies
+        
+        return {
+            "types": [disaster_type["type"] for disaster_type in CATNAT_DISASTER_TYPES["nord"]],
+            "occurred": occurred,
+            "historical_events": occurred.sum(axis=1)
+        }
+
     def _get_default_emdat_data(self, latitude: float, longitude: float, country: str) -> List[Dict]:
         """Générer des données EM-DAT par défaut"""
         disasters = []
+        noise = CoordinateNoise(latitude, longitude, SALT_EMDAT)
         
         # Types de catastrophes par région
-        if country.lower() == "france":
-            disaster_types = [
-                {"type": "Flood", "frequency": 0.25, "avg_deaths": 5, "avg_damage": 1000000},
-                {"type": "Storm", "frequency": 0.2, "avg_deaths": 3, "avg_damage": 500000},
-                {"type": "Drought", "frequency": 0.15, "avg_deaths": 0, "avg_damage": 2000000},
-                {"type": "Wildfire", "frequency": 0.1, "avg_deaths": 2, "avg_damage": 300000},
-                {"type": "Earthquake", "frequency": 0.05, "avg_deaths": 10, "avg_damage": 5000000},
-                {"type": "Landslide", "frequency": 0.05, "avg_deaths": 1, "avg_damage": 200000}
-            ]
-        else:
-            # Données génériques pour d'autres pays
-            disaster_types = [
-                {"type": "Flood", "frequency": 0.3, "avg_deaths": 10, "avg_damage": 2000000},
-                {"type": "Storm", "frequency": 0.25, "avg_deaths": 5, "avg_damage": 1000000},
-                {"type": "Earthquake", "frequency": 0.1, "avg_deaths": 50, "avg_damage": 10000000},
-                {"type": "Drought", "frequency": 0.15, "avg_deaths": 0, "avg_damage": 5000000},
-                {"type": "Wildfire", "frequency": 0.1, "avg_deaths": 3, "avg_damage": 500000},
-                {"type": "Landslide", "frequency": 0.1, "avg_deaths": 2, "avg_damage": 300000}
-            ]
+        disaster_types = EMDAT_DISASTER_TYPES[_emdat_region(country)]
         
         # Générer des catastrophes historiques
-        for disaster_type in disaster_types:
-            if random.random() < disaster_type["frequency"]:
+        for index, disaster_type in enumerate(disaster_types):
+            stream = index * DRAWS_PER_TYPE
+            if noise.random(stream) < disaster_type["frequency"]:
                 # Date aléatoire dans les 20 dernières années
-                years_ago = random.randint(1, 20)
-                days_ago = random.randint(1, 365 * years_ago)
+                years_ago = noise.randint(stream + 1, 1, 20)
+                days_ago = noise.randint(stream + 2, 1, 365 * years_ago)
                 disaster_date = datetime.now() - timedelta(days=days_ago)
                 
                 disasters.append({
-                    "id": f"emdat_{random.randint(10000, 99999)}",
+                    "id": f"emdat_{noise.randint(stream + 3, 10000, 99999)}",
                     "type": disaster_type["type"],
                     "date": disaster_date.strftime("%Y-%m-%d"),
                     "country": country,
                     "location": {
-                        "latitude": latitude + random.uniform(-0.5, 0.5),
-                        "longitude": longitude + random.uniform(-0.5, 0.5)
+                        "latitude": latitude + noise.uniform(stream + 4, -0.5, 0.5),
+                        "longitude": longitude + noise.uniform(stream + 5, -0.5, 0.5)
                     },
-                    "deaths": random.randint(0, disaster_type["avg_deaths"] * 2),
-                    "injured": random.randint(0, disaster_type["avg_deaths"] * 5),
-                    "damage_usd": random.randint(
+                    "deaths": noise.randint(stream + 6, 0, disaster_type["avg_deaths"] * 2),
+                    "injured": noise.randint(stream + 7, 0, disaster_type["avg_deaths"] * 5),
+                    "damage_usd": noise.randint(
+                        stream + 8,
                         disaster_type["avg_damage"] // 2,
                         disaster_type["avg_damage"] * 2
                     ),
-                    "affected_area_km2": random.randint(1, 500)
+                    "affected_area_km2": noise.randint(stream + 9, 1, 500)
                 })
         
         return disasters
 
-    def calculate_disaster_risk(self, disasters: List[Dict], site_type: str, site_value: float) -> Dict:
+    def default_emdat_bulk(self, latitudes: Sequence[float], longitudes: Sequence[float], countries: Sequence[str]) -> Dict:
+        """Occurrences EM-DAT par défaut pour un tableau de sites, en une passe NumPy
+
+        Mêmes tirages que `_get_default_emdat_data`. L'ordre des types dépend du pays :
+        les colonnes de `occurred` suivent `types` (ordre de la France) pour tous les sites.
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        region_names = list(EMDAT_DISASTER_TYPES)
+        region_of = {country: region_names.index(_emdat_region(country)) for country in set(countries)}
+        regions = np.fromiter((region_of[country] for country in countries), dtype=np.intp, count=len(countries))
+        
+        # Pour chaque région : position de chaque type dans sa liste (donc son flux) et fréquence
+        types = [disaster_type["type"] for disaster_type in EMDAT_DISASTER_TYPES["france"]]
+        positions, frequencies = [], []
+        for region_name in region_names:
+            names = [disaster_type["type"] for disaster_type in EMDAT_DISASTER_TYPES[region_name]]
+            positions.append([names.index(name) for name in types])
+            frequencies.append([EMDAT_DISASTER_TYPES[region_name][names.index(name)]["frequency"] for name in types])
+        
+        streams = range(0, len(types) * DRAWS_PER_TYPE, DRAWS_PER_TYPE)
+        draws = uniform_streams(latitudes, longitudes, SALT_EMDAT, streams)
+        occurred = np.take_along_axis(draws, np.array(positions)[regions], axis=1) < np.array(frequencies)[regions]
+        
+        return {
+            "types": types,
+            "occurred": occurred,
+            "historical_events": occurred.sum(axis=1)
+        }
+
+    @tracer.traced("disaster.calculate_disaster_risk")
+    def calculate_disaster_risk(self, disasters: List[Dict], site_type: str, site_value: float) -> DisasterAssessment:
         """Calculer un score de risque basé sur l'historique des catastrophes"""
         try:
             if not disasters:
-                return {
-                    "disaster_risk_score": 15.0,
-                    "risk_factors": {
-                        "historical_events": 0,
-                        "frequency": "faible",
-                        "severity": "faible",
-                        "proximity_risk": "faible"
-                    }
-                }
+                return DisasterAssessment.default()
             
             # Analyser les catastrophes
             total_events = len(disasters)
@@ -270,28 +342,19 @@ class DisasterService:
                 proximity_score * 0.3
             ) * site_type_multiplier
             
-            return {
-                "disaster_risk_score": min(100.0, max(0.0, disaster_risk)),
-                "risk_factors": {
-                    "historical_events": total_events,
-                    "recent_events": recent_events,
-                    "frequency": self._get_frequency_label(total_events),
-                    "severity": self._get_severity_label(avg_severity),
-                    "proximity_risk": self._get_proximity_label(recent_events)
-                }
-            }
+            return DisasterAssessment(
+                min(100.0, max(0.0, disaster_risk)),
+                total_events,
+                recent_events,
+                self._get_frequency_label(total_events),
+                self._get_severity_label(avg_severity),
+                self._get_proximity_label(recent_events)
+            )
             
         except Exception as e:
-            print(f"Erreur lors du calcul du risque catastrophe: {e}")
-            return {
-                "disaster_risk_score": 15.0,
-                "risk_factors": {
-                    "historical_events": 0,
-                    "frequency": "faible",
-                    "severity": "faible",
-                    "proximity_risk": "faible"
-                }
-            }
+            logger.exception("Erreur lors du calcul du risque catastrophe: %s", e, extra=RATE_LIMITED)
+            record_fallback("disaster")
+            return DisasterAssessment.default()
 
     def _is_recent(self, date_str: str, days: int = 365) -> bool:
         """Vérifier si une date est récente"""
@@ -327,7 +390,8 @@ class DisasterService:
         else:
             return "élevée"
 
-    async def get_disaster_risk_for_site(self, latitude: float, longitude: float, site_type: str, site_value: float) -> Dict:
+    @tracer.traced("disaster.get_disaster_risk_for_site")
+    async def get_disaster_risk_for_site(self, latitude: float, longitude: float, site_type: str, site_value: float) -> DisasterRisk:
         """Récupérer le risque de catastrophe pour un site"""
         try:
             # Récupérer les données CatNat (France)
@@ -342,33 +406,12 @@ class DisasterService:
             # Calculer le risque
             risk_assessment = self.calculate_disaster_risk(all_disasters, site_type, site_value)
             
-            return {
-                "disasters": all_disasters,
-                "disaster_risk": risk_assessment,
-                "data_sources": {
-                    "catnat": len(catnat_disasters),
-                    "emdat": len(emdat_disasters)
-                }
-            }
+            return DisasterRisk(all_disasters, risk_assessment, len(catnat_disasters), len(emdat_disasters))
             
         except Exception as e:
-            print(f"Erreur lors de la récupération du risque catastrophe: {e}")
-            return {
-                "disasters": [],
-                "disaster_risk": {
-                    "disaster_risk_score": 15.0,
-                    "risk_factors": {
-                        "historical_events": 0,
-                        "frequency": "faible",
-                        "severity": "faible",
-                        "proximity_risk": "faible"
-                    }
-                },
-                "data_sources": {
-                    "catnat": 0,
-                    "emdat": 0
-                }
-            }
+            logger.exception("Erreur lors de la récupération du risque catastrophe: %s", e, extra=RATE_LIMITED)
+            record_fallback("disaster")
+            return DisasterRisk.default()
 
 # Instance globale du service
 disaster_service = DisasterService() 
\ No newline at end of file
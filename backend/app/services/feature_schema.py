@@ -0,0 +1,34 @@
+"""Définition des features de scoring, partagée avec le moteur ML
+
+Module sans dépendance : copié dans l'image du moteur ML (ml-engine/Dockerfile) et
+importé des deux côtés, pour que le scoring et l'entraînement lisent les mêmes colonnes.
+"""
+
+# Version courante des features : à incrémenter dès que l'extraction change
+FEATURE_VERSION = 1
+
+# Colonnes exposées au scoring et au moteur ML (même ordre des deux côtés)
+FEATURE_COLUMNS = [
+    "latitude",
+    "longitude",
+    "building_type",
+    "building_value",
+    "temperature",
+    "humidity",
+    "wind_speed",
+    "rain_1h",
+    "snow_1h",
+    "weather_score",
+    "weather_is_real",
+    "disaster_count",
+    "recent_disaster_count",
+    "catnat_count",
+    "emdat_count",
+    "days_since_last_disaster",
+    "disaster_score",
+    "flood_probability",
+    "earthquake_probability",
+    "wind_probability",
+    "subsidence_probability",
+    "vulnerability_score",
+]
@@ -0,0 +1,126 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.site_feature import SiteFeature
+from app.services.feature_schema import FEATURE_COLUMNS, FEATURE_VERSION
+from app.services.risk_results import DisasterRisk, VulnerabilityRisk, WeatherRisk
+
+class FeatureStoreService:
+    def __init__(self):
+        self.version = FEATURE_VERSION
+        self.max_age = timedelta(minutes=settings.FEATURE_STORE_MAX_AGE_MINUTES)
+        self.degraded_max_age = timedelta(minutes=settings.FEATURE_STORE_DEGRADED_MAX_AGE_MINUTES)
+        self.write_chunk_size = 1000
+
+    def compute_input_hash(self, latitude: float, longitude: float, building_type: str, building_value: float) -> str:
+        """Empreinte des attributs du site dont dépendent les features"""
+        raw = f"{self.version}|{latitude:.6f}|{longitude:.6f}|{building_type}|{building_value:.2f}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def extract_features(self, latitude: float, longitude: float, building_type: str, building_value: float,
+                         weather_risk: WeatherRisk, disaster_risk: DisasterRisk, vulnerability_risk: VulnerabilityRisk) -> Dict:
+        """Extraire les features de scoring à partir des résultats des services"""
+        weather_data = weather_risk.weather_data or {}
+        disaster_assessment = disaster_risk.assessment
+        jba_data = vulnerability_risk.jba_data
+
+        return {
+            "latitude": latitude,
+            "longitude": longitude,
+            "building_type": building_type,
+            "building_value": building_value,
+            "temperature": weather_risk.temperature,
+            "humidity": weather_risk.humidity,
+            "wind_speed": weather_risk.wind_speed,
+            "rain_1h": weather_data.get("rain", {}).get("1h", 0),
+            "snow_1h": weather_data.get("snow", {}).get("1h", 0),
+            "weather_score": weather_risk.risk_score,
+            "weather_is_real": 1 if weather_risk.weather_data else 0,
+            "disaster_count": disaster_assessment.historical_events,
+            "recent_disaster_count": disaster_assessment.recent_events or 0,
+            "catnat_count": disaster_risk.catnat_count,
+            "emdat_count": disaster_risk.emdat_count,
+            "days_since_last_disaster": self._days_since_last(disaster_risk.disasters),
+            "disaster_score": disaster_assessment.disaster_risk_score,
+            "flood_probability": jba_data.get("flood_risk", {}).get("probability"),
+            "earthquake_probability": jba_data.get("earthquake_risk", {}).get("probability"),
+            "wind_probability": jba_data.get("wind_risk", {}).get("probability"),
+            "subsidence_probability": jba_data.get("subsidence_risk", {}).get("probability"),
+            "vulnerability_score": vulnerability_risk.assessment.vulnerability_risk_score,
+        }
+
+    def _days_since_last(self, disasters: List[Dict]) -> Optional[int]:
+        """Nombre de jours depuis la catastrophe la plus récente"""
+        latest = None
+        for disaster in disasters:
+            try:
+                disaster_date = datetime.strptime(disaster.get("date", ""), "%Y-%m-%d")
+            except ValueError:
+                continue
+            if latest is None or disaster_date > latest:
+                latest = disaster_date
+        if latest is None:
+            return None
+        return (datetime.now() - latest).days
+
+    def load_features(self, db: Session, site_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict]:
+        """Charger en une seule requête les features de la version courante"""
+        query = db.query(SiteFeature).filter(SiteFeature.feature_version == self.version)
+        if site_ids is not None:
+            site_ids = list(site_ids)
+            if not site_ids:
+                return {}
+            query = query.filter(SiteFeature.site_id.in_(site_ids))
+
+        features = {}
+        for row in query.all():
+            values = {column: getattr(row, column) for column in FEATURE_COLUMNS}
+            values["input_hash"] = row.input_hash
+            values["degraded"] = row.degraded
+            values["computed_at"] = row.computed_at
+            features[row.site_id] = values
+        return features
+
+    def is_fresh(self, features: Optional[Dict], input_hash: str) -> bool:
+        """Vérifier que des features stockées sont réutilisables pour un site
+
+        Les features dégradées (calculées sur des données de repli) sont recalculées dès
+        FEATURE_STORE_DEGRADED_MAX_AGE_MINUTES : une panne ne fige pas les scores.
+        """
+        if not features or features.get("input_hash") != input_hash:
+            return False
+        computed_at = features.get("computed_at")
+        if computed_at is None:
+            return False
+        if computed_at.tzinfo is None:
+            computed_at = computed_at.replace(tzinfo=timezone.utc)
+        max_age = self.degraded_max_age if features.get("degraded") else self.max_age
+        return datetime.now(timezone.utc) - computed_at <= max_age
+
+    def save_features(self, db: Session, rows: List[Dict]) -> int:
+        """Enregistrer (upsert) les features calculées, par lots"""
+        saved = 0
+        for start in range(0, len(rows), self.write_chunk_size):
+            chunk = [
+                {**row, "feature_version": self.version, "computed_at": datetime.now(timezone.utc)}
+                for row in rows[start:start + self.write_chunk_size]
+            ]
+            stmt = insert(SiteFeature).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[SiteFeature.site_id, SiteFeature.feature_version],
+                set_={
+                    column: stmt.excluded[column]
+                    for column in FEATURE_COLUMNS + ["input_hash", "degraded", "computed_at"]
+                }
+            )
+            db.execute(stmt)
+            saved += len(chunk)
+        return saved
+
+# Instance globale du service
+feature_store_service = FeatureStoreService()
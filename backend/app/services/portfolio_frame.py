@@ -0,0 +1,232 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Colonnes chargées pour les analyses de portefeuille : (nom, type numpy)
+SITE_COLUMNS = [
+    ("id", np.int64),
+    ("name", np.str_),
+    ("building_type", np.str_),
+    ("latitude", np.float64),
+    ("longitude", np.float64),
+    ("building_value", np.float64),
+    ("risk_score", np.float64),
+]
+
+CONTRACT_COLUMNS = [
+    ("id", np.int64),
+    ("site_id", np.int64),
+    ("premium_amount", np.float64),
+    ("status", np.str_),
+]
+
+SITES_QUERY = "SELECT id, name, building_type, latitude, longitude, building_value, risk_score FROM sites ORDER BY id"
+CONTRACTS_QUERY = "SELECT id, site_id, premium_amount, status FROM insurance_contracts ORDER BY id"
+
+# Empreinte bon marché du contenu des tables, utilisée pour invalider le snapshot
+FINGERPRINT_QUERY = """
+SELECT
+    (SELECT count(*) FROM sites),
+    (SELECT max(greatest(created_at, updated_at, last_risk_update)) FROM sites),
+    (SELECT count(*) FROM insurance_contracts),
+    (SELECT max(greatest(created_at, updated_at)) FROM insurance_contracts)
+"""
+
+class PortfolioFrame:
+    """Vue en colonnes (struct-of-arrays) des sites et contrats du portefeuille"""
+
+    def __init__(self, sites: Dict[str, np.ndarray], contracts: Dict[str, np.ndarray]):
+        self.sites = sites
+        self.contracts = contracts
+
+    @classmethod
+    def load(cls, db: Session, use_snapshot: bool = True) -> "PortfolioFrame":
+        """Charger le portefeuille depuis le snapshot disque s'il est à jour, sinon depuis la base"""
+        if not use_snapshot:
+            return cls._from_database(db)
+
+        fingerprint = _fingerprint(db)
+        snapshot_dir = os.path.join(settings.PORTFOLIO_SNAPSHOT_DIR, fingerprint)
+        if os.path.exists(os.path.join(snapshot_dir, "meta.json")):
+            try:
+                return cls._from_snapshot(snapshot_dir)
+            except (OSError, ValueError) as e:
+                logger.warning("Snapshot de portefeuille illisible, rechargement depuis la base: %s", e)
+
+        frame = cls._from_database(db)
+        try:
+            frame._save_snapshot(snapshot_dir)
+        except OSError as e:
+            logger.warning("Impossible d'écrire le snapshot de portefeuille: %s", e)
+        return frame
+
+    @classmethod
+    def _from_database(cls, db: Session) -> "PortfolioFrame":
+        chunk_size = settings.PORTFOLIO_FRAME_CHUNK_SIZE
+        return cls(
+            _read_columns(db, SITES_QUERY, SITE_COLUMNS, chunk_size),
+            _read_columns(db, CONTRACTS_QUERY, CONTRACT_COLUMNS, chunk_size)
+        )
+
+    @classmethod
+    def _from_snapshot(cls, snapshot_dir: str) -> "PortfolioFrame":
+        with open(os.path.join(snapshot_dir, "meta.json")) as meta_file:
+            meta = json.load(meta_file)
+
+        def load_group(group: str) -> Dict[str, np.ndarray]:
+            return {
+                name: np.load(os.path.join(snapshot_dir, f"{group}.{name}.npy"), mmap_mode="r")
+                for name in meta[group]
+            }
+
+        return cls(load_group("sites"), load_group("contracts"))
+
+    def _save_snapshot(self, snapshot_dir: str):
+        # Écriture dans un répertoire temporaire puis renommage pour ne jamais exposer un snapshot partiel
+        tmp_dir = f"{snapshot_dir}.tmp{os.getpid()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        for group, columns in (("sites", self.sites), ("contracts", self.contracts)):
+            for name, values in columns.items():
+                np.save(os.path.join(tmp_dir, f"{group}.{name}.npy"), values)
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as meta_file:
+            json.dump({"sites": list(self.sites), "contracts": list(self.contracts)}, meta_file)
+
+        try:
+            os.rename(tmp_dir, snapshot_dir)
+        except OSError:
+            # Un autre worker a déjà écrit le même snapshot
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        # Supprimer les snapshots obsolètes
+        parent = os.path.dirname(snapshot_dir)
+        for entry in os.listdir(parent):
+            path = os.path.join(parent, entry)
+            if path != snapshot_dir and ".tmp" not in entry and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    @property
+    def site_count(self) -> int:
+        return len(self.sites["id"])
+
+    @property
+    def contract_count(self) -> int:
+        return len(self.contracts["id"])
+
+    def total_value(self) -> float:
+        return float(np.nansum(self.sites["building_value"]))
+
+    def total_premiums(self) -> float:
+        return float(np.nansum(self.contracts["premium_amount"]))
+
+    def average_risk(self) -> float:
+        return float(np.nanmean(self.sites["risk_score"])) if self.site_count else 0
+
+    def type_distribution(self) -> Dict[str, int]:
+        """Nombre de sites par type de bâtiment"""
+        types, counts = np.unique(self.sites["building_type"], return_counts=True)
+        return {str(building_type): int(count) for building_type, count in zip(types, counts)}
+
+    def risk_distribution(self, bounds: Tuple[float, float, float] = (20, 40, 60)) -> Dict[str, int]:
+        """Répartition des sites par niveau de risque"""
+        scores = self.sites["risk_score"]
+        counts = np.bincount(np.digitize(scores[~np.isnan(scores)], bounds), minlength=4)
+        return {
+            "faible": int(counts[0]),
+            "modéré": int(counts[1]),
+            "élevé": int(counts[2]),
+            "très élevé": int(counts[3])
+        }
+
+    def iter_sites(self) -> Iterator[Tuple[int, float, float, str, float]]:
+        """Itérer sur (id, latitude, longitude, type, valeur) sans matérialiser d'objets ORM"""
+        return zip(
+            self.sites["id"].tolist(),
+            self.sites["latitude"].tolist(),
+            self.sites["longitude"].tolist(),
+            self.sites["building_type"].tolist(),
+            self.sites["building_value"].tolist()
+        )
+
+    def site_records(self) -> List[Dict]:
+        """Sites au format attendu par l'agent IA"""
+        return [
+            {
+                "id": site_id,
+                "name": name,
+                "building_type": building_type or None,
+                "building_value": building_value,
+                "risk_score": None if math.isnan(risk_score) else risk_score
+            }
+            for site_id, name, building_type, building_value, risk_score in zip(
+                self.sites["id"].tolist(),
+                self.sites["name"].tolist(),
+                self.sites["building_type"].tolist(),
+                self.sites["building_value"].tolist(),
+                self.sites["risk_score"].tolist()
+            )
+        ]
+
+    def contract_records(self) -> List[Dict]:
+        """Contrats au format attendu par l'agent IA"""
+        return [
+            {
+                "id": contract_id,
+                "annual_premium": premium,
+                "status": status or None,
+                "coverage_type": "Standard"
+            }
+            for contract_id, premium, status in zip(
+                self.contracts["id"].tolist(),
+                self.contracts["premium_amount"].tolist(),
+                self.contracts["status"].tolist()
+            )
+        ]
+
+    def portfolio_data(self) -> Dict:
+        """Données du portefeuille transmises à l'agent IA"""
+        return {
+            "total_sites": self.site_count,
+            "total_value": self.total_value(),
+            "total_premiums": self.total_premiums(),
+            "average_risk": self.average_risk(),
+            "type_distribution": self.type_distribution(),
+            "sites": self.site_records(),
+            "contracts": self.contract_records()
+        }
+
+def _fingerprint(db: Session) -> str:
+    row = db.execute(text(FINGERPRINT_QUERY)).one()
+    raw = "|".join(str(value) for value in row)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def _read_columns(db: Session, query: str, columns: List[Tuple[str, type]], chunk_size: int) -> Dict[str, np.ndarray]:
+    """Lire une requête brute par lots via un curseur serveur et la convertir en tableaux numpy"""
+    chunks: Dict[str, List[np.ndarray]] = {name: [] for name, _ in columns}
+    connection = db.connection(execution_options={"stream_results": True, "max_row_buffer": chunk_size})
+    result = connection.execute(text(query))
+
+    for partition in result.partitions(chunk_size):
+        for index, (name, dtype) in enumerate(columns):
+            values = [row[index] for row in partition]
+            if dtype is np.str_:
+                chunks[name].append(np.array(["" if value is None else str(value) for value in values], dtype=np.str_))
+            else:
+                chunks[name].append(np.array([np.nan if value is None else value for value in values], dtype=np.float64).astype(dtype))
+
+    return {
+        name: np.concatenate(chunks[name]) if chunks[name] else np.array([], dtype=dtype)
+        for name, dtype in columns
+    }
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+REFRESH_VIEW = text("REFRESH MATERIALIZED VIEW CONCURRENTLY sites_with_risk")
+
+SUMMARY_QUERY = text("""
+SELECT
+    count(*) AS total_sites,
+    COALESCE(sum(building_value), 0) AS total_value,
+    COALESCE(sum(contract_count), 0) AS total_contracts,
+    COALESCE(sum(total_premiums), 0) AS total_premiums,
+    COALESCE(avg(risk_score), 0) AS average_risk,
+    count(*) FILTER (WHERE risk_score < 20) AS risk_low,
+    count(*) FILTER (WHERE risk_score >= 20 AND risk_score < 40) AS risk_moderate,
+    count(*) FILTER (WHERE risk_score >= 40 AND risk_score < 60) AS risk_high,
+    count(*) FILTER (WHERE risk_score >= 60) AS risk_very_high,
+    count(*) FILTER (WHERE contract_count = 0) AS uninsured_sites
+FROM sites_with_risk
+""")
+
+BY_TYPE_QUERY = text("""
+SELECT
+    CAST(building_type AS text) AS building_type,
+    count(*) AS sites,
+    sum(building_value) AS total_value,
+    sum(total_premiums) AS total_premiums,
+    avg(risk_score) AS average_risk
+FROM sites_with_risk
+GROUP BY building_type
+ORDER BY building_type
+""")
+
+class PortfolioSummaryService:
+    def __init__(self):
+        self.refresh_delay = settings.SITES_WITH_RISK_REFRESH_DELAY_SECONDS
+        self._dirty = False
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def request_refresh(self):
+        """Demander un rafraîchissement de la vue matérialisée (regroupé et exécuté hors requête)"""
+        self._dirty = True
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        # Les écritures rapprochées (import CSV, scoring) ne déclenchent qu'un seul rafraîchissement
+        while self._dirty:
+            await asyncio.sleep(self.refresh_delay)
+            self._dirty = False
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.refresh_now)
+            except Exception as e:
+                logger.warning("Erreur lors du rafraîchissement de sites_with_risk: %s", e)
+
+    async def wait_for_refresh(self):
+        """Attendre le rafraîchissement en attente (arrêt d'un processus hors API)"""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            await self._refresh_task
+
+    def refresh_now(self):
+        """Rafraîchir la vue sans bloquer les lectures (REFRESH ... CONCURRENTLY)"""
+        with engine.begin() as connection:
+            connection.execute(REFRESH_VIEW)
+
+    def get_summary(self, db: Session) -> Dict:
+        """Synthèse du portefeuille lue depuis la vue matérialisée"""
+        totals = db.execute(SUMMARY_QUERY).mappings().one()
+        by_type = db.execute(BY_TYPE_QUERY).mappings().all()
+
+        return {
+            "total_sites": totals["total_sites"],
+            "total_value": float(totals["total_value"]),
+            "total_contracts": int(totals["total_contracts"]),
+            "total_premiums": float(totals["total_premiums"]),
+            "average_risk": round(float(totals["average_risk"]), 2),
+            "uninsured_sites": totals["uninsured_sites"],
+            "risk_distribution": {
+                "faible": totals["risk_low"],
+                "modéré": totals["risk_moderate"],
+                "élevé": totals["risk_high"],
+                "très élevé": totals["risk_very_high"]
+            },
+            "by_building_type": {
+                row["building_type"]: {
+                    "sites": row["sites"],
+                    "total_value": float(row["total_value"] or 0),
+                    "total_premiums": float(row["total_premiums"] or 0),
+                    "average_risk": round(float(row["average_risk"] or 0), 2)
+                }
+                for row in by_type
+            }
+        }
+
+# Instance globale du service
+portfolio_summary_service = PortfolioSummaryService()
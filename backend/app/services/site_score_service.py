@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Mise à jour ensembliste : une seule instruction par lot au lieu d'un UPDATE par site
+UPDATE_RISK_SCORES = text("""
+UPDATE sites AS s
+SET risk_score = t.score, last_risk_update = CAST(:updated_at AS timestamptz)
+FROM unnest(CAST(:site_ids AS integer[]), CAST(:scores AS double precision[])) AS t(site_id, score)
+WHERE s.id = t.site_id
+""")
+
+class SiteScoreService:
+    def __init__(self):
+        self.write_chunk_size = 5000
+
+    def load_scoring_rows(self, db: Session) -> List:
+        """Colonnes utiles au scoring, sans charger les sites comme objets ORM suivis par la session"""
+        from app.models.site import Site
+
+        return db.query(
+            Site.id,
+            Site.name,
+            Site.latitude,
+            Site.longitude,
+            Site.building_type,
+            Site.building_value,
+            Site.risk_score
+        ).order_by(Site.id).all()
+
+    def write_scores(self, db: Session, scores: List[Tuple[int, float]], updated_at: Optional[datetime] = None) -> int:
+        """Écrire les scores (site_id, score) d'un run de scoring par lots et dater la mise à jour"""
+        if not scores:
+            return 0
+        updated_at = updated_at or datetime.now(timezone.utc)
+
+        updated = 0
+        for start in range(0, len(scores), self.write_chunk_size):
+            chunk = scores[start:start + self.write_chunk_size]
+            result = db.execute(UPDATE_RISK_SCORES, {
+                "site_ids": [site_id for site_id, _ in chunk],
+                "scores": [float(score) for _, score in chunk],
+                "updated_at": updated_at,
+            })
+            updated += result.rowcount
+        return updated
+
+# Instance globale du service
+site_score_service = SiteScoreService()
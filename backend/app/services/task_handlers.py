@@ -0,0 +1,78 @@
+import asyncio
+from typing import Awaitable, Callable, Dict
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.memory_profiling import memory_profiler
+
+from .ai_agent_service import ai_agent_service
+from .portfolio_frame import PortfolioFrame
+from .portfolio_summary_service import portfolio_summary_service
+from .prewarm_service import prewarm_service
+from .risk_calculator_service import risk_calculator_service
+from .site_import_service import site_import_service
+from .task_queue_service import task_queue_service
+
+TaskHandler = Callable[[Session, Dict], Awaitable[Dict]]
+
+# Types de tâches exécutables par worker.py
+TASK_HANDLERS: Dict[str, TaskHandler] = {}
+
+def task_handler(task_type: str):
+    """Enregistrer la fonction exécutant un type de tâche"""
+    def register(handler: TaskHandler) -> TaskHandler:
+        TASK_HANDLERS[task_type] = handler
+        return handler
+    return register
+
+async def run_with_memory_profile(task_type: str, db: Session, payload: Dict) -> Dict:
+    """Exécuter une tâche sous profil mémoire ; le rapport est ajouté au résultat (clé "memory")
+
+    Lève MemoryProfileBusy, sans exécuter la tâche, si un autre profil est en cours.
+    """
+    sites = db.execute(text("SELECT count(*) FROM sites")).scalar()
+    with memory_profiler.profile(f"task {task_type}", sites) as profile:
+        result = await TASK_HANDLERS[task_type](db, payload)
+    return {**result, "memory": profile.report}
+
+@task_handler("rescore_all_sites")
+async def rescore_all_sites(db: Session, payload: Dict) -> Dict:
+    """Recalcul du score global de tous les sites"""
+    response = await risk_calculator_service.rescore_all_sites(db)
+    db.commit()
+    portfolio_summary_service.request_refresh()
+    return {"message": response["message"], "updated_count": len(response["updated_sites"])}
+
+@task_handler("import_sites_csv")
+async def import_sites_csv(db: Session, payload: Dict) -> Dict:
+    """Import d'un CSV de sites (fichier déposé par l'API, référencé dans la tâche)"""
+    if "content" in payload:
+        # Tâche mise en file avant le stockage des CSV hors de la table tasks
+        content = payload["content"]
+    else:
+        content = (await asyncio.to_thread(task_queue_service.read_upload, payload["upload"])).decode("utf-8")
+    response = await site_import_service.import_csv(db, content)
+    if response["imported_count"]:
+        db.commit()
+        portfolio_summary_service.request_refresh()
+    if "upload" in payload:
+        task_queue_service.delete_upload(payload["upload"])
+    return response
+
+@task_handler("strategic_recommendations")
+async def strategic_recommendations(db: Session, payload: Dict) -> Dict:
+    """Analyse du portefeuille par l'agent IA"""
+    portfolio_data = PortfolioFrame.load(db).portfolio_data()
+    recommendations = await ai_agent_service.get_strategic_recommendations(portfolio_data)
+    return {"recommendations": recommendations.get("recommendations", {})}
+
+@task_handler("prewarm_weather")
+async def prewarm_weather(db: Session, payload: Dict) -> Dict:
+    """Préchauffage du cache météo (planifié par le worker)"""
+    return await prewarm_service.warm_weather(db)
+
+@task_handler("prewarm_hazards")
+async def prewarm_hazards(db: Session, payload: Dict) -> Dict:
+    """Préchauffage quotidien du cache catastrophes et vulnérabilité"""
+    return await prewarm_service.warm_hazards(db)
@@ -0,0 +1,227 @@
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+TASK_STATUSES = ("pending", "running", "succeeded", "failed", "cancelled")
+
+# Priorité 0 (arrière-plan) à 9 (urgent) : les plus prioritaires sont prises en premier
+MIN_PRIORITY = 0
+MAX_PRIORITY = 9
+DEFAULT_PRIORITY = 5
+
+TASK_COLUMNS = """
+    id, task_type, payload, priority, status, attempts, max_attempts, run_at,
+    locked_by, locked_at, result, error, created_at, started_at, finished_at
+"""
+
+# Colonnes de la liste des tâches : sans les paramètres
+TASK_SUMMARY_COLUMNS = """
+    id, task_type, priority, status, attempts, max_attempts, run_at,
+    locked_by, locked_at, result, error, created_at, started_at, finished_at
+"""
+
+ENQUEUE_TASK = text(f"""
+INSERT INTO tasks (task_type, payload, priority, max_attempts, run_at)
+VALUES (:task_type, CAST(:payload AS jsonb), :priority, :max_attempts, COALESCE(:run_at, now()))
+RETURNING {TASK_COLUMNS}
+""")
+
+# SKIP LOCKED : plusieurs workers se partagent la file sans se bloquer ni prendre deux fois la même tâche
+CLAIM_TASK = text(f"""
+UPDATE tasks
+SET status = 'running', attempts = attempts + 1, locked_by = :worker_id, locked_at = now(),
+    started_at = now(), error = NULL
+WHERE id = (
+    SELECT id FROM tasks
+    WHERE status = 'pending' AND run_at <= now()
+    ORDER BY priority DESC, run_at, id
+    FOR UPDATE SKIP LOCKED
+    LIMIT 1
+)
+RETURNING {TASK_COLUMNS}
+""")
+
+HEARTBEAT = text("""
+UPDATE tasks SET locked_at = now()
+WHERE id = ANY(CAST(:task_ids AS bigint[])) AND status = 'running' AND locked_by = :worker_id
+""")
+
+COMPLETE_TASK = text("""
+UPDATE tasks
+SET status = 'succeeded', result = CAST(:result AS jsonb), locked_by = NULL, locked_at = NULL, finished_at = now()
+WHERE id = :task_id AND status = 'running'
+""")
+
+RETRY_TASK = text("""
+UPDATE tasks
+SET status = 'pending', error = :error, run_at = :run_at, locked_by = NULL, locked_at = NULL
+WHERE id = :task_id AND status = 'running'
+""")
+
+FAIL_TASK = text("""
+UPDATE tasks
+SET status = 'failed', error = :error, locked_by = NULL, locked_at = NULL, finished_at = now()
+WHERE id = :task_id AND status = 'running'
+""")
+
+# Tâches dont le worker a disparu (bail expiré) : remises en file, ou en échec si plus d'essai
+REQUEUE_EXPIRED = text("""
+UPDATE tasks
+SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END,
+    error = 'Bail expiré : worker interrompu pendant l''exécution',
+    finished_at = CASE WHEN attempts >= max_attempts THEN now() END,
+    locked_by = NULL, locked_at = NULL
+WHERE status = 'running' AND locked_at < now() - make_interval(secs => :lease_seconds)
+""")
+
+CANCEL_TASK = text(f"""
+UPDATE tasks SET status = 'cancelled', finished_at = now()
+WHERE id = :task_id AND status = 'pending'
+RETURNING {TASK_COLUMNS}
+""")
+
+# Verrou transactionnel : un seul worker à la fois décide des tâches planifiées
+SCHEDULER_LOCK = text("SELECT pg_advisory_xact_lock(hashtext('tasks_scheduler'))")
+
+ENQUEUE_PERIODIC = text(f"""
+INSERT INTO tasks (task_type, payload, priority, max_attempts)
+SELECT :task_type, '{{}}', :priority, :max_attempts
+WHERE NOT EXISTS (
+    SELECT 1 FROM tasks
+    WHERE task_type = :task_type
+        AND (status IN ('pending', 'running') OR created_at > now() - make_interval(secs => :interval_seconds))
+)
+RETURNING {TASK_COLUMNS}
+""")
+
+GET_TASK = text(f"SELECT {TASK_COLUMNS} FROM tasks WHERE id = :task_id")
+
+class TaskQueueService:
+    def __init__(self):
+        self.lease_seconds = settings.TASK_LEASE_SECONDS
+        self.max_attempts = settings.TASK_MAX_ATTEMPTS
+        self.retry_base_seconds = settings.TASK_RETRY_BASE_SECONDS
+        self.retry_max_seconds = settings.TASK_RETRY_MAX_SECONDS
+        self.upload_dir = settings.TASK_UPLOAD_DIR
+
+    def enqueue(self, db: Session, task_type: str, payload: Optional[Dict] = None,
+                priority: int = DEFAULT_PRIORITY, max_attempts: Optional[int] = None,
+                run_at: Optional[datetime] = None) -> Dict:
+        """Ajouter une tâche à la file (sans commit)"""
+        row = db.execute(ENQUEUE_TASK, {
+            "task_type": task_type,
+            "payload": json.dumps(payload or {}),
+            "priority": max(MIN_PRIORITY, min(MAX_PRIORITY, priority)),
+            "max_attempts": max_attempts or self.max_attempts,
+            "run_at": run_at,
+        }).mappings().one()
+        return dict(row)
+
+    def store_upload(self, source: BinaryIO) -> str:
+        """Enregistrer un fichier reçu pour une tâche ; renvoie la référence à mettre dans le payload
+
+        Le contenu reste hors de la table `tasks`. Bloquant : appelé via asyncio.to_thread.
+        """
+        os.makedirs(self.upload_dir, exist_ok=True)
+        reference = f"{uuid.uuid4().hex}.upload"
+        with open(self._upload_path(reference), "wb") as target:
+            shutil.copyfileobj(source, target)
+        return reference
+
+    def read_upload(self, reference: str) -> bytes:
+        with open(self._upload_path(reference), "rb") as source:
+            return source.read()
+
+    def delete_upload(self, reference: str):
+        try:
+            os.remove(self._upload_path(reference))
+        except FileNotFoundError:
+            pass
+
+    def _upload_path(self, reference: str) -> str:
+        # Référence issue d'un payload : un nom de fichier, jamais un chemin
+        if not reference or os.path.basename(reference) != reference:
+            raise ValueError(f"Référence de fichier invalide: {reference!r}")
+        return os.path.join(self.upload_dir, reference)
+
+    def claim(self, db: Session, worker_id: str) -> Optional[Dict]:
+        """Réserver la prochaine tâche prête pour ce worker"""
+        row = db.execute(CLAIM_TASK, {"worker_id": worker_id}).mappings().first()
+        return dict(row) if row else None
+
+    def heartbeat(self, db: Session, worker_id: str, task_ids: List[int]):
+        """Prolonger le bail des tâches en cours d'exécution"""
+        if task_ids:
+            db.execute(HEARTBEAT, {"worker_id": worker_id, "task_ids": task_ids})
+
+    def complete(self, db: Session, task_id: int, result: Optional[Dict]):
+        """Marquer une tâche comme réussie et conserver son résultat"""
+        db.execute(COMPLETE_TASK, {"task_id": task_id, "result": json.dumps(result, default=str)})
+
+    def fail(self, db: Session, task: Dict, error: str) -> str:
+        """Reprogrammer une tâche en échec avec un délai exponentiel, ou l'abandonner"""
+        if task["attempts"] >= task["max_attempts"]:
+            db.execute(FAIL_TASK, {"task_id": task["id"], "error": error})
+            return "failed"
+
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (task["attempts"] - 1))
+        db.execute(RETRY_TASK, {
+            "task_id": task["id"],
+            "error": error,
+            "run_at": datetime.now(timezone.utc) + timedelta(seconds=delay),
+        })
+        return "pending"
+
+    def enqueue_periodic(self, db: Session, task_type: str, interval_seconds: float,
+                         priority: int = MIN_PRIORITY) -> Optional[Dict]:
+        """Planifier une tâche récurrente si la précédente date de plus de `interval_seconds` (sans commit)"""
+        db.execute(SCHEDULER_LOCK)
+        row = db.execute(ENQUEUE_PERIODIC, {
+            "task_type": task_type,
+            "priority": priority,
+            "max_attempts": 1,
+            "interval_seconds": interval_seconds,
+        }).mappings().first()
+        return dict(row) if row else None
+
+    def requeue_expired(self, db: Session) -> int:
+        """Récupérer les tâches abandonnées par un worker arrêté brutalement"""
+        return db.execute(REQUEUE_EXPIRED, {"lease_seconds": self.lease_seconds}).rowcount
+
+    def cancel(self, db: Session, task_id: int) -> Optional[Dict]:
+        """Annuler une tâche qui n'a pas encore démarré"""
+        row = db.execute(CANCEL_TASK, {"task_id": task_id}).mappings().first()
+        return dict(row) if row else None
+
+    def get_task(self, db: Session, task_id: int) -> Optional[Dict]:
+        row = db.execute(GET_TASK, {"task_id": task_id}).mappings().first()
+        return dict(row) if row else None
+
+    def list_tasks(self, db: Session, status: Optional[str] = None, task_type: Optional[str] = None,
+                   limit: int = 50) -> List[Dict]:
+        """Tâches les plus récentes, filtrées par statut et type"""
+        conditions = []
+        params = {"limit": limit}
+        if status:
+            conditions.append("status = :status")
+            params["status"] = status
+        if task_type:
+            conditions.append("task_type = :task_type")
+            params["task_type"] = task_type
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = db.execute(
+            text(f"SELECT {TASK_SUMMARY_COLUMNS} FROM tasks {where} ORDER BY id DESC LIMIT :limit"),
+            params
+        ).mappings().all()
+        return [dict(row) for row in rows]
+
+# Instance globale du service
+task_queue_service = TaskQueueService()
@@ -1,12 +1,43 @@
 import httpx
 import asyncio
-from typing import Dict, List, Optional
+import logging
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from app.core.config import settings
+from app.core.logging_config import RATE_LIMITED
+from app.core.tracing import tracer
+from app.services.provider_client import provider_client, record_fallback, ProviderUnavailable
+from app.services.risk_results import VulnerabilityAssessment, VulnerabilityRisk
+from app.utils.noise import REGIONS, CoordinateNoise, region, region_indices, uniform_matrix
 from fastapi import HTTPException
 import os
 import json
-import random
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+# Sel du bruit déterministe propre aux facteurs de vulnérabilité
+SALT_VULNERABILITY = 3
+
+HAZARDS = ("flood", "earthquake", "wind", "subsidence")
+
+# Fourchettes de probabilité par zone géographique
+PROBABILITY_RANGES = {
+    "nord": {"flood": (0.5, 0.8), "earthquake": (0.02, 0.08), "wind": (0.6, 0.9), "subsidence": (0.15, 0.4)},
+    "centre": {"flood": (0.3, 0.6), "earthquake": (0.15, 0.35), "wind": (0.4, 0.7), "subsidence": (0.25, 0.5)},
+    "sud": {"flood": (0.2, 0.5), "earthquake": (0.25, 0.45), "wind": (0.3, 0.6), "subsidence": (0.35, 0.6)},
+    # Autres pays - données génériques
+    "autres": {"flood": (0.15, 0.4), "earthquake": (0.08, 0.25), "wind": (0.25, 0.55), "subsidence": (0.15, 0.35)}
+}
+
+# Intensité et fréquence de chaque aléa (indépendantes de la zone)
+HAZARD_DETAILS = {
+    "flood": ("flood_depth", (0.5, 3.0), "flood_frequency", (0.1, 0.4)),
+    "earthquake": ("earthquake_magnitude", (3.0, 6.5), "earthquake_frequency", (0.05, 0.2)),
+    "wind": ("wind_speed", (20.0, 50.0), "wind_frequency", (0.2, 0.5)),
+    "subsidence": ("subsidence_rate", (0.1, 2.0), "subsidence_frequency", (0.05, 0.2))
+}
+
 class VulnerabilityService:
     def __init__(self):
         # Configuration des APIs
@@ -19,65 +50,65 @@ class VulnerabilityService:
         
         # Vérifier la configuration
         if not self.jba_api_key or self.jba_api_key == "your_jba_api_key_here":
-            print("⚠️  JBA_API_KEY non configurée - Utilisation des données par défaut")
+            logger.warning("JBA_API_KEY non configurée - Utilisation des données par défaut")
             self.jba_api_key = None
             
         if not self.fema_api_key or self.fema_api_key == "your_fema_api_key_here":
-            print("⚠️  FEMA_API_KEY non configurée - Utilisation des données par défaut")
+            logger.warning("FEMA_API_KEY non configurée - Utilisation des données par défaut")
             self.fema_api_key = None
 
     async def get_jba_vulnerability_data(self, latitude: float, longitude: float) -> Dict:
         """Récupérer les données de vulnérabilité JBA Risk Management"""
-        if not self.jba_api_key:
+        # En mode hors ligne, le cache peut contenir des réponses enregistrées même sans clé
+        if not self.jba_api_key and not settings.PROVIDER_OFFLINE_MODE:
             return self._get_default_jba_data(latitude, longitude)
 
         try:
-            async with httpx.AsyncClient() as client:
-                url = f"{self.jba_base_url}/vulnerability"
-                params = {
-                    "lat": latitude,
-                    "lon": longitude,
-                    "api_key": self.jba_api_key,
-                    "format": "json"
-                }
-                
-                response = await client.get(url, params=params, timeout=10.0)
-                response.raise_for_status()
-                
-                return response.json()
+            url = f"{self.jba_base_url}/vulnerability"
+            params = {
+                "lat": latitude,
+                "lon": longitude,
+                "api_key": self.jba_api_key,
+                "format": "json"
+            }
+            
+            return await provider_client.get_json("jba", url, params)
 
+        except ProviderUnavailable:
+            # Disjoncteur ouvert : repli immédiat sans attendre le délai d'appel
+            return self._get_default_jba_data(latitude, longitude)
         except httpx.HTTPStatusError as e:
-            print(f"⚠️  Erreur API JBA: {e.response.status_code} - Utilisation des données par défaut")
+            logger.warning("Erreur API JBA: %s - Utilisation des données par défaut", e.response.status_code, extra=RATE_LIMITED)
             return self._get_default_jba_data(latitude, longitude)
         except Exception as e:
-            print(f"⚠️  Erreur lors de la récupération JBA: {str(e)} - Utilisation des données par défaut")
+            logger.warning("Erreur lors de la récupération JBA: %s - Utilisation des données par défaut", e, extra=RATE_LIMITED)
             return self._get_default_jba_data(latitude, longitude)
 
     async def get_fema_vulnerability_data(self, latitude: float, longitude: float) -> Dict:
         """Récupérer les données de vulnérabilité FEMA"""
-        if not self.fema_api_key:
+        # En mode hors ligne, le cache peut contenir des réponses enregistrées même sans clé
+        if not self.fema_api_key and not settings.PROVIDER_OFFLINE_MODE:
             return self._get_default_fema_data(latitude, longitude)
 
         try:
-            async with httpx.AsyncClient() as client:
-                url = f"{self.fema_base_url}/vulnerability"
-                params = {
-                    "lat": latitude,
-                    "lon": longitude,
-                    "api_key": self.fema_api_key,
-                    "format": "json"
-                }
-                
-                response = await client.get(url, params=params, timeout=10.0)
-                response.raise_for_status()
-                
-                return response.json()
+            url = f"{self.fema_base_url}/vulnerability"
+            params = {
+                "lat": latitude,
+                "lon": longitude,
+                "api_key": self.fema_api_key,
+                "format": "json"
+            }
+            
+            return await provider_client.get_json("fema", url, params)
 
+        except ProviderUnavailable:
+            # Disjoncteur ouvert : repli immédiat sans attendre le délai d'appel
+            return self._get_default_fema_data(latitude, longitude)
         except httpx.HTTPStatusError as e:
-            print(f"⚠️  Erreur API FEMA: {e.response.status_code} - Utilisation des données par défaut")
+            logger.warning("Erreur API FEMA: %s - Utilisation des données par défaut", e.response.status_code, extra=RATE_LIMITED)
             return self._get_default_fema_data(latitude, longitude)
         except Exception as e:
-            print(f"⚠️  Erreur lors de la récupération FEMA: {str(e)} - Utilisation des données par défaut")
+            logger.warning("Erreur lors de la récupération FEMA: %s - Utilisation des données par défaut", e, extra=RATE_LIMITED)
             return self._get_default_fema_data(latitude, longitude)
 
     def _get_default_jba_data(self, latitude: float, longitude: float) -> Dict:
@@ -148,55 +179,50 @@ class VulnerabilityService:
 
     def _calculate_vulnerability_factors(self, latitude: float, longitude: float) -> Dict:
         """Calculer les facteurs de vulnérabilité basés sur la localisation"""
-        # Utiliser les coordonnées comme seed pour la cohérence
-        base_seed = int(latitude * 1000 + longitude * 1000)
-        random.seed(base_seed)
+        # Tirages dérivés des coordonnées : cohérents d'un appel à l'autre, sans état global
+        noise = CoordinateNoise(latitude, longitude, SALT_VULNERABILITY)
         
-        # Déterminer la zone géographique avec des variations plus importantes
-        if 43.0 <= latitude <= 51.0 and -5.0 <= longitude <= 10.0:  # France métropolitaine
-            if latitude > 48.0:  # Nord de la France
-                flood_probability = random.uniform(0.5, 0.8)
-                earthquake_probability = random.uniform(0.02, 0.08)
-                wind_probability = random.uniform(0.6, 0.9)
-                subsidence_probability = random.uniform(0.15, 0.4)
-            elif latitude > 45.0:  # Centre de la France
-                flood_probability = random.uniform(0.3, 0.6)
-                earthquake_probability = random.uniform(0.15, 0.35)
-                wind_probability = random.uniform(0.4, 0.7)
-                subsidence_probability = random.uniform(0.25, 0.5)
-            else:  # Sud de la France
-                flood_probability = random.uniform(0.2, 0.5)
-                earthquake_probability = random.uniform(0.25, 0.45)
-                wind_probability = random.uniform(0.3, 0.6)
-                subsidence_probability = random.uniform(0.35, 0.6)
-        else:
-            # Autres pays - données génériques
-            flood_probability = random.uniform(0.15, 0.4)
-            earthquake_probability = random.uniform(0.08, 0.25)
-            wind_probability = random.uniform(0.25, 0.55)
-            subsidence_probability = random.uniform(0.15, 0.35)
+        # Fourchettes de probabilité selon la zone géographique
+        ranges = PROBABILITY_RANGES[region(latitude, longitude)]
+        probabilities = {
+            hazard: noise.uniform(stream, *ranges[hazard])
+            for stream, hazard in enumerate(HAZARDS)
+        }
         
-        return {
-            "flood_probability": flood_probability,
-            "flood_depth": random.uniform(0.5, 3.0),
-            "flood_frequency": random.uniform(0.1, 0.4),
-            "flood_zone": self._get_zone_type(flood_probability),
-            
-            "earthquake_probability": earthquake_probability,
-            "earthquake_magnitude": random.uniform(3.0, 6.5),
-            "earthquake_frequency": random.uniform(0.05, 0.2),
-            "earthquake_zone": self._get_zone_type(earthquake_probability),
-            
-            "wind_probability": wind_probability,
-            "wind_speed": random.uniform(20.0, 50.0),
-            "wind_frequency": random.uniform(0.2, 0.5),
-            "wind_zone": self._get_zone_type(wind_probability),
+        factors = {}
+        for index, hazard in enumerate(HAZARDS):
+            first_name, first_range, second_name, second_range = HAZARD_DETAILS[hazard]
+            stream = len(HAZARDS) + index * 2
+            factors[f"{hazard}_probability"] = probabilities[hazard]
+            factors[first_name] = noise.uniform(stream, *first_range)
+            factors[second_name] = noise.uniform(stream + 1, *second_range)
+            factors[f"{hazard}_zone"] = self._get_zone_type(probabilities[hazard])
+        return factors
+
+    def vulnerability_factors_bulk(self, latitudes: Sequence[float], longitudes: Sequence[float]) -> Dict[str, np.ndarray]:
+        """Facteurs de vulnérabilité par défaut pour un tableau de sites, en une passe NumPy
+
+        Valeurs identiques à `_calculate_vulnerability_factors`, une colonne par clé.
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        regions = region_indices(latitudes, longitudes)
+        draws = uniform_matrix(latitudes, longitudes, SALT_VULNERABILITY, len(HAZARDS) * 3)
+        
+        factors = {}
+        for index, hazard in enumerate(HAZARDS):
+            bounds = np.array([PROBABILITY_RANGES[region_name][hazard] for region_name in REGIONS])[regions]
+            probability = bounds[:, 0] + (bounds[:, 1] - bounds[:, 0]) * draws[:, index]
             
-            "subsidence_probability": subsidence_probability,
-            "subsidence_rate": random.uniform(0.1, 2.0),
-            "subsidence_frequency": random.uniform(0.05, 0.2),
-            "subsidence_zone": self._get_zone_type(subsidence_probability)
-        }
+            first_name, first_range, second_name, second_range = HAZARD_DETAILS[hazard]
+            stream = len(HAZARDS) + index * 2
+            factors[f"{hazard}_probability"] = probability
+            factors[first_name] = first_range[0] + (first_range[1] - first_range[0]) * draws[:, stream]
+            factors[second_name] = second_range[0] + (second_range[1] - second_range[0]) * draws[:, stream + 1]
+            factors[f"{hazard}_zone"] = np.select(
+                [probability < 0.2, probability < 0.4], ["faible", "modérée"], default="élevée"
+            )
+        return factors
     
     def _get_zone_type(self, probability: float) -> str:
         """Déterminer le type de zone basé sur la probabilité"""
@@ -207,7 +233,8 @@ class VulnerabilityService:
         else:
             return "élevée"
 
-    def calculate_vulnerability_risk(self, jba_data: Dict, fema_data: Dict, site_type: str, site_value: float) -> Dict:
+    @tracer.traced("vulnerability.calculate_vulnerability_risk")
+    def calculate_vulnerability_risk(self, jba_data: Dict, fema_data: Dict, site_type: str, site_value: float) -> VulnerabilityAssessment:
         """Calculer un score de vulnérabilité basé sur les données JBA et FEMA"""
         try:
             # Extraire les données de vulnérabilité
@@ -245,43 +272,24 @@ class VulnerabilityService:
                 infrastructure_score * 0.20
             ) * site_type_multiplier
             
-            return {
-                "vulnerability_risk_score": min(100.0, max(0.0, vulnerability_risk)),
-                "risk_factors": {
-                    "flood_vulnerability": flood_score,
-                    "earthquake_vulnerability": earthquake_score,
-                    "wind_vulnerability": wind_score,
-                    "subsidence_vulnerability": subsidence_score,
-                    "infrastructure_vulnerability": infrastructure_score,
-                    "site_type_multiplier": site_type_multiplier
-                },
-                "zone_assessments": {
-                    "flood_zone": flood_risk.get("zone_type", "inconnue"),
-                    "earthquake_zone": earthquake_risk.get("zone_type", "inconnue"),
-                    "wind_zone": wind_risk.get("zone_type", "inconnue"),
-                    "subsidence_zone": subsidence_risk.get("zone_type", "inconnue")
-                }
-            }
+            return VulnerabilityAssessment(
+                min(100.0, max(0.0, vulnerability_risk)),
+                flood_score,
+                earthquake_score,
+                wind_score,
+                subsidence_score,
+                infrastructure_score,
+                site_type_multiplier,
+                flood_risk.get("zone_type", "inconnue"),
+                earthquake_risk.get("zone_type", "inconnue"),
+                wind_risk.get("zone_type", "inconnue"),
+                subsidence_risk.get("zone_type", "inconnue")
+            )
             
         except Exception as e:
-            print(f"Erreur lors du calcul de la vulnérabilité: {e}")
-            return {
-                "vulnerability_risk_score": 25.0,
-                "risk_factors": {
-                    "flood_vulnerability": 20.0,
-                    "earthquake_vulnerability": 15.0,
-                    "wind_vulnerability": 20.0,
-                    "subsidence_vulnerability": 10.0,
-                    "infrastructure_vulnerability": 25.0,
-                    "site_type_multiplier": 1.0
-                },
-                "zone_assessments": {
-                    "flood_zone": "inconnue",
-                    "earthquake_zone": "inconnue",
-                    "wind_zone": "inconnue",
-                    "subsidence_zone": "inconnue"
-                }
-            }
+            logger.exception("Erreur lors du calcul de la vulnérabilité: %s", e, extra=RATE_LIMITED)
+            record_fallback("vulnerability")
+            return VulnerabilityAssessment.default()
 
     def _calculate_flood_vulnerability(self, jba_flood: Dict, fema_flood: Dict) -> float:
         """Calculer la vulnérabilité aux inondations"""
@@ -349,7 +357,8 @@ class VulnerabilityService:
         # Score moyen des vulnérabilités d'infrastructure
         return (roads + utilities + buildings) * 100
 
-    async def get_vulnerability_risk_for_site(self, latitude: float, longitude: float, site_type: str, site_value: float) -> Dict:
+    @tracer.traced("vulnerability.get_vulnerability_risk_for_site")
+    async def get_vulnerability_risk_for_site(self, latitude: float, longitude: float, site_type: str, site_value: float) -> VulnerabilityRisk:
         """Récupérer le risque de vulnérabilité pour un site"""
         try:
             # Récupérer les données JBA
@@ -361,35 +370,12 @@ class VulnerabilityService:
             # Calculer le risque
             risk_assessment = self.calculate_vulnerability_risk(jba_data, fema_data, site_type, site_value)
             
-            return {
-                "jba_data": jba_data,
-                "fema_data": fema_data,
-                "vulnerability_risk": risk_assessment
-            }
+            return VulnerabilityRisk(jba_data, fema_data, risk_assessment)
             
         except Exception as e:
-            print(f"Erreur lors de la récupération du risque de vulnérabilité: {e}")
-            return {
-                "jba_data": {},
-                "fema_data": {},
-                "vulnerability_risk": {
-                    "vulnerability_risk_score": 25.0,
-                    "risk_factors": {
-                        "flood_vulnerability": 20.0,
-                        "earthquake_vulnerability": 15.0,
-                        "wind_vulnerability": 20.0,
-                        "subsidence_vulnerability": 10.0,
-                        "infrastructure_vulnerability": 25.0,
-                        "site_type_multiplier": 1.0
-                    },
-                    "zone_assessments": {
-                        "flood_zone": "inconnue",
-                        "earthquake_zone": "inconnue",
-                        "wind_zone": "inconnue",
-                        "subsidence_zone": "inconnue"
-                    }
-                }
-            }
+            logger.exception("Erreur lors de la récupération du risque de vulnérabilité: %s", e, extra=RATE_LIMITED)
+            record_fallback("vulnerability")
+            return VulnerabilityRisk.default()
 
 # Instance globale du service
 vulnerability_service = VulnerabilityService() 
\ No newline at end of file
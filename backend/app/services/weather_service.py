@@ -1,9 +1,17 @@
 import httpx
 import asyncio
+import logging
 from typing import Dict, Optional
+from app.core.config import settings
+from app.core.logging_config import RATE_LIMITED
+from app.core.tracing import tracer
+from app.services.provider_client import provider_client, record_fallback, ProviderUnavailable
+from app.services.risk_results import WeatherRisk
 from fastapi import HTTPException
 import os
 
+logger = logging.getLogger(__name__)
+
 class WeatherService:
     def __init__(self):
         self.api_key = os.getenv("OPENWEATHER_API_KEY")
@@ -11,36 +19,35 @@ class WeatherService:
         
         # Vérifier si la clé API est configurée
         if not self.api_key or self.api_key == "your_openweather_api_key_here":
-            print("⚠️  OPENWEATHER_API_KEY non configurée - Utilisation des données par défaut")
+            logger.warning("OPENWEATHER_API_KEY non configurée - Utilisation des données par défaut")
             self.api_key = None
     
     async def get_current_weather(self, latitude: float, longitude: float) -> Dict:
         """Récupérer les conditions météo actuelles"""
-        # Si pas de clé API, retourner des données par défaut
-        if not self.api_key:
+        # Si pas de clé API, retourner des données par défaut (hors ligne, le cache peut suffire)
+        if not self.api_key and not settings.PROVIDER_OFFLINE_MODE:
             return self._get_default_weather_data(latitude, longitude)
         
         try:
-            async with httpx.AsyncClient() as client:
-                url = f"{self.base_url}/weather"
-                params = {
-                    "lat": latitude,
-                    "lon": longitude,
-                    "appid": self.api_key,
-                    "units": "metric",  # Température en Celsius
-                    "lang": "fr"
-                }
-                
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                
-                return response.json()
+            url = f"{self.base_url}/weather"
+            params = {
+                "lat": latitude,
+                "lon": longitude,
+                "appid": self.api_key,
+                "units": "metric",  # Température en Celsius
+                "lang": "fr"
+            }
+            
+            return await provider_client.get_json("openweathermap", url, params)
                 
+        except ProviderUnavailable:
+            # Disjoncteur ouvert : repli immédiat sans attendre le délai d'appel
+            return self._get_default_weather_data(latitude, longitude)
         except httpx.HTTPStatusError as e:
-            print(f"⚠️  Erreur API OpenWeatherMap: {e.response.status_code} - Utilisation des données par défaut")
+            logger.warning("Erreur API OpenWeatherMap: %s - Utilisation des données par défaut", e.response.status_code, extra=RATE_LIMITED)
             return self._get_default_weather_data(latitude, longitude)
         except Exception as e:
-            print(f"⚠️  Erreur lors de la récupération météo: {str(e)} - Utilisation des données par défaut")
+            logger.warning("Erreur lors de la récupération météo: %s - Utilisation des données par défaut", e, extra=RATE_LIMITED)
             return self._get_default_weather_data(latitude, longitude)
     
     def _get_default_weather_data(self, latitude: float, longitude: float) -> Dict:
@@ -72,6 +79,7 @@ class WeatherService:
             "snow": {"1h": 0}
         }
     
+    @tracer.traced("weather.calculate_weather_risk")
     def calculate_weather_risk(self, weather_data: Dict) -> float:
         """Calculer un score de risque basé sur les conditions météo"""
         try:
@@ -132,38 +140,23 @@ class WeatherService:
             return min(100.0, max(0.0, weather_risk))
             
         except Exception as e:
-            print(f"Erreur lors du calcul du risque météo: {e}")
+            logger.exception("Erreur lors du calcul du risque météo: %s", e, extra=RATE_LIMITED)
+            record_fallback("weather")
             return 25.0  # Risque par défaut modéré
     
-    async def get_weather_risk_for_site(self, latitude: float, longitude: float) -> Dict:
+    @tracer.traced("weather.get_weather_risk_for_site")
+    async def get_weather_risk_for_site(self, latitude: float, longitude: float) -> WeatherRisk:
         """Récupérer le risque météo pour un site"""
         try:
             weather_data = await self.get_current_weather(latitude, longitude)
             risk_score = self.calculate_weather_risk(weather_data)
             
-            return {
-                "weather_data": weather_data,
-                "risk_score": risk_score,
-                "risk_factors": {
-                    "temperature": weather_data.get("main", {}).get("temp"),
-                    "humidity": weather_data.get("main", {}).get("humidity"),
-                    "wind_speed": weather_data.get("wind", {}).get("speed"),
-                    "conditions": weather_data.get("weather", [{}])[0].get("description")
-                }
-            }
+            return WeatherRisk.from_weather_data(weather_data, risk_score)
             
         except Exception as e:
-            print(f"Erreur lors de la récupération du risque météo: {e}")
-            return {
-                "weather_data": None,
-                "risk_score": 25.0,
-                "risk_factors": {
-                    "temperature": None,
-                    "humidity": None,
-                    "wind_speed": None,
-                    "conditions": "Données non disponibles"
-                }
-            }
+            logger.exception("Erreur lors de la récupération du risque météo: %s", e, extra=RATE_LIMITED)
+            record_fallback("weather")
+            return WeatherRisk.unavailable()
 
 # Instance globale du service
 weather_service = WeatherService() 
\ No newline at end of file
@@ -0,0 +1,81 @@
+import math
+from typing import List, Tuple
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Précision stockée dans sites.geohash (cellules d'environ 5 m x 5 m)
+STORED_PRECISION = 9
+
+EARTH_RADIUS_KM = 6371.0
+
+def encode(latitude: float, longitude: float, precision: int = STORED_PRECISION) -> str:
+    """Encoder des coordonnées en geohash (identique à la fonction SQL geohash_encode)"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    result = []
+    bit = 0
+    char_index = 0
+    even = True
+
+    while len(result) < precision:
+        value, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            char_index = char_index * 2 + 1
+            bounds[0] = mid
+        else:
+            char_index = char_index * 2
+            bounds[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            result.append(BASE32[char_index])
+            bit = 0
+            char_index = 0
+
+    return "".join(result)
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Taille (latitude, longitude) en degrés d'une cellule geohash"""
+    bits = precision * 5
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """Rectangle (min_lat, max_lat, min_lon, max_lon) contenant le cercle de rayon donné"""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(min(89.9, abs(latitude) + lat_delta)))
+    lon_delta = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * max(cos_lat, 1e-6))))
+    return (
+        max(-90.0, latitude - lat_delta),
+        min(90.0, latitude + lat_delta),
+        max(-180.0, longitude - lon_delta),
+        min(180.0, longitude + lon_delta)
+    )
+
+def covering_prefixes(min_lat: float, max_lat: float, min_lon: float, max_lon: float, max_cells: int = 16) -> List[str]:
+    """Préfixes geohash les plus fins couvrant le rectangle en au plus `max_cells` cellules"""
+    best = [""]
+    for precision in range(1, STORED_PRECISION + 1):
+        lat_size, lon_size = cell_size(precision)
+        lat_start = math.floor((min_lat + 90.0) / lat_size)
+        lat_end = math.floor((min(max_lat, 90.0 - 1e-9) + 90.0) / lat_size)
+        lon_start = math.floor((min_lon + 180.0) / lon_size)
+        lon_end = math.floor((min(max_lon, 180.0 - 1e-9) + 180.0) / lon_size)
+        if (lat_end - lat_start + 1) * (lon_end - lon_start + 1) > max_cells:
+            break
+        best = [
+            encode(-90.0 + (lat_index + 0.5) * lat_size, -180.0 + (lon_index + 0.5) * lon_size, precision)
+            for lat_index in range(lat_start, lat_end + 1)
+            for lon_index in range(lon_start, lon_end + 1)
+        ]
+    return best
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distance orthodromique en kilomètres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
@@ -0,0 +1,92 @@
+# Bruit déterministe dérivé des coordonnées pour les données synthétiques par défaut.
+# Chaque tirage est identifié par un numéro de flux : la valeur ne dépend que des
+# coordonnées, du sel de l'appelant et de ce numéro, jamais de l'ordre des appels
+# ni d'un état global partagé (contrairement à random.seed). Les versions scalaire
+# (CoordinateNoise) et NumPy (uniform_matrix) donnent exactement les mêmes valeurs.
+from typing import Sequence
+
+import numpy as np
+
+MASK = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+MIX_1 = 0xBF58476D1CE4E5B9
+MIX_2 = 0x94D049BB133111EB
+
+# Quantification des coordonnées (1e-6 degré, environ 10 cm)
+COORDINATE_SCALE = 1_000_000
+
+def _mix(z: int) -> int:
+    # Finaliseur splitmix64
+    z = ((z ^ (z >> 30)) * MIX_1) & MASK
+    z = ((z ^ (z >> 27)) * MIX_2) & MASK
+    return z ^ (z >> 31)
+
+def coordinate_seed(latitude: float, longitude: float, salt: int = 0) -> int:
+    """Graine 64 bits d'un couple de coordonnées"""
+    lat_q = int(round(latitude * COORDINATE_SCALE)) & MASK
+    lon_q = int(round(longitude * COORDINATE_SCALE)) & MASK
+    return _mix(_mix(_mix(lat_q ^ GOLDEN_GAMMA) ^ lon_q) ^ (salt & MASK))
+
+class CoordinateNoise:
+    """Tirages reproductibles pour un site"""
+    def __init__(self, latitude: float, longitude: float, salt: int = 0):
+        self.seed = coordinate_seed(latitude, longitude, salt)
+
+    def random(self, stream: int) -> float:
+        """Uniforme dans [0, 1)"""
+        z = _mix((self.seed + (stream + 1) * GOLDEN_GAMMA) & MASK)
+        return (z >> 11) * (1.0 / (1 << 53))
+
+    def uniform(self, stream: int, low: float, high: float) -> float:
+        return low + (high - low) * self.random(stream)
+
+    def randint(self, stream: int, low: int, high: int) -> int:
+        """Entier dans [low, high] (bornes incluses, comme random.randint)"""
+        return low + int(self.random(stream) * (high - low + 1))
+
+def _mix_array(z: np.ndarray) -> np.ndarray:
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(MIX_1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(MIX_2)
+    return z ^ (z >> np.uint64(31))
+
+def coordinate_seeds(latitudes: Sequence[float], longitudes: Sequence[float], salt: int = 0) -> np.ndarray:
+    """Graines de `coordinate_seed` pour un tableau de sites"""
+    with np.errstate(over="ignore"):
+        lat_q = np.rint(np.asarray(latitudes, dtype=np.float64) * COORDINATE_SCALE).astype(np.int64).view(np.uint64)
+        lon_q = np.rint(np.asarray(longitudes, dtype=np.float64) * COORDINATE_SCALE).astype(np.int64).view(np.uint64)
+        seeds = _mix_array(lat_q ^ np.uint64(GOLDEN_GAMMA))
+        seeds = _mix_array(seeds ^ lon_q)
+        return _mix_array(seeds ^ np.uint64(salt & MASK))
+
+def uniform_streams(latitudes: Sequence[float], longitudes: Sequence[float], salt: int, streams: Sequence[int]) -> np.ndarray:
+    """Tirages uniformes [0, 1) des flux `streams` seulement, de forme (sites, len(streams))"""
+    seeds = coordinate_seeds(latitudes, longitudes, salt)
+    with np.errstate(over="ignore"):
+        offsets = (np.asarray(streams, dtype=np.uint64) + np.uint64(1)) * np.uint64(GOLDEN_GAMMA)
+        z = _mix_array(seeds[:, None] + offsets[None, :])
+    return (z >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+def uniform_matrix(latitudes: Sequence[float], longitudes: Sequence[float], salt: int, streams: int) -> np.ndarray:
+    """Tirages uniformes [0, 1) de forme (sites, flux), identiques à `CoordinateNoise.random`"""
+    return uniform_streams(latitudes, longitudes, salt, range(streams))
+
+# Zones géographiques des données par défaut
+REGIONS = ("nord", "centre", "sud", "autres")
+
+def region(latitude: float, longitude: float) -> str:
+    if 43.0 <= latitude <= 51.0 and -5.0 <= longitude <= 10.0:  # France métropolitaine
+        if latitude > 48.0:
+            return "nord"
+        elif latitude > 45.0:
+            return "centre"
+        return "sud"
+    return "autres"
+
+def region_indices(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Indices dans REGIONS, version vectorisée de `region`"""
+    in_france = (latitudes >= 43.0) & (latitudes <= 51.0) & (longitudes >= -5.0) & (longitudes <= 10.0)
+    return np.select(
+        [in_france & (latitudes > 48.0), in_france & (latitudes > 45.0), in_france],
+        [0, 1, 2],
+        default=3
+    )
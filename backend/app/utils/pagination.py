@@ -0,0 +1,75 @@
+from typing import Iterator, List, Optional, Type
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import func, literal_column, tuple_
+from sqlalchemy.orm import Query
+
+from app.core.database import SessionLocal
+
+# Nombre de lignes lues par aller-retour sur le curseur serveur
+STREAM_CHUNK_SIZE = 1000
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+NEXT_CURSOR_VALUE_HEADER = "X-Next-Cursor-Value"
+
+# Valeur de tri des NULL (colonnes de tri positives : en tête en ordre croissant, en fin en
+# ordre décroissant). Même expression que les index (coalesce(colonne, -1.0), id).
+NULL_SORT_VALUE = -1.0
+
+def sort_key(sort_column, null_value: float = NULL_SORT_VALUE):
+    """Expression de tri sans NULL : une comparaison de ligne avec NULL n'est jamais vraie"""
+    return func.coalesce(sort_column, literal_column(repr(null_value)))
+
+def keyset_page(query: Query, id_column, after_id: Optional[int], limit: int, response: Response,
+                sort_column=None, descending: bool = False, after_value: Optional[float] = None,
+                null_value: float = NULL_SORT_VALUE) -> List:
+    """Lire une page à partir du curseur `after_id` (pagination par clé)
+
+    Contrairement à offset/limit, le coût ne dépend pas de la profondeur de la page.
+    Les résultats sont triés par id, ou par (`sort_column`, id) ; dans ce cas le curseur
+    est le couple (`after_value`, `after_id`). Le curseur de la page suivante est renvoyé
+    dans les en-têtes X-Next-Cursor (id) et X-Next-Cursor-Value (valeur de tri).
+    Les valeurs NULL sont triées comme `null_value` : elles restent atteignables et le
+    curseur renvoyé est toujours un nombre.
+    """
+    if sort_column is None:
+        if after_id is not None:
+            query = query.filter(id_column < after_id if descending else id_column > after_id)
+        order = [id_column.desc() if descending else id_column]
+    else:
+        sort_expression = sort_key(sort_column, null_value)
+        if after_id is not None:
+            if after_value is None:
+                raise ValueError("after_value est requis avec after_id pour un tri par valeur")
+            key, cursor = tuple_(sort_expression, id_column), tuple_(after_value, after_id)
+            query = query.filter(key < cursor if descending else key > cursor)
+        order = [sort_expression.desc(), id_column.desc()] if descending else [sort_expression, id_column]
+    rows = query.order_by(*order).limit(limit).all()
+
+    if len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = str(getattr(last, id_column.key))
+        if sort_column is not None:
+            value = getattr(last, sort_column.key)
+            response.headers[NEXT_CURSOR_VALUE_HEADER] = str(null_value if value is None else value)
+    return rows
+
+def ndjson_stream(build_query, schema: Type[BaseModel], chunk_size: int = STREAM_CHUNK_SIZE) -> StreamingResponse:
+    """Diffuser les lignes d'une requête en NDJSON depuis un curseur serveur
+
+    `build_query` reçoit une session dédiée : la requête vit le temps du flux et ne
+    dépend pas de la session de la requête HTTP.
+    """
+    def generate() -> Iterator[bytes]:
+        db = SessionLocal()
+        try:
+            query = build_query(db).execution_options(yield_per=chunk_size)
+            for row in query:
+                yield schema.model_validate(row).model_dump_json().encode("utf-8") + b"\n"
+                db.expunge(row)
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
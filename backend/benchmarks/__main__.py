@@ -0,0 +1,192 @@
+"""Benchmarks de la chaîne de scoring
+
+    python -m benchmarks run --sites 100000 --database-url postgresql://.../risk_bench
+    python -m benchmarks gate --threshold 0.2
+
+Sans --database-url, seuls les benchmarks des services (sans base) sont exécutés.
+La base indiquée est VIDÉE puis remplie avec le portefeuille synthétique : utiliser
+une base dédiée. Les fournisseurs externes sont en mode hors ligne (données par défaut).
+
+La commande gate mesure un sous-ensemble fixe, fournisseurs remplacés par un échec
+immédiat, et échoue (code 1) si une métrique se dégrade au-delà du seuil par
+rapport à benchmarks/baseline.json (créée avec --update-baseline) ou si un
+benchmark de la référence n'a pas été mesuré. Elle exige --database-url.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+def _configure_environment(database_url: str, work_dir: str):
+    # Doit précéder tout import de app : les settings sont lus à l'import
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+    os.environ["DEBUG"] = "false"
+    os.environ["PROVIDER_OFFLINE_MODE"] = "true"
+    os.environ["PROVIDER_CACHE_PATH"] = os.path.join(work_dir, "provider_cache.sqlite3")
+    os.environ["PROVIDER_RATE_LIMIT_PATH"] = os.path.join(work_dir, "provider_rate_limits.sqlite3")
+    os.environ["PORTFOLIO_SNAPSHOT_DIR"] = os.path.join(work_dir, "portfolio_snapshot")
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def print_results(results: dict):
+    print(f"{'benchmark':<48} {'débit/s':>12} {'p50 ms':>10} {'p99 ms':>10} {'pic Mo':>9} {'Mo/1k sites':>12}")
+    for name, result in results.items():
+        latency = result["latency_ms"]
+        per_1k_sites = result.get("peak_memory_mb_per_1k_sites")
+        print(f"{name:<48} {result['throughput_per_second']:>12.1f} {latency['p50']:>10.3f} "
+              f"{latency['p99']:>10.3f} {result['peak_memory_mb']:>9.2f} "
+              f"{per_1k_sites if per_1k_sites is not None else '-':>12}")
+
+def _execute(args, names, stub_providers: bool = False):
+    """Générer le portefeuille, charger la base si nécessaire et exécuter les benchmarks"""
+    with tempfile.TemporaryDirectory(prefix="risk-bench-") as work_dir:
+        _configure_environment(args.database_url, work_dir)
+        from .gate import stubbed_providers
+        from .portfolio import generate_portfolio
+        from .suite import BENCHMARKS, DATABASE_BENCHMARKS, prepare_database, run_benchmarks
+
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            raise SystemExit(f"⚠️  Benchmarks inconnus: {', '.join(unknown)}")
+        if not args.database_url:
+            skipped = [name for name in names if name in DATABASE_BENCHMARKS]
+            if skipped:
+                print(f"⚠️  Sans --database-url, benchmarks ignorés: {', '.join(skipped)}")
+            names = [name for name in names if name not in DATABASE_BENCHMARKS]
+
+        started = time.perf_counter()
+        portfolio = generate_portfolio(args.sites, seed=args.seed, contract_ratio=args.contract_ratio)
+        meta = {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "sites": args.sites,
+            "contracts": len(portfolio["contracts"]),
+            "sample": args.sample,
+            "iterations": args.iterations,
+            "import_rows": args.import_rows,
+            "seed": args.seed,
+            "stubbed_providers": stub_providers,
+            "generate_seconds": round(time.perf_counter() - started, 3),
+        }
+        print(f"🚀 Portefeuille synthétique: {args.sites} sites, {meta['contracts']} contrats")
+
+        site_ids = None
+        if args.database_url and any(name in DATABASE_BENCHMARKS for name in names):
+            site_ids, load_seconds = prepare_database(portfolio)
+            meta["load_seconds"] = round(load_seconds, 3)
+            print(f"✅ Portefeuille chargé en {meta['load_seconds']} s")
+
+        benchmarks = run_benchmarks(
+            portfolio, names, args.sample, args.iterations, args.import_rows, args.seed, site_ids
+        )
+        if stub_providers:
+            with stubbed_providers(args.seed):
+                results = asyncio.run(benchmarks)
+        else:
+            results = asyncio.run(benchmarks)
+    return meta, results
+
+def _write_json(path: str, data: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as output_file:
+        json.dump(data, output_file, indent=2)
+
+def run(args) -> int:
+    from .suite import BENCHMARKS
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    meta, results = _execute(args, names)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{meta['commit']}-{args.sites}.json"
+    )
+    _write_json(output, {"meta": meta, "benchmarks": results})
+
+    print_results(results)
+    print(f"✅ Résultats écrits dans {output}")
+    return 0
+
+def gate(args) -> int:
+    from .gate import GATE_BENCHMARKS, GATE_PARAMETERS, compare, print_diff
+    for name, value in GATE_PARAMETERS.items():
+        setattr(args, name, value)
+    args.contract_ratio = 0.7
+
+    if not args.database_url:
+        # Sans base, les routes d'API ne seraient pas mesurées : porte (ou référence) incomplète
+        print("⚠️  La porte mesure des routes d'API : indiquer --database-url (ou BENCHMARK_DATABASE_URL)")
+        return 2
+    if not args.update_baseline and not os.path.exists(args.baseline):
+        print(f"⚠️  Référence absente ({args.baseline}) : la créer avec --update-baseline")
+        return 2
+
+    meta, results = _execute(args, GATE_BENCHMARKS, stub_providers=True)
+    if args.output:
+        _write_json(args.output, {"meta": meta, "benchmarks": results})
+
+    if args.update_baseline:
+        _write_json(args.baseline, {"meta": meta, "benchmarks": results})
+        print_results(results)
+        print(f"✅ Référence mise à jour: {args.baseline}")
+        return 0
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    rows, passed = compare(baseline["benchmarks"], results, args.threshold)
+    print(f"Référence: commit {baseline['meta'].get('commit')} du {baseline['meta'].get('timestamp')}")
+    print_diff(rows, args.threshold)
+    if not passed:
+        print(f"⚠️  Régression de performance au-delà de {args.threshold:.0%}")
+        return 1
+    print("✅ Aucune régression de performance")
+    return 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks de la chaîne de scoring")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Exécuter les benchmarks et écrire les résultats en JSON")
+    run_parser.add_argument("--sites", type=int, default=10000, help="Taille du portefeuille synthétique")
+    run_parser.add_argument("--sample", type=int, default=500, help="Sites mesurés par les benchmarks unitaires")
+    run_parser.add_argument("--iterations", type=int, default=20, help="Appels par benchmark d'API")
+    run_parser.add_argument("--import-rows", type=int, default=500, help="Lignes du CSV importé")
+    run_parser.add_argument("--contract-ratio", type=float, default=0.7, help="Part des sites sous contrat")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--database-url", default=os.getenv("BENCHMARK_DATABASE_URL"),
+                            help="Base dédiée (vidée) pour les benchmarks d'API ; défaut BENCHMARK_DATABASE_URL")
+    run_parser.add_argument("--only", help="Liste de benchmarks séparés par des virgules")
+    run_parser.add_argument("--output", help="Fichier JSON de résultats (défaut benchmarks/results/)")
+    run_parser.set_defaults(handler=run)
+
+    gate_parser = commands.add_parser("gate", help="Comparer un sous-ensemble fixe à la référence enregistrée")
+    gate_parser.add_argument("--baseline", default=BASELINE_PATH, help="Fichier de référence")
+    gate_parser.add_argument("--threshold", type=float, default=0.2,
+                             help="Dégradation relative tolérée (0.2 = 20 %%) du débit, de la latence et de la mémoire")
+    gate_parser.add_argument("--update-baseline", action="store_true", help="Remplacer la référence par cette mesure")
+    gate_parser.add_argument("--database-url", default=os.getenv("BENCHMARK_DATABASE_URL"),
+                             help="Base dédiée (vidée) pour les routes d'API ; défaut BENCHMARK_DATABASE_URL")
+    gate_parser.add_argument("--output", help="Écrire aussi les mesures dans ce fichier JSON")
+    gate_parser.set_defaults(handler=gate)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
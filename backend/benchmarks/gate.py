@@ -0,0 +1,102 @@
+import random
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from app.services.provider_client import provider_client, ProviderUnavailable
+
+# Sous-ensemble fixe mesuré par la porte de non-régression
+GATE_BENCHMARKS = [
+    "weather.calculate_weather_risk",
+    "disaster.calculate_disaster_risk",
+    "vulnerability.calculate_vulnerability_risk",
+    "disaster.default_disasters_bulk",
+    "vulnerability.vulnerability_factors_bulk",
+    "risk_calculator.calculate_comprehensive_risk",
+    "api.sites.list",
+    "api.sites.get",
+    "api.comprehensive_risk.site",
+    "api.sites.summary",
+    "api.comprehensive_risk.statistics",
+    "api.disasters.statistics",
+    "api.vulnerability.statistics",
+]
+
+# Paramètres fixes : une mesure n'est comparable qu'à une référence de même taille
+# (100 appels : le p90 repose sur une dizaine de mesures, pas sur le seul maximum)
+GATE_PARAMETERS = {"sites": 5000, "sample": 200, "iterations": 100, "import_rows": 100, "seed": 42}
+
+# Métriques comparées : (nom, chemin dans le résultat, True si une hausse est une régression)
+METRICS = [
+    ("débit/s", ("throughput_per_second",), False),
+    ("p50 ms", ("latency_ms", "p50"), True),
+    ("p90 ms", ("latency_ms", "p90"), True),
+    ("pic Mo", ("peak_memory_mb",), True),
+]
+
+# Écarts absolus ignorés (bruit de mesure) par métrique
+NOISE_FLOORS = {"p50 ms": 0.01, "p90 ms": 0.05, "pic Mo": 0.25}
+
+@contextmanager
+def stubbed_providers(seed: int):
+    """Fournisseurs remplacés par un échec immédiat : les services servent leurs données par défaut
+
+    Les données par défaut des catastrophes et de la vulnérabilité sont dérivées des
+    coordonnées ; la météo par défaut utilise le générateur global, fixé par `seed`.
+    """
+    async def unavailable(provider: str, url: str, params: Dict, timeout: Optional[float] = None):
+        raise ProviderUnavailable(provider, 0.0)
+
+    original = provider_client.get_json
+    provider_client.get_json = unavailable
+    random.seed(seed)
+    try:
+        yield
+    finally:
+        provider_client.get_json = original
+
+def _metric(result: Dict, path: Tuple[str, ...]) -> Optional[float]:
+    value = result
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+def compare(baseline: Dict[str, Dict], current: Dict[str, Dict], threshold: float) -> Tuple[List[Dict], bool]:
+    """Comparer chaque métrique à la référence ; renvoie les lignes du tableau et l'état de la porte
+
+    Un benchmark de la référence absent de la mesure fait échouer la porte.
+    """
+    rows = []
+    passed = True
+    for name in current:
+        if name not in baseline:
+            rows.append({"benchmark": name, "metric": "-", "status": "nouveau"})
+            continue
+        for label, path, higher_is_worse in METRICS:
+            before = _metric(baseline[name], path)
+            after = _metric(current[name], path)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else 0.0
+            worse = change > threshold if higher_is_worse else change < -threshold
+            if worse and abs(after - before) < NOISE_FLOORS.get(label, 0.0):
+                worse = False
+            passed = passed and not worse
+            rows.append({
+                "benchmark": name, "metric": label, "baseline": before, "current": after,
+                "change": change, "status": "RÉGRESSION" if worse else "ok"
+            })
+    for name in baseline:
+        if name not in current:
+            passed = False
+            rows.append({"benchmark": name, "metric": "-", "status": "NON MESURÉ"})
+    return rows, passed
+
+def print_diff(rows: List[Dict], threshold: float):
+    print(f"{'benchmark':<46} {'métrique':<9} {'référence':>12} {'actuel':>12} {'écart':>9}  statut "
+          f"(seuil {threshold:.0%})")
+    for row in rows:
+        if "baseline" not in row:
+            print(f"{row['benchmark']:<46} {row['metric']:<9} {'':>12} {'':>12} {'':>9}  {row['status']}")
+            continue
+        print(f"{row['benchmark']:<46} {row['metric']:<9} {row['baseline']:>12.3f} {row['current']:>12.3f} "
+              f"{row['change']:>+9.1%}  {row['status']}")
@@ -0,0 +1,68 @@
+import inspect
+import time
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from app.core.memory_profiling import MemoryProfile
+
+# Sites d'allocation conservés dans les résultats
+TOP_ALLOCATIONS = 5
+
+# Opération mesurée : reçoit le numéro d'itération, synchrone ou coroutine
+Operation = Callable[[int], Any]
+
+async def _call(operation: Operation, iteration: int):
+    result = operation(iteration)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+async def measure(operation: Operation, iterations: int, items_per_call: int = 1,
+                  warmup: int = 1, memory_iterations: int = 1, portfolio_sites: Optional[int] = None) -> Dict:
+    """Mesurer une opération : débit, percentiles de latence et pic mémoire
+
+    Les temps sont mesurés sans tracemalloc (qui ralentit fortement l'allocation) ;
+    le pic mémoire et les principaux sites d'allocation sont mesurés à part sur
+    `memory_iterations` appels supplémentaires. Pour une opération qui parcourt tout
+    le portefeuille, `portfolio_sites` ajoute le pic rapporté à 1 000 sites.
+    """
+    for iteration in range(warmup):
+        await _call(operation, iteration)
+
+    durations = np.empty(iterations, dtype=np.float64)
+    started = time.perf_counter()
+    for iteration in range(iterations):
+        call_started = time.perf_counter()
+        await _call(operation, iteration)
+        durations[iteration] = time.perf_counter() - call_started
+    total_seconds = time.perf_counter() - started
+
+    profile = MemoryProfile("benchmark", sites=portfolio_sites, top=TOP_ALLOCATIONS)
+    result = None
+    profile.start()
+    try:
+        for iteration in range(memory_iterations):
+            # Dernier résultat gardé en vie jusqu'à l'instantané final : ses allocations sont attribuées
+            result = await _call(operation, iteration)
+    finally:
+        memory = profile.stop()
+    del result
+
+    latencies_ms = durations * 1000.0
+    return {
+        "iterations": iterations,
+        "items": iterations * items_per_call,
+        "total_seconds": round(total_seconds, 6),
+        "throughput_per_second": round(iterations * items_per_call / total_seconds, 3) if total_seconds > 0 else None,
+        "latency_ms": {
+            "mean": round(float(latencies_ms.mean()), 4),
+            "p50": round(float(np.percentile(latencies_ms, 50)), 4),
+            "p90": round(float(np.percentile(latencies_ms, 90)), 4),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 4),
+            "max": round(float(latencies_ms.max()), 4),
+        },
+        "peak_memory_mb": memory["peak_mb"],
+        "peak_memory_mb_per_1k_sites": memory["peak_mb_per_1k_sites"],
+        "top_allocations": memory["top_app_allocations"] or memory["top_allocations"],
+    }
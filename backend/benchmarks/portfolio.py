@@ -0,0 +1,192 @@
+import csv
+import io
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.insurance_contract import InsuranceContract, ContractStatus
+from app.models.site import Site, BuildingType
+from app.services.disaster_service import disaster_service
+from app.services.vulnerability_service import HAZARDS, vulnerability_service
+
+# Agglomérations françaises : (ville, code postal, latitude, longitude, poids dans le portefeuille)
+FRENCH_CITIES = [
+    ("Paris", "75008", 48.8566, 2.3522, 20),
+    ("Marseille", "13001", 43.2965, 5.3698, 6),
+    ("Lyon", "69002", 45.7640, 4.8357, 6),
+    ("Toulouse", "31000", 43.6047, 1.4442, 4),
+    ("Lille", "59000", 50.6292, 3.0573, 4),
+    ("Nice", "06000", 43.7102, 7.2620, 3),
+    ("Nantes", "44000", 47.2184, -1.5536, 3),
+    ("Strasbourg", "67000", 48.5734, 7.7521, 3),
+    ("Montpellier", "34000", 43.6108, 3.8767, 3),
+    ("Bordeaux", "33000", 44.8378, -0.5792, 3),
+    ("Rennes", "35000", 48.1173, -1.6778, 2),
+    ("Le Havre", "76600", 49.4944, 0.1079, 2),
+    ("Rouen", "76000", 49.4432, 1.0999, 2),
+    ("Grenoble", "38000", 45.1885, 5.7245, 2),
+    ("Reims", "51100", 49.2583, 4.0317, 1),
+    ("Saint-Étienne", "42000", 45.4397, 4.3872, 1),
+    ("Toulon", "83000", 43.1242, 5.9280, 1),
+    ("Dijon", "21000", 47.3220, 5.0415, 1),
+    ("Angers", "49000", 47.4784, -0.5632, 1),
+    ("Nîmes", "30000", 43.8367, 4.3601, 1),
+    ("Clermont-Ferrand", "63000", 45.7772, 3.0870, 1),
+    ("Orléans", "45000", 47.9030, 1.9093, 1),
+    ("Metz", "57000", 49.1193, 6.1757, 1),
+    ("Perpignan", "66000", 42.6887, 2.8948, 1),
+]
+
+# Dispersion autour du centre de l'agglomération (degrés, environ 10 km)
+CITY_SPREAD_DEGREES = 0.08
+
+# Répartition des types de bâtiment et valeur médiane (euros)
+BUILDING_PROFILES = {
+    "office": (0.30, 3_000_000),
+    "warehouse": (0.20, 2_000_000),
+    "factory": (0.12, 8_000_000),
+    "retail": (0.18, 1_500_000),
+    "residential": (0.10, 1_000_000),
+    "hospital": (0.02, 20_000_000),
+    "school": (0.03, 5_000_000),
+    "other": (0.05, 1_000_000),
+}
+DEFAULT_BUILDING_PROFILE = (0.05, 1_000_000)
+
+CONTRACT_STATUS_WEIGHTS = {"active": 0.8, "expired": 0.1, "draft": 0.07, "cancelled": 0.03}
+
+STREET_NAMES = ["Rue de la République", "Avenue Jean Jaurès", "Boulevard Victor Hugo", "Rue Pasteur",
+                "Avenue de la Gare", "Rue du Commerce", "Zone Industrielle Nord", "Rue des Entrepôts"]
+
+# Colonnes attendues par POST /sites/import-csv
+CSV_COLUMNS = ["name", "address", "city", "postal_code", "country", "latitude", "longitude",
+               "building_type", "building_value", "surface_area", "construction_year", "notes"]
+
+def _weights(values: List[float]) -> np.ndarray:
+    weights = np.asarray(values, dtype=np.float64)
+    return weights / weights.sum()
+
+def default_hazards(latitudes: np.ndarray, longitudes: np.ndarray, countries: List[str]) -> Dict[str, np.ndarray]:
+    """Données par défaut des fournisseurs pour tout le portefeuille, en une passe NumPy par source
+
+    Mêmes valeurs que les services en mode hors ligne : événements CatNat et EM-DAT
+    par site et facteurs de vulnérabilité.
+    """
+    catnat = disaster_service.default_catnat_bulk(latitudes, longitudes)
+    emdat = disaster_service.default_emdat_bulk(latitudes, longitudes, countries)
+    return {
+        "historical_events": catnat["historical_events"] + emdat["historical_events"],
+        **vulnerability_service.vulnerability_factors_bulk(latitudes, longitudes)
+    }
+
+def initial_risk_scores(hazards: Dict[str, np.ndarray], weather_scores: np.ndarray) -> np.ndarray:
+    """Score de risque initial cohérent avec les données par défaut des sites
+
+    Approximation des pondérations du score global (météo 25 %, catastrophes 35 %,
+    vulnérabilité 40 %) : fréquence des événements comme dans `calculate_disaster_risk`
+    et probabilité moyenne des aléas.
+    """
+    disaster_scores = np.minimum(100.0, hazards["historical_events"] / 10 * 50)
+    vulnerability_scores = np.mean([hazards[f"{hazard}_probability"] for hazard in HAZARDS], axis=0) * 100
+    return np.round(np.clip(
+        weather_scores * 0.25 + disaster_scores * 0.35 + vulnerability_scores * 0.40, 0.0, 100.0
+    ), 1)
+
+def generate_portfolio(site_count: int, seed: int = 42, contract_ratio: float = 0.7,
+                       name_prefix: str = "BENCH") -> Dict[str, List[Dict]]:
+    """Portefeuille synthétique reproductible : sites répartis autour des villes françaises et contrats
+
+    Le score de risque initial des sites est dérivé de leurs données par défaut
+    (`default_hazards`). Chaque contrat référence son site par `site_index` (position dans la liste des sites).
+    """
+    rng = np.random.default_rng(seed)
+
+    cities = rng.choice(len(FRENCH_CITIES), size=site_count, p=_weights([city[4] for city in FRENCH_CITIES]))
+    latitudes = np.array([FRENCH_CITIES[i][2] for i in cities]) + rng.normal(0, CITY_SPREAD_DEGREES, site_count)
+    longitudes = np.array([FRENCH_CITIES[i][3] for i in cities]) + rng.normal(0, CITY_SPREAD_DEGREES, site_count)
+
+    building_types = list(BuildingType)
+    profiles = [BUILDING_PROFILES.get(building_type.value, DEFAULT_BUILDING_PROFILE) for building_type in building_types]
+    type_indices = rng.choice(len(building_types), size=site_count, p=_weights([profile[0] for profile in profiles]))
+    medians = np.array([profiles[i][1] for i in type_indices], dtype=np.float64)
+    values = np.round(medians * rng.lognormal(0.0, 0.6, site_count), -3)
+    surfaces = np.round(values / rng.uniform(1500, 4000, site_count))
+    years = rng.integers(1950, 2024, site_count)
+    streets = rng.integers(0, len(STREET_NAMES), site_count)
+    numbers = rng.integers(1, 200, site_count)
+    # Composante météo tirée au hasard : les données météo par défaut n'ont pas de version vectorisée
+    weather_scores = rng.uniform(5, 85, site_count)
+    latitudes = np.round(latitudes, 6)
+    longitudes = np.round(longitudes, 6)
+    risk_scores = initial_risk_scores(default_hazards(latitudes, longitudes, ["France"] * site_count), weather_scores)
+
+    sites = []
+    for i in range(site_count):
+        city, postal_code = FRENCH_CITIES[cities[i]][:2]
+        sites.append({
+            "name": f"{name_prefix}-{i:07d} {building_types[type_indices[i]].value} {city}",
+            "address": f"{numbers[i]} {STREET_NAMES[streets[i]]}",
+            "city": city,
+            "postal_code": postal_code,
+            "country": "France",
+            "latitude": float(latitudes[i]),
+            "longitude": float(longitudes[i]),
+            "building_type": building_types[type_indices[i]],
+            "building_value": float(values[i]),
+            "surface_area": float(surfaces[i]),
+            "construction_year": int(years[i]),
+            "risk_score": float(risk_scores[i]),
+        })
+
+    statuses = list(CONTRACT_STATUS_WEIGHTS)
+    has_contract = np.flatnonzero(rng.random(site_count) < contract_ratio)
+    contract_statuses = rng.choice(len(statuses), size=len(has_contract), p=_weights(list(CONTRACT_STATUS_WEIGHTS.values())))
+    premium_rates = rng.uniform(0.01, 0.03, len(has_contract))
+    start_offsets = rng.integers(0, 365, len(has_contract))
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    contracts = []
+    for n, site_index in enumerate(has_contract):
+        value = sites[site_index]["building_value"]
+        start_date = today - timedelta(days=int(start_offsets[n]))
+        contracts.append({
+            "site_index": int(site_index),
+            "contract_number": f"{name_prefix}-C{n:07d}",
+            "premium_amount": round(value * float(premium_rates[n]), 2),
+            "coverage_amount": value,
+            "deductible": round(value * 0.01, 2),
+            "start_date": start_date,
+            "end_date": start_date + timedelta(days=365),
+            "status": ContractStatus(statuses[contract_statuses[n]]),
+        })
+
+    return {"sites": sites, "contracts": contracts}
+
+def sites_csv(sites: List[Dict]) -> str:
+    """CSV au format de l'import de sites"""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    for site in sites:
+        writer.writerow({**site, "building_type": site["building_type"].value, "notes": ""})
+    return output.getvalue()
+
+def load_portfolio(db: Session, portfolio: Dict[str, List[Dict]], batch_size: int = 10000) -> List[int]:
+    """Insérer les sites puis les contrats (avec commit), et renvoyer les ids des sites"""
+    site_ids = []
+    sites = portfolio["sites"]
+    for start in range(0, len(sites), batch_size):
+        site_ids.extend(db.scalars(insert(Site).returning(Site.id, sort_by_parameter_order=True), sites[start:start + batch_size]))
+
+    contracts = [
+        {**{key: value for key, value in contract.items() if key != "site_index"},
+         "site_id": site_ids[contract["site_index"]]}
+        for contract in portfolio["contracts"]
+    ]
+    for start in range(0, len(contracts), batch_size):
+        db.execute(insert(InsuranceContract), contracts[start:start + batch_size])
+    db.commit()
+    return site_ids
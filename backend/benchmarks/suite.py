@@ -0,0 +1,283 @@
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import text
+
+from app.core.database import engine, SessionLocal
+from app.core.database_setup import apply_database_setup
+from app.models import Base
+# Modèles hors du package app.models, importés pour que create_all crée leurs tables
+from app.models.site_feature import SiteFeature  # noqa: F401
+from app.services.disaster_service import disaster_service
+from app.services.portfolio_summary_service import portfolio_summary_service
+from app.services.risk_calculator_service import risk_calculator_service
+from app.services.vulnerability_service import vulnerability_service
+from app.services.weather_service import weather_service
+
+from .harness import measure
+from .portfolio import generate_portfolio, load_portfolio, sites_csv
+
+API_PREFIX = "/api/v1"
+IMPORT_PREFIX = "IMPORT"
+
+class BenchmarkContext:
+    """Données partagées par les benchmarks d'une exécution"""
+    def __init__(self, portfolio: Dict[str, List[Dict]], sample_size: int, iterations: int,
+                 import_rows: int, seed: int, client: Optional[httpx.AsyncClient] = None,
+                 site_ids: Optional[List[int]] = None):
+        self.portfolio = portfolio
+        sites = portfolio["sites"]
+        step = max(1, len(sites) // sample_size) if sample_size else 1
+        self.sample = sites[::step][:sample_size]
+        # Ids en base des sites de l'échantillon (benchmarks d'API)
+        self.sample_ids = site_ids[::step][:sample_size] if site_ids else []
+        self.iterations = iterations
+        self.import_rows = import_rows
+        self.seed = seed
+        self.client = client
+        self._inputs = None
+
+    async def inputs(self) -> Dict[str, List]:
+        """Données fournisseurs des sites de l'échantillon (valeurs par défaut, fournisseurs hors ligne)"""
+        if self._inputs is None:
+            inputs = {"weather": [], "disasters": [], "jba": [], "fema": []}
+            for site in self.sample:
+                latitude, longitude = site["latitude"], site["longitude"]
+                inputs["weather"].append(await weather_service.get_current_weather(latitude, longitude))
+                inputs["disasters"].append(
+                    await disaster_service.get_catnat_disasters(latitude, longitude)
+                    + await disaster_service.get_emdat_disasters(latitude, longitude)
+                )
+                inputs["jba"].append(await vulnerability_service.get_jba_vulnerability_data(latitude, longitude))
+                inputs["fema"].append(await vulnerability_service.get_fema_vulnerability_data(latitude, longitude))
+            self._inputs = inputs
+        return self._inputs
+
+Benchmark = Callable[[BenchmarkContext], Awaitable[Dict]]
+
+# Benchmarks disponibles, dans l'ordre d'exécution
+BENCHMARKS: Dict[str, Benchmark] = {}
+# Benchmarks qui exigent une base de données (et le client ASGI)
+DATABASE_BENCHMARKS = set()
+
+def benchmark(name: str, needs_database: bool = False):
+    """Enregistrer un benchmark"""
+    def register(function: Benchmark) -> Benchmark:
+        BENCHMARKS[name] = function
+        if needs_database:
+            DATABASE_BENCHMARKS.add(name)
+        return function
+    return register
+
+def _site_type(site: Dict) -> str:
+    return site["building_type"].value
+
+@benchmark("weather.calculate_weather_risk")
+async def bench_weather_risk(context: BenchmarkContext) -> Dict:
+    weather = (await context.inputs())["weather"]
+    return await measure(
+        lambda i: weather_service.calculate_weather_risk(weather[i]),
+        iterations=len(weather)
+    )
+
+@benchmark("disaster.calculate_disaster_risk")
+async def bench_disaster_risk(context: BenchmarkContext) -> Dict:
+    disasters = (await context.inputs())["disasters"]
+    sample = context.sample
+    return await measure(
+        lambda i: disaster_service.calculate_disaster_risk(disasters[i], _site_type(sample[i]), sample[i]["building_value"]),
+        iterations=len(sample)
+    )
+
+@benchmark("vulnerability.calculate_vulnerability_risk")
+async def bench_vulnerability_risk(context: BenchmarkContext) -> Dict:
+    inputs = await context.inputs()
+    sample = context.sample
+    return await measure(
+        lambda i: vulnerability_service.calculate_vulnerability_risk(
+            inputs["jba"][i], inputs["fema"][i], _site_type(sample[i]), sample[i]["building_value"]
+        ),
+        iterations=len(sample)
+    )
+
+def _coordinates(sites: List[Dict]) -> Tuple[List[float], List[float]]:
+    return [site["latitude"] for site in sites], [site["longitude"] for site in sites]
+
+def check_bulk_parity(sites: List[Dict]):
+    """Vérifier que les générateurs vectorisés donnent les mêmes données par défaut que les versions scalaires
+
+    Un écart fausserait la comparaison des benchmarks : l'exécution s'arrête.
+    """
+    latitudes, longitudes = _coordinates(sites)
+    countries = [site["country"] for site in sites]
+    catnat = disaster_service.default_catnat_bulk(latitudes, longitudes)
+    emdat = disaster_service.default_emdat_bulk(latitudes, longitudes, countries)
+    factors = vulnerability_service.vulnerability_factors_bulk(latitudes, longitudes)
+    
+    for i, (latitude, longitude, country) in enumerate(zip(latitudes, longitudes, countries)):
+        checks = {
+            "catnat": (
+                [disaster["type"] for disaster in disaster_service._get_default_catnat_data(latitude, longitude)],
+                [name for name, occurred in zip(catnat["types"], catnat["occurred"][i]) if occurred]
+            ),
+            "emdat": (
+                sorted(disaster["type"] for disaster in disaster_service._get_default_emdat_data(latitude, longitude, country)),
+                sorted(name for name, occurred in zip(emdat["types"], emdat["occurred"][i]) if occurred)
+            ),
+            "vulnérabilité": (
+                vulnerability_service._calculate_vulnerability_factors(latitude, longitude),
+                {key: column[i].item() for key, column in factors.items()}
+            )
+        }
+        for source, (scalar, bulk) in checks.items():
+            if scalar != bulk:
+                raise RuntimeError(f"Données par défaut {source} divergentes pour ({latitude}, {longitude}): {scalar} != {bulk}")
+
+@benchmark("disaster.default_disasters_bulk")
+async def bench_default_disasters_bulk(context: BenchmarkContext) -> Dict:
+    sites = context.portfolio["sites"]
+    latitudes, longitudes = _coordinates(sites)
+    countries = [site["country"] for site in sites]
+    check_bulk_parity(context.sample)
+    
+    def default_disasters(i: int):
+        catnat = disaster_service.default_catnat_bulk(latitudes, longitudes)
+        emdat = disaster_service.default_emdat_bulk(latitudes, longitudes, countries)
+        return catnat["historical_events"] + emdat["historical_events"]
+    
+    return await measure(
+        default_disasters,
+        iterations=context.iterations,
+        items_per_call=len(sites),
+        portfolio_sites=len(sites)
+    )
+
+@benchmark("vulnerability.vulnerability_factors_bulk")
+async def bench_vulnerability_factors_bulk(context: BenchmarkContext) -> Dict:
+    sites = context.portfolio["sites"]
+    latitudes, longitudes = _coordinates(sites)
+    check_bulk_parity(context.sample)
+    return await measure(
+        lambda i: vulnerability_service.vulnerability_factors_bulk(latitudes, longitudes),
+        iterations=context.iterations,
+        items_per_call=len(sites),
+        portfolio_sites=len(sites)
+    )
+
+@benchmark("risk_calculator.calculate_comprehensive_risk")
+async def bench_comprehensive_risk(context: BenchmarkContext) -> Dict:
+    sample = context.sample
+    return await measure(
+        lambda i: risk_calculator_service.calculate_comprehensive_risk(
+            sample[i]["latitude"], sample[i]["longitude"], _site_type(sample[i]), sample[i]["building_value"]
+        ),
+        iterations=len(sample)
+    )
+
+async def _get(context: BenchmarkContext, path: str, params: Optional[Dict] = None) -> httpx.Response:
+    response = await context.client.get(f"{API_PREFIX}{path}", params=params)
+    response.raise_for_status()
+    return response
+
+def _endpoint_benchmark(name: str, path: str, whole_portfolio: bool = False):
+    # Routes qui parcourent tout le portefeuille : pic mémoire rapporté à 1 000 sites
+    async def bench_endpoint(context: BenchmarkContext) -> Dict:
+        return await measure(
+            lambda i: _get(context, path),
+            iterations=context.iterations,
+            portfolio_sites=len(context.portfolio["sites"]) if whole_portfolio else None
+        )
+    benchmark(name, needs_database=True)(bench_endpoint)
+
+def _site_endpoint_benchmark(name: str, path: str):
+    # Routes par site : parcours des sites de l'échantillon
+    async def bench_site_endpoint(context: BenchmarkContext) -> Dict:
+        site_ids = context.sample_ids
+        return await measure(
+            lambda i: _get(context, path.format(site_id=site_ids[i % len(site_ids)])),
+            iterations=context.iterations
+        )
+    benchmark(name, needs_database=True)(bench_site_endpoint)
+
+@benchmark("api.sites.list", needs_database=True)
+async def bench_sites_list(context: BenchmarkContext) -> Dict:
+    page_size = 100
+    cursor = {"after_id": None}
+
+    async def next_page(i: int):
+        # Parcours du portefeuille page par page (curseur X-Next-Cursor), puis retour au début
+        params = {"limit": page_size}
+        if cursor["after_id"] is not None:
+            params["after_id"] = cursor["after_id"]
+        response = await _get(context, "/sites/", params)
+        cursor["after_id"] = response.headers.get("X-Next-Cursor")
+
+    return await measure(next_page, iterations=context.iterations, items_per_call=page_size)
+
+_site_endpoint_benchmark("api.sites.get", "/sites/{site_id}")
+_site_endpoint_benchmark("api.weather.site", "/weather/site/{site_id}")
+_site_endpoint_benchmark("api.disasters.site", "/disasters/site/{site_id}")
+_site_endpoint_benchmark("api.vulnerability.site", "/vulnerability/site/{site_id}")
+_site_endpoint_benchmark("api.comprehensive_risk.site", "/comprehensive-risk/site/{site_id}")
+_endpoint_benchmark("api.sites.summary", "/sites/summary")
+_endpoint_benchmark("api.comprehensive_risk.statistics", "/comprehensive-risk/statistics", whole_portfolio=True)
+_endpoint_benchmark("api.disasters.statistics", "/disasters/statistics", whole_portfolio=True)
+_endpoint_benchmark("api.vulnerability.statistics", "/vulnerability/statistics", whole_portfolio=True)
+
+@benchmark("api.sites.import_csv", needs_database=True)
+async def bench_import_csv(context: BenchmarkContext) -> Dict:
+    rows = generate_portfolio(context.import_rows, seed=context.seed + 1, contract_ratio=0,
+                              name_prefix=IMPORT_PREFIX)["sites"]
+    content = sites_csv(rows).encode("utf-8")
+
+    async def import_csv(i: int):
+        response = await context.client.post(
+            f"{API_PREFIX}/sites/import-csv",
+            files={"file": ("benchmark.csv", content, "text/csv")}
+        )
+        response.raise_for_status()
+
+    try:
+        # Itérations réduites : chaque appel importe `import_rows` sites
+        return await measure(import_csv, iterations=max(1, context.iterations // 5), items_per_call=len(rows))
+    finally:
+        await portfolio_summary_service.wait_for_refresh()
+        with engine.begin() as connection:
+            connection.execute(text("DELETE FROM sites WHERE name LIKE :prefix"), {"prefix": f"{IMPORT_PREFIX}-%"})
+
+def prepare_database(portfolio: Dict[str, List[Dict]]) -> Tuple[List[int], float]:
+    """Vider la base de benchmark, y charger le portefeuille ; renvoie les ids des sites et la durée du chargement"""
+    Base.metadata.create_all(bind=engine)
+    apply_database_setup(engine)
+    with engine.begin() as connection:
+        connection.execute(text("TRUNCATE sites, insurance_contracts RESTART IDENTITY CASCADE"))
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        site_ids = load_portfolio(db, portfolio)
+    finally:
+        db.close()
+    portfolio_summary_service.refresh_now()
+    return site_ids, time.perf_counter() - started
+
+async def run_benchmarks(portfolio: Dict[str, List[Dict]], names: List[str], sample_size: int,
+                         iterations: int, import_rows: int, seed: int,
+                         site_ids: Optional[List[int]] = None) -> Dict[str, Dict]:
+    """Exécuter les benchmarks demandés ; ceux qui exigent la base utilisent un client ASGI en processus"""
+    client = None
+    if any(name in DATABASE_BENCHMARKS for name in names):
+        from main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+
+    context = BenchmarkContext(portfolio, sample_size, iterations, import_rows, seed, client, site_ids)
+    results = {}
+    try:
+        for name in names:
+            print(f"🕒 {name}...")
+            results[name] = await BENCHMARKS[name](context)
+    finally:
+        if client is not None:
+            await client.aclose()
+    return results
@@ -5,14 +5,38 @@ import uvicorn
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
+from app.core.logging_config import setup_logging
+
+# Avant l'import des services : leurs avertissements de démarrage passent par les logs
+setup_logging()
+
+from app.core.admission import admission_controller, AdmissionMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.memory_profiling import MemoryProfilingMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.responses import FastJSONResponse
+from app.core.tracing import TracingMiddleware, tracer
 from app.api.v1.api import api_router
-from app.core.database import engine
+from app.core.database import engine, SessionLocal
+from app.core.database_setup import apply_database_setup
+from app.services.risk_history_service import risk_history_service
+from app.services.provider_client import provider_client
 from app.models import Base
+# Modèles hors du package app.models, importés pour que create_all crée leurs tables
+from app.models.site_feature import SiteFeature  # noqa: F401
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     Base.metadata.create_all(bind=engine)
+    apply_database_setup(engine)
+    # Partitions de l'historique créées à l'avance (le worker les maintient ensuite)
+    db = SessionLocal()
+    try:
+        risk_history_service.ensure_partitions(db)
+        db.commit()
+    finally:
+        db.close()
     yield
     # Shutdown
     pass
@@ -21,7 +45,8 @@ app = FastAPI(
     title="Risk Insight Platform API",
     description="API pour la plateforme d'aide à la décision en assurance corporate",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configuration CORS
@@ -31,8 +56,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor", "X-Next-Cursor-Value", "ETag",
+        "X-Profile-Id", "X-Profile-Wall-Ms", "X-Profile-Cpu-Ms", "X-Profile-Await-Ms",
+        "X-Memory-Profile-Id", "X-Memory-Peak-Mb", "X-Memory-Retained-Mb"
+    ],
 )
 
+# Compression des réponses volumineuses (analyses globales, recommandations, exports)
+if settings.RESPONSE_COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Contrôle d'admission : les traitements batch et IA ne peuvent pas saturer les vues interactives
+app.add_middleware(AdmissionMiddleware)
+
+# Span racine de chaque requête échantillonnée (inclut l'attente d'admission)
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+
+# Profilage à la demande (temps, mémoire), ajouté en dernier pour englober l'attente d'admission
+if settings.PROFILING_ENABLED:
+    app.add_middleware(MemoryProfilingMiddleware)
+    app.add_middleware(ProfilingMiddleware)
+
 # Inclure les routes API
 app.include_router(api_router, prefix="/api/v1")
 
@@ -46,7 +92,12 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "admission": admission_controller.stats(),
+        "tracing": tracer.stats(),
+        **provider_client.stats()
+    }
 
 if __name__ == "__main__":
     uvicorn.run(
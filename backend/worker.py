@@ -0,0 +1,219 @@
+"""Worker de la file de tâches persistante
+
+Lancement : python worker.py --concurrency 4
+
+Les tâches sont lues dans la table `tasks` (créée au démarrage de l'API) avec
+SELECT ... FOR UPDATE SKIP LOCKED : plusieurs workers peuvent tourner en parallèle.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+from typing import Dict, List, Set
+
+from app.core.config import settings
+from app.core.logging_config import RATE_LIMITED, setup_logging
+
+# Avant l'import des services : leurs avertissements de démarrage passent par les logs
+setup_logging()
+
+from app.core.admission import current_traffic_class
+from app.core.database import SessionLocal
+from app.core.memory_profiling import MemoryProfileBusy
+from app.core.tracing import tracer
+from app.services.portfolio_summary_service import portfolio_summary_service
+from app.services.risk_history_service import risk_history_service
+from app.services.task_handlers import TASK_HANDLERS, run_with_memory_profile
+from app.services.task_queue_service import task_queue_service
+
+logger = logging.getLogger(__name__)
+
+class TaskWorker:
+    def __init__(self, concurrency: int, poll_interval: float):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.running_tasks: Set[int] = set()
+        self.stopping = asyncio.Event()
+
+    def _claim(self):
+        db = SessionLocal()
+        try:
+            task = task_queue_service.claim(db, self.worker_id)
+            db.commit()
+            return task
+        finally:
+            db.close()
+
+    def _finish(self, task: Dict, result: Dict = None, error: str = None) -> str:
+        db = SessionLocal()
+        try:
+            if error is None:
+                task_queue_service.complete(db, task["id"], result)
+                outcome = "succeeded"
+            else:
+                outcome = task_queue_service.fail(db, task, error)
+            db.commit()
+            return outcome
+        except Exception as e:
+            # Issue non enregistrée : le bail expire et la tâche est remise en file par la maintenance
+            db.rollback()
+            logger.warning("Impossible d'enregistrer l'issue de la tâche %s: %s", task["id"], e,
+                           exc_info=True, extra=RATE_LIMITED)
+            return "unrecorded"
+        finally:
+            db.close()
+
+    async def _run_handler(self, handler, db, task: Dict) -> Dict:
+        # Tâche créée avec {"memory_profile": true} : rapport mémoire ajouté au résultat
+        if not task["payload"].get("memory_profile"):
+            return await handler(db, task["payload"])
+        try:
+            return await run_with_memory_profile(task["task_type"], db, task["payload"])
+        except MemoryProfileBusy as e:
+            logger.warning("%s", e)
+            return await handler(db, task["payload"])
+
+    async def _execute(self, task: Dict):
+        handler = TASK_HANDLERS.get(task["task_type"])
+        if handler is None:
+            # Type inconnu : inutile de réessayer
+            task["attempts"] = task["max_attempts"]
+            await asyncio.to_thread(self._finish, task, None, f"Type de tâche inconnu: {task['task_type']}")
+            return
+
+        self.running_tasks.add(task["id"])
+        db = SessionLocal()
+        try:
+            with tracer.root_span(f"task {task['task_type']}", task_id=task["id"],
+                                  task_type=task["task_type"], attempt=task["attempts"]):
+                result = await self._run_handler(handler, db, task)
+        except Exception as e:
+            db.rollback()
+            outcome = await asyncio.to_thread(self._finish, task, None, str(e))
+            logger.warning("Tâche %s (%s) en erreur, essai %s/%s -> %s: %s", task["id"], task["task_type"],
+                           task["attempts"], task["max_attempts"], outcome, e, exc_info=True)
+        else:
+            await asyncio.to_thread(self._finish, task, result)
+            logger.info("Tâche %s (%s) terminée", task["id"], task["task_type"])
+        finally:
+            db.close()
+            self.running_tasks.discard(task["id"])
+
+    async def _slot(self):
+        """Boucle d'un emplacement d'exécution : une tâche à la fois"""
+        while not self.stopping.is_set():
+            try:
+                task = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                logger.warning("File de tâches indisponible: %s", e, extra=RATE_LIMITED)
+                task = None
+
+            if task is None:
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._execute(task)
+            except Exception as e:
+                # Ne jamais arrêter le worker (gather) : les autres emplacements poursuivent leurs tâches
+                logger.exception("Erreur inattendue sur la tâche %s: %s", task["id"], e)
+
+    async def _maintenance(self):
+        """Prolonger les baux des tâches en cours, récupérer celles des workers arrêtés
+        et créer à l'avance les partitions de l'historique des scores"""
+        interval = max(1.0, task_queue_service.lease_seconds / 3)
+        while not self.stopping.is_set():
+            # Appels bloquants hors de la boucle : les tâches en cours ne sont pas suspendues
+            await asyncio.to_thread(self._renew_leases, list(self.running_tasks))
+            await asyncio.to_thread(self._ensure_partitions)
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _renew_leases(self, task_ids: List[int]):
+        db = SessionLocal()
+        try:
+            task_queue_service.heartbeat(db, self.worker_id, task_ids)
+            requeued = task_queue_service.requeue_expired(db)
+            db.commit()
+            if requeued:
+                logger.warning("%s tâche(s) abandonnée(s) remise(s) en file", requeued)
+        except Exception as e:
+            db.rollback()
+            logger.warning("Maintenance de la file impossible: %s", e, extra=RATE_LIMITED)
+        finally:
+            db.close()
+
+    def _ensure_partitions(self):
+        # Partitions du mois courant et du suivant, avant la première écriture du mois
+        db = SessionLocal()
+        try:
+            risk_history_service.ensure_partitions(db)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error("Création des partitions de l'historique impossible: %s", e, exc_info=True, extra=RATE_LIMITED)
+        finally:
+            db.close()
+
+    def _schedule_periodic_tasks(self):
+        db = SessionLocal()
+        try:
+            for task_type, interval in (
+                ("prewarm_weather", settings.PREWARM_WEATHER_INTERVAL_MINUTES * 60),
+                ("prewarm_hazards", settings.PREWARM_HAZARD_INTERVAL_HOURS * 3600),
+            ):
+                task = task_queue_service.enqueue_periodic(db, task_type, interval)
+                if task:
+                    logger.info("Tâche planifiée %s (%s)", task["id"], task_type)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning("Planification des tâches impossible: %s", e, extra=RATE_LIMITED)
+        finally:
+            db.close()
+
+    async def _scheduler(self):
+        """Préchauffage régulier du cache des fournisseurs (une seule tâche en file par type)"""
+        while not self.stopping.is_set():
+            await asyncio.to_thread(self._schedule_periodic_tasks)
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=60)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self):
+        # Les appels fournisseurs des tâches passent par le pool batch
+        current_traffic_class.set("batch")
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stopping.set)
+
+        logger.info("Worker %s démarré (%s tâche(s) en parallèle)", self.worker_id, self.concurrency)
+        # Les tâches en cours se terminent avant l'arrêt
+        background = [self._maintenance()]
+        if settings.PREWARM_ENABLED:
+            background.append(self._scheduler())
+        await asyncio.gather(*background, *(self._slot() for _ in range(self.concurrency)))
+        await portfolio_summary_service.wait_for_refresh()
+        logger.info("Worker %s arrêté", self.worker_id)
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de la file de tâches Risk Insight")
+    parser.add_argument("--concurrency", type=int, default=settings.TASK_WORKER_CONCURRENCY,
+                        help="Nombre de tâches exécutées en parallèle")
+    parser.add_argument("--poll-interval", type=float, default=settings.TASK_POLL_INTERVAL_SECONDS,
+                        help="Délai entre deux interrogations d'une file vide (secondes)")
+    args = parser.parse_args()
+
+    asyncio.run(TaskWorker(args.concurrency, args.poll_interval).run())
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 
 -- Créer les extensions nécessaires
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+CREATE EXTENSION IF NOT EXISTS pg_trgm; -- Recherche approximative sur les sites
 -- CREATE EXTENSION IF NOT EXISTS "postgis"; -- Commenté car non disponible dans l'image de base
 
 -- Créer les types enum personnalisés
@@ -45,7 +46,8 @@ END $$;
 -- Ces index seront créés automatiquement par SQLAlchemy
 
 -- Créer des vues utiles (optionnel)
-CREATE OR REPLACE VIEW sites_with_risk AS
+-- Vue matérialisée : rafraîchie (CONCURRENTLY) après les scorings et les écritures de contrats
+CREATE MATERIALIZED VIEW IF NOT EXISTS sites_with_risk AS
 SELECT 
     s.id,
     s.name,
@@ -58,18 +60,22 @@ SELECT
     COALESCE(SUM(c.premium_amount), 0) as total_premiums
 FROM sites s
 LEFT JOIN insurance_contracts c ON s.id = c.site_id
-GROUP BY s.id, s.name, s.city, s.building_type, s.building_value, s.risk_score, s.last_risk_update;
+GROUP BY s.id;
 
--- Créer des fonctions utiles (optionnel)
+-- Index unique requis pour le rafraîchissement concurrent
+CREATE UNIQUE INDEX IF NOT EXISTS ux_sites_with_risk_id ON sites_with_risk (id);
+
+-- Distance orthodromique (formule de haversine, stable pour les petites distances)
+-- La recherche de proximité indexée passe par la colonne sites.geohash (voir /sites/nearby)
 CREATE OR REPLACE FUNCTION calculate_distance(lat1 float, lon1 float, lat2 float, lon2 float)
 RETURNS float AS $$
 BEGIN
-    RETURN 6371 * acos(
-        cos(radians(lat1)) * cos(radians(lat2)) * cos(radians(lon2) - radians(lon1)) +
-        sin(radians(lat1)) * sin(radians(lat2))
-    );
+    RETURN 2 * 6371 * asin(least(1.0, sqrt(
+        power(sin(radians(lat2 - lat1) / 2), 2) +
+        cos(radians(lat1)) * cos(radians(lat2)) * power(sin(radians(lon2 - lon1) / 2), 2)
+    )));
 END;
-$$ LANGUAGE plpgsql;
+$$ LANGUAGE plpgsql IMMUTABLE;
 
 -- Créer des triggers pour la maintenance automatique (optionnel)
 -- Ces triggers peuvent être ajoutés plus tard selon les besoins
@@ -44,6 +44,8 @@ interface Contract {
   site_id: number
 }
 
+const PAGE_SIZE = 500
+
 export default function Home() {
   const [sites, setSites] = useState<Site[]>([])
   const [contracts, setContracts] = useState<Contract[]>([])
@@ -58,13 +60,25 @@ export default function Home() {
     fetchContracts()
   }, [])
 
+  // Charger une liste page par page (pagination par curseur) en affichant chaque page dès réception
+  const fetchAllPages = async <T,>(url: string, setItems: (update: (previous: T[]) => T[]) => void) => {
+    let cursor: string | null = null
+    let firstPage = true
+    do {
+      const pageUrl: string = `${url}?limit=${PAGE_SIZE}` + (cursor ? `&after_id=${cursor}` : '')
+      const response = await fetch(pageUrl)
+      if (!response.ok) return
+      const page: T[] = await response.json()
+      const replace = firstPage
+      setItems(previous => (replace ? page : [...previous, ...page]))
+      firstPage = false
+      cursor = response.headers.get('X-Next-Cursor')
+    } while (cursor)
+  }
+
   const fetchSites = async () => {
     try {
-      const response = await fetch('http://localhost:8000/api/v1/sites')
-      if (response.ok) {
-        const data = await response.json()
-        setSites(data)
-      }
+      await fetchAllPages<Site>('http://localhost:8000/api/v1/sites', setSites)
     } catch (error) {
       console.error('Erreur lors de la récupération des sites:', error)
     }
@@ -72,11 +86,7 @@ export default function Home() {
 
   const fetchContracts = async () => {
     try {
-      const response = await fetch('http://localhost:8000/api/v1/contracts')
-      if (response.ok) {
-        const data = await response.json()
-        setContracts(data)
-      }
+      await fetchAllPages<Contract>('http://localhost:8000/api/v1/contracts', setContracts)
     } catch (error) {
       console.error('Erreur lors de la récupération des contrats:', error)
     }
@@ -1,6 +1,8 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
+from feature_store import FEATURE_VERSION, load_feature_frame
+
 app = FastAPI(
     title="Risk Insight ML Engine",
     description="Moteur de scoring et d'IA pour Risk Insight Platform",
@@ -35,4 +37,23 @@ async def predict_risk():
         "risk_score": 65.5,
         "confidence": 0.85,
         "factors": ["Localisation", "Type de bâtiment", "Historique météo"]
-    } 
\ No newline at end of file
+    } 
+
+@app.get("/features/summary")
+def features_summary(version: int = FEATURE_VERSION):
+    """Résumé des features disponibles pour l'entraînement
+
+    Route synchrone : la lecture en base et pandas s'exécutent dans le pool de threads.
+    """
+    try:
+        frame = load_feature_frame(version)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Feature store indisponible: {str(e)}")
+
+    numeric = frame.select_dtypes(include="number")
+    return {
+        "feature_version": version,
+        "site_count": len(frame),
+        "last_computed_at": frame["computed_at"].max().isoformat() if len(frame) else None,
+        "means": {column: round(float(value), 4) for column, value in numeric.mean().dropna().items()}
+    }